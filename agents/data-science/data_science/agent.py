@@ -27,6 +27,7 @@ from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import load_artifacts
 
 from .sub_agents import bqml_agent
+from .sub_agents.bigquery.schema_index import content_text, select_schema
 from .sub_agents.bigquery.tools import (
     get_database_settings as get_bq_database_settings,
 )
@@ -48,7 +49,11 @@ def setup_before_agent_call(callback_context: CallbackContext):
     # setting up schema in instruction
     if callback_context.state["all_db_settings"]["use_database"] == "BigQuery":
         callback_context.state["database_settings"] = get_bq_database_settings()
-        schema = callback_context.state["database_settings"]["bq_ddl_schema"]
+        # Keep only the part of the schema relevant to the user's request
+        schema = select_schema(
+            callback_context.state["database_settings"],
+            content_text(callback_context.user_content),
+        )
 
         callback_context._invocation_context.agent.instruction = (
             return_instructions_root()
@@ -71,11 +71,11 @@ def return_instructions_ds() -> str:
     - Print variables (e.g., `print(f'{{variable=}}')`.
     - Give out the generated code under 'Code:'.
 
-  **No Assumptions:** **Crucially, avoid making assumptions about the nature of the data or column names.** Base findings solely on the data itself. Always use the information obtained from `explore_df` to guide your analysis.
+  **No Assumptions:** **Crucially, avoid making assumptions about the nature of the data or column names.** Base findings solely on the data itself. Always use the information obtained from `explore_df` or the provided column statistics to guide your analysis.
 
   **Available files:** Only use the files that are available as specified in the list of available files.
 
-  **Data in prompt:** Some queries contain the input data directly in the prompt. You have to parse that data into a pandas DataFrame. ALWAYS parse all the data. NEVER edit the data that are given to you.
+  **Data files:** Queries reference their input data as a Parquet file, with its columns, summary statistics and first rows. ALWAYS load the whole file into a pandas DataFrame with `pd.read_parquet` instead of parsing the preview. NEVER edit the data that are given to you.
 
   **Answerability:** Some queries may not be answerable with the available data. In those cases, inform the user why you cannot process their query and suggest what type of data would be needed to fulfill their request.
 
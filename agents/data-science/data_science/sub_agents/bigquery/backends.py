@@ -0,0 +1,85 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Interface of the SQL engines the database agent can run queries on."""
+
+import abc
+import threading
+
+
+class QueryCanceller:
+    """Lets another thread cancel a query while a backend runs it."""
+
+    def __init__(self):
+        self.cancelled = False
+        self._cancel_query = None
+        self._lock = threading.Lock()
+
+    def on_start(self, cancel_query):
+        """Called by backends with a function cancelling the running query."""
+        with self._lock:
+            self._cancel_query = cancel_query
+            cancelled = self.cancelled
+        if cancelled:
+            cancel_query()
+
+    def cancel(self):
+        """Cancels the query, now if it is running, or as soon as it starts."""
+        with self._lock:
+            self.cancelled = True
+            cancel_query = self._cancel_query
+        if cancel_query is not None:
+            cancel_query()
+
+
+class QueryBackend(abc.ABC):
+    """A SQL engine that the database agent introspects and queries.
+
+    Backends accept GoogleSQL, the dialect the agent's prompts and schema are
+    written in, and translate it to their own dialect if needed.
+    """
+
+    # Dialect (in sqlglot terms) of the queries the backend accepts, and hence
+    # the dialect generated SQL is transpiled to.
+    sql_dialect = "bigquery"
+
+    @abc.abstractmethod
+    def get_schema(self, project_id, dataset_id, warm_start=False):
+        """Returns the DDL schema of a dataset, with a few sample rows per table.
+
+        Args:
+            project_id (str): Project of the dataset.
+            dataset_id (str): The dataset.
+            warm_start (bool): Use a cached schema as is if there is one.
+              Backends without a schema cache ignore it.
+        """
+
+    @abc.abstractmethod
+    def run_query(self, sql, max_rows, canceller=None):
+        """Runs a query, fetching at most `max_rows` rows of its result.
+
+        Args:
+            sql (str): The query, in GoogleSQL.
+            max_rows (int): Maximum number of rows to fetch.
+            canceller (QueryCanceller, optional): Given the means to cancel
+              the query once it is started.
+
+        Returns:
+            tuple: The fetched rows as a `pyarrow.Table`, or None if the
+              query returned no data, and the total row count of the result.
+        """
+
+    def result_cache_key(self, sql):
+        """Fingerprint of a query for the result cache, or None to not cache it."""
+        return None
@@ -14,20 +14,34 @@
 
 """This code contains the implementation of the tools used for the CHASE-SQL agent."""
 
+import asyncio
+from collections import defaultdict
+from concurrent.futures import TimeoutError as FuturesTimeoutError, as_completed
+import decimal
 import enum
+import hashlib
 import os
 
 from google.adk.tools import ToolContext
 
 # pylint: disable=g-importing-member
 from .dc_prompt_template import DC_PROMPT_TEMPLATE
+from .llm_dispatcher import get_dispatcher
 from .llm_utils import GeminiModel
 from .qp_prompt_template import QP_PROMPT_TEMPLATE
 from .sql_postprocessor import sql_translator
+from ..backends import QueryCanceller
+from ..nl2sql_cache import get_nl2sql_cache
+from ..schema_index import select_schema
+from ..tools import DISALLOWED_SQL, MAX_NUM_ROWS, get_backend
 
 # pylint: enable=g-importing-member
 
 BQ_DATA_PROJECT_ID = os.getenv("BQ_DATA_PROJECT_ID")
+DEFAULT_CANDIDATE_TIMEOUT_SECONDS = 60
+CANDIDATE_TIMEOUT_SECONDS = float(
+    os.getenv("CHASE_CANDIDATE_TIMEOUT_SECONDS", DEFAULT_CANDIDATE_TIMEOUT_SECONDS)
+)
 
 
 class GenerateSQLType(enum.Enum):
@@ -79,6 +93,128 @@ def parse_response(response: str) -> str:
     return query.strip()
 
 
+def _normalize_value(value):
+    """Rounds numbers so that equal results from different SQL compare equal."""
+    if isinstance(value, (float, decimal.Decimal)):
+        return round(float(value), 6)
+    return value
+
+
+def result_fingerprint(table, total_rows):
+    """Fingerprint of a query result, ignoring column names and row order."""
+    rows = sorted(
+        repr(tuple(_normalize_value(v) for v in row.values()))
+        for row in table.to_pylist()
+    )
+    return hashlib.sha256(
+        "\n".join([str(total_rows), *rows]).encode()
+    ).hexdigest()
+
+
+async def _generate_candidate(model, prompt, translate, max_rows, timeout):
+    """Generates, translates and executes one SQL candidate.
+
+    Runs on the dispatcher's loop. The generation is abandoned after `timeout`
+    seconds. If the candidate is cancelled while its query runs, the query is
+    cancelled as well.
+
+    Returns:
+        tuple: The SQL (None if generation failed) and the fingerprint of its
+          result (None if it could not be executed or returned no data).
+    """
+    try:
+        sql = await model.acall(prompt, parser_func=parse_response, timeout=timeout)
+        if translate is not None:
+            # The translator calls the model synchronously, off the loop
+            sql = await asyncio.to_thread(translate, sql)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"Error generating SQL candidate: {e}")
+        return None, None
+    if not sql or DISALLOWED_SQL.search(sql):
+        return sql, None
+    canceller = QueryCanceller()
+    try:
+        table, total_rows = await asyncio.to_thread(
+            lambda: get_backend().run_query(sql, max_rows, canceller)
+        )
+    except asyncio.CancelledError:
+        canceller.cancel()
+        raise
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print(f"SQL candidate failed: {e}")
+        return sql, None
+    if table is None:
+        return sql, None
+    return sql, result_fingerprint(table, total_rows)
+
+
+def select_candidate(
+    model,
+    prompt,
+    number_of_candidates,
+    translate=None,
+    timeout=CANDIDATE_TIMEOUT_SECONDS,
+):
+    """Generates SQL candidates and picks the one most candidates agree on.
+
+    The candidates are generated, translated and executed concurrently on the
+    LLM dispatcher, and grouped by the fingerprint of their results. As soon
+    as a majority of the candidates agree, the remaining ones are cancelled,
+    along with their queries. Otherwise the largest group wins, with ties
+    going to the candidate that was requested first. Candidates that have not
+    completed within `timeout` seconds are cancelled and left out.
+
+    Args:
+        model (GeminiModel): The model generating the candidates.
+        prompt (str): The SQL generation prompt.
+        number_of_candidates (int): Number of candidates to generate.
+        translate (callable, optional): Applied to each generated SQL.
+        timeout (float): Seconds to wait for the candidates, in total.
+
+    Returns:
+        str: The selected SQL, or None if no candidate could be generated.
+    """
+    majority = number_of_candidates // 2 + 1
+    candidates = {}
+    clusters = defaultdict(list)
+    dispatcher = get_dispatcher()
+    futures = {
+        dispatcher.submit(
+            _generate_candidate(model, prompt, translate, MAX_NUM_ROWS, timeout)
+        ): i
+        for i in range(number_of_candidates)
+    }
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            index = futures[future]
+            sql, fingerprint = future.result()
+            candidates[index] = sql
+            if fingerprint is None:
+                continue
+            clusters[fingerprint].append(index)
+            if len(clusters[fingerprint]) >= majority:
+                print(
+                    f"****** {majority} of {number_of_candidates} SQL candidates"
+                    " agree."
+                )
+                return candidates[min(clusters[fingerprint])]
+    except FuturesTimeoutError:
+        print(
+            f"****** {number_of_candidates - len(candidates)} SQL candidates"
+            f" timed out after {timeout}s."
+        )
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if clusters:
+        best = max(clusters.values(), key=lambda c: (len(c), -min(c)))
+        return candidates[min(best)]
+    # No candidate ran: return the first one, for its error to be reported
+    generated = [i for i in sorted(candidates) if candidates[i]]
+    return candidates[generated[0]] if generated else None
+
+
 def initial_bq_nl2sql(
     question: str,
     tool_context: ToolContext,
@@ -93,8 +229,8 @@ def initial_bq_nl2sql(
       str: An SQL statement to answer this question.
     """
     print("****** Running agent with ChaseSQL algorithm.")
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
-    project = tool_context.state["database_settings"]["bq_data_project_id"]
+    ddl_schema = select_schema(tool_context.state["database_settings"], question)
+    project = tool_context.state["database_settings"]["bq_project_id"]
     db = tool_context.state["database_settings"]["bq_dataset_id"]
     transpile_to_bigquery = tool_context.state["database_settings"][
         "transpile_to_bigquery"
@@ -127,25 +263,47 @@ def initial_bq_nl2sql(
     else:
         raise ValueError(f"Unsupported generate_sql_type: {generate_sql_type}")
 
+    # Candidates are sampled, so cache per method, model and temperature
+    method = f"CHASE-{generate_sql_type}-transpile={transpile_to_bigquery}"
+    model_key = f"{model}@{temperature}"
+    cache = get_nl2sql_cache()
+    if cache:
+        cached_sql = cache.get(question, ddl_schema, method, model_key)
+        if cached_sql is not None:
+            return cached_sql
+
     model = GeminiModel(model_name=model, temperature=temperature)
-    requests = [prompt for _ in range(number_of_candidates)]
-    responses = model.call_parallel(requests, parser_func=parse_response)
-    # Take just the first response.
-    responses = responses[0]
 
     # If postprocessing of the SQL to transpile it to BigQuery is required,
     # then do it here.
+    translate = None
     if transpile_to_bigquery:
-        translator = sql_translator.SqlTranslator(
-            model=model,
-            temperature=temperature,
-            process_input_errors=process_input_errors,
-            process_tool_output_errors=process_tool_output_errors,
-        )
-        # pylint: disable=g-bad-todo
-        # pylint: enable=g-bad-todo
-        responses: str = translator.translate(
-            responses, ddl_schema=ddl_schema, db=db, catalog=project
+
+        def translate(sql):
+            translator = sql_translator.SqlTranslator(
+                model=model,
+                temperature=temperature,
+                process_input_errors=process_input_errors,
+                process_tool_output_errors=process_tool_output_errors,
+                output_dialect=get_backend().sql_dialect,
+            )
+            return translator.translate(
+                sql, ddl_schema=ddl_schema, db=db, catalog=project
+            )
+
+    if number_of_candidates > 1:
+        # Execute the candidates and keep the one most of them agree on
+        responses = select_candidate(model, prompt, number_of_candidates, translate)
+        generated = responses is not None
+    else:
+        responses = model.call_parallel([prompt], parser_func=parse_response)[0]
+        # Failed calls come back as error messages, which must not be cached
+        generated = bool(responses) and not responses.startswith(
+            ("Error after retries", "Timeout")
         )
+        if translate is not None:
+            responses = translate(responses)
 
+    if cache and generated:
+        cache.put(question, ddl_schema, method, model_key, responses)
     return responses
@@ -0,0 +1,257 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Process-wide dispatcher of LLM requests for the CHASE-SQL Agent.
+
+All requests run as coroutines on one event loop, in a background thread, so
+that they share:
+  - a limit on the number of requests in flight,
+  - a token-bucket rate limit per model,
+  - a single retry policy, with capped exponential backoff and full jitter,
+  - hedging: a request still running a delay after it was sent is
+    duplicated, and the first response wins,
+  - a deadline, on which the request and its hedge are cancelled.
+
+Both threads and coroutines running on other event loops can submit requests.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_REQUESTS_PER_MINUTE = 300
+DEFAULT_HEDGE_AFTER_SECONDS = 20.0
+DEFAULT_MAX_ATTEMPTS = 6
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+
+class TokenBucket:
+    """Token-bucket rate limiter, to be used on a single event loop."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def try_acquire(self):
+        """Takes a token if one is available, without waiting."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    async def acquire(self):
+        """Waits for a token and takes it."""
+        while not self.try_acquire():
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LLMDispatcher:
+    """Runs LLM requests with shared concurrency, rate, retry and hedging limits.
+
+    Args:
+        max_concurrency (int): Maximum number of requests in flight.
+        requests_per_minute (float): Rate limit per model (0 for none).
+        hedge_after (float): Seconds after being sent after which a request
+          still running is hedged (0 to never hedge). Hedges are only sent if
+          the rate limit allows it without waiting.
+        max_attempts (int): Maximum number of attempts per request.
+        base_delay (float): Backoff before the first retry, in seconds.
+        max_delay (float): Upper bound of the backoff, in seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE,
+        hedge_after=DEFAULT_HEDGE_AFTER_SECONDS,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        base_delay=DEFAULT_BASE_DELAY,
+        max_delay=DEFAULT_MAX_DELAY,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.hedge_after = hedge_after
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buckets = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="llm-dispatcher", daemon=True
+        )
+        self._thread.start()
+
+    def _bucket(self, model):
+        if model not in self._buckets:
+            rate = self.requests_per_minute / 60
+            # Allow bursts of up to a second's worth of requests
+            self._buckets[model] = TokenBucket(rate, max(1.0, rate))
+        return self._buckets[model]
+
+    async def _attempt(self, model, make_request, rate_limited=True, sent=None):
+        """Sends a request once, within the concurrency and rate limits.
+
+        `sent`, an `asyncio.Event`, is set when the request leaves the queue.
+        """
+        async with self._semaphore:
+            if rate_limited and self.requests_per_minute > 0:
+                await self._bucket(model).acquire()
+            if sent is not None:
+                sent.set()
+            return await make_request()
+
+    def _can_hedge(self, model):
+        # Never hedge at the expense of requests waiting for the rate limit
+        return self.requests_per_minute <= 0 or self._bucket(model).try_acquire()
+
+    async def _hedged(self, model, make_request):
+        """Sends a request, and a copy of it if it is slow to respond."""
+        if self.hedge_after <= 0:
+            return await self._attempt(model, make_request)
+        sent = asyncio.Event()
+        primary = asyncio.ensure_future(
+            self._attempt(model, make_request, sent=sent)
+        )
+        tasks = {primary}
+        try:
+            # Time the request from when it is sent, not while it is queued
+            # for the concurrency or rate limit
+            sending = asyncio.ensure_future(sent.wait())
+            try:
+                await asyncio.wait(
+                    {primary, sending}, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                sending.cancel()
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done and self._can_hedge(model):
+                logging.info(f"Hedging a {model} request")
+                tasks.add(
+                    asyncio.ensure_future(
+                        self._attempt(model, make_request, rate_limited=False)
+                    )
+                )
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _with_retries(self, model, make_request):
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._hedged(model, make_request)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2**attempt)
+                )
+                print(
+                    f"Attempt {attempt + 1} failed with error: {e}; retrying in"
+                    f" {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def request(self, model, make_request, timeout=None):
+        """Sends an LLM request. Must be awaited on the dispatcher's loop.
+
+        Args:
+            model (str): Name of the model, whose rate limit applies.
+            make_request (callable): Returns a new awaitable sending the request
+              on each call.
+            timeout (float, optional): Seconds before the request, including
+              its queueing and retries, is cancelled.
+
+        Returns:
+            The result of the request.
+        """
+        return await asyncio.wait_for(
+            self._with_retries(model, make_request), timeout
+        )
+
+    def submit(self, coro):
+        """Schedules a coroutine on the dispatcher's loop.
+
+        Returns:
+            concurrent.futures.Future: The result of the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro):
+        """Runs a coroutine on the dispatcher's loop and waits for its result."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Blocking call from the dispatcher's own loop")
+        future = self.submit(coro)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    async def arun(self, coro):
+        """Awaits a coroutine run on the dispatcher's loop, from any loop."""
+        return await asyncio.wrap_future(self.submit(coro))
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """Returns the process-wide dispatcher.
+
+    It is configured with LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE (per
+    model, 0 for no limit), LLM_HEDGE_AFTER_SECONDS (0 to never hedge) and
+    LLM_MAX_ATTEMPTS.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = LLMDispatcher(
+                max_concurrency=int(
+                    os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+                ),
+                requests_per_minute=float(
+                    os.getenv("LLM_REQUESTS_PER_MINUTE", DEFAULT_REQUESTS_PER_MINUTE)
+                ),
+                hedge_after=float(
+                    os.getenv("LLM_HEDGE_AFTER_SECONDS", DEFAULT_HEDGE_AFTER_SECONDS)
+                ),
+                max_attempts=int(os.getenv("LLM_MAX_ATTEMPTS", DEFAULT_MAX_ATTEMPTS)),
+            )
+    return _dispatcher
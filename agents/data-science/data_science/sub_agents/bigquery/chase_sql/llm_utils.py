@@ -14,11 +14,9 @@
 
 """This code contains the LLM utils for the CHASE-SQL Agent."""
 
-import functools
+import asyncio
 import os
 import random
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Callable, List, Optional
 
 import dotenv
@@ -29,6 +27,8 @@ from vertexai.generative_models import (GenerationConfig, HarmBlockThreshold,
 from vertexai.preview import caching
 from vertexai.preview.generative_models import GenerativeModel
 
+from .llm_dispatcher import get_dispatcher
+
 dotenv.load_dotenv(override=True)
 
 SAFETY_FILTER_CONFIG = {
@@ -80,40 +80,6 @@ aiplatform.init(
 vertexai.init(project=GCP_PROJECT, location=GCP_LOCATION)
 
 
-def retry(max_attempts=8, base_delay=1, backoff_factor=2):
-    """Decorator to add retry logic to a function.
-
-    Args:
-        max_attempts (int): The maximum number of attempts.
-        base_delay (int): The base delay in seconds for the exponential backoff.
-        backoff_factor (int): The factor by which to multiply the delay for each
-          subsequent attempt.
-
-    Returns:
-        Callable: The decorator function.
-    """
-
-    def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            attempts = 0
-            while attempts < max_attempts:
-                try:
-                    return func(*args, **kwargs)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Attempt {attempts + 1} failed with error: {e}")
-                    attempts += 1
-                    if attempts >= max_attempts:
-                        raise e
-                    delay = base_delay * (backoff_factor**attempts)
-                    delay = delay + random.uniform(0, 0.1 * delay)
-                    time.sleep(delay)
-
-        return wrapper
-
-    return decorator
-
-
 class GeminiModel:
     """Class for the Gemini model."""
 
@@ -147,8 +113,48 @@ class GeminiModel:
         else:
             self.model = GenerativeModel(model_name=model_name)
 
-    @retry(max_attempts=12, base_delay=2, backoff_factor=2)
-    def call(self, prompt: str, parser_func=None) -> str:
+    async def _generate(self, prompt: str, parser_func=None) -> str:
+        """Sends one request to the model, without retries."""
+        response = await self.model.generate_content_async(
+            prompt,
+            generation_config=GenerationConfig(
+                temperature=self.temperature,
+                **self.arguments,
+            ),
+            safety_settings=SAFETY_FILTER_CONFIG,
+        )
+        if parser_func:
+            return parser_func(response.text)
+        return response.text
+
+    async def acall(
+        self, prompt: str, parser_func=None, timeout: float | None = None
+    ) -> str:
+        """Calls the Gemini model with the given prompt, from any event loop.
+
+        The request goes through the process-wide dispatcher, which limits
+        concurrency and rate, and retries failed requests.
+
+        Args:
+            prompt (str): The prompt to call the model with.
+            parser_func (callable, optional): A function that processes the LLM
+              output. It takes the model"s response as input and returns the
+              processed result.
+            timeout (float, optional): Seconds before the call is abandoned.
+
+        Returns:
+            str: The processed response from the model.
+        """
+        dispatcher = get_dispatcher()
+        return await dispatcher.arun(
+            dispatcher.request(
+                self.model_name,
+                lambda: self._generate(prompt, parser_func),
+                timeout,
+            )
+        )
+
+    def call(self, prompt: str, parser_func=None, timeout: float | None = None) -> str:
         """Calls the Gemini model with the given prompt.
 
         Args:
@@ -156,78 +162,87 @@ class GeminiModel:
             parser_func (callable, optional): A function that processes the LLM
               output. It takes the model"s response as input and returns the
               processed result.
+            timeout (float, optional): Seconds before the call is abandoned.
 
         Returns:
             str: The processed response from the model.
         """
-        response = self.model.generate_content(
-            prompt,
-            generation_config=GenerationConfig(
-                temperature=self.temperature,
-                **self.arguments,
+        dispatcher = get_dispatcher()
+        return dispatcher.run(
+            dispatcher.request(
+                self.model_name,
+                lambda: self._generate(prompt, parser_func),
+                timeout,
+            )
+        )
+
+    async def _call_many(
+        self,
+        prompts: List[str],
+        parser_func: Optional[Callable[[str], str]],
+        timeout: float,
+    ) -> List[str]:
+        dispatcher = get_dispatcher()
+        results = await asyncio.gather(
+            *(
+                dispatcher.request(
+                    self.model_name,
+                    lambda prompt=prompt: self._generate(prompt, parser_func),
+                    timeout,
+                )
+                for prompt in prompts
             ),
-            safety_settings=SAFETY_FILTER_CONFIG,
-        ).text
-        if parser_func:
-            return parser_func(response)
-        return response
+            return_exceptions=True,
+        )
+        for index, result in enumerate(results):
+            if isinstance(result, asyncio.TimeoutError):
+                print(f"Timeout occurred for prompt {index}")
+                results[index] = "Timeout"
+            elif isinstance(result, BaseException):
+                print(f"Error for prompt {index}: {result}")
+                results[index] = f"Error after retries: {result}"
+        return results
 
-    def call_parallel(
+    async def acall_parallel(
         self,
         prompts: List[str],
         parser_func: Optional[Callable[[str], str]] = None,
-        timeout: int = 60,
-        max_retries: int = 5,
-    ) -> List[Optional[str]]:
-        """Calls the Gemini model for multiple prompts in parallel using threads with retry logic.
+        timeout: float = 60,
+    ) -> List[str]:
+        """Calls the Gemini model for multiple prompts concurrently, from any loop.
 
         Args:
             prompts (List[str]): A list of prompts to call the model with.
             parser_func (callable, optional): A function to process each response.
-            timeout (int): The maximum time (in seconds) to wait for each thread.
-            max_retries (int): The maximum number of retries for timed-out threads.
+            timeout (float): The maximum time (in seconds) to wait for each
+              response, retries included.
 
         Returns:
-            List[Optional[str]]:
-            A list of responses, or None for threads that failed.
+            List[str]:
+            A list of responses, or error messages for the prompts that failed
+            or timed out.
         """
-        results = [None] * len(prompts)
-
-        def worker(index: int, prompt: str):
-            """Thread worker function to call the model and store the result with retries."""
-            retries = 0
-            while retries <= max_retries:
-                try:
-                    return self.call(prompt, parser_func)
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Error for prompt {index}: {str(e)}")
-                    retries += 1
-                    if retries <= max_retries:
-                        print(f"Retrying ({retries}/{max_retries}) for prompt {index}")
-                        time.sleep(1)  # Small delay before retrying
-                    else:
-                        return f"Error after retries: {str(e)}"
-
-        # Create and start one thread for each prompt
-        with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
-            future_to_index = {
-                executor.submit(worker, i, prompt): i
-                for i, prompt in enumerate(prompts)
-            }
-
-            for future in as_completed(future_to_index, timeout=timeout):
-                index = future_to_index[future]
-                try:
-                    results[index] = future.result()
-                except Exception as e:  # pylint: disable=broad-exception-caught
-                    print(f"Unhandled error for prompt {index}: {e}")
-                    results[index] = "Unhandled Error"
-
-        # Handle remaining unfinished tasks after the timeout
-        for future in future_to_index:
-            index = future_to_index[future]
-            if not future.done():
-                print(f"Timeout occurred for prompt {index}")
-                results[index] = "Timeout"
+        return await get_dispatcher().arun(
+            self._call_many(prompts, parser_func, timeout)
+        )
 
-        return results
+    def call_parallel(
+        self,
+        prompts: List[str],
+        parser_func: Optional[Callable[[str], str]] = None,
+        timeout: float = 60,
+    ) -> List[str]:
+        """Calls the Gemini model for multiple prompts concurrently.
+
+        Args:
+            prompts (List[str]): A list of prompts to call the model with.
+            parser_func (callable, optional): A function to process each response.
+            timeout (float): The maximum time (in seconds) to wait for each
+              response, retries included.
+
+        Returns:
+            List[str]:
+            A list of responses, or error messages for the prompts that failed
+            or timed out.
+        """
+        return get_dispatcher().run(self._call_many(prompts, parser_func, timeout))
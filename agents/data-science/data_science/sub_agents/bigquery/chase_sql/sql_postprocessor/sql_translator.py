@@ -114,6 +114,7 @@ class SqlTranslator:
         processed by the LLM.
       process_tool_output_errors: True if any errors in the tool output SQL query
         should be processed by the LLM.
+      output_dialect: The SQL dialect to translate to, OUTPUT_DIALECT by default.
     """
 
     INPUT_DIALECT: Final[str] = "sqlite"
@@ -125,8 +126,10 @@ class SqlTranslator:
         temperature: float = 0.5,
         process_input_errors: bool = False,
         process_tool_output_errors: bool = False,
+        output_dialect: str = OUTPUT_DIALECT,
     ):
         """Initializes the translator."""
+        self._output_dialect: str = output_dialect
         self._process_input_errors: bool = process_input_errors
         self._process_tool_output_errors: bool = process_tool_output_errors
         self._input_errors: str | None = None
@@ -379,7 +382,7 @@ class SqlTranslator:
         schema_dict = self.rewrite_schema_for_sqlglot(ddl_schema)
         errors_and_sql: tuple[str | None, str] = self._check_for_errors(
             sql_query=sql_query,
-            sql_dialect=self.OUTPUT_DIALECT,
+            sql_dialect=self._output_dialect,
             db=db,
             catalog=catalog,
             schema_dict=schema_dict,
@@ -441,7 +444,7 @@ class SqlTranslator:
                 sql_query,
                 db=db,
                 catalog=catalog,
-                sql_dialect=self.OUTPUT_DIALECT,
+                sql_dialect=self._output_dialect,
                 ddl_schema=ddl_schema,
                 apply_heuristics=True,
             )
@@ -449,7 +452,7 @@ class SqlTranslator:
         sql_query = sqlglot.transpile(
             sql=sql_query,
             read=self.INPUT_DIALECT,
-            write=self.OUTPUT_DIALECT,
+            write=self._output_dialect,
             error_level=sqlglot.ErrorLevel.IMMEDIATE,
         )[
             0
@@ -460,12 +463,14 @@ class SqlTranslator:
                 sql_query,
                 db=db,
                 catalog=catalog,
-                sql_dialect=self.OUTPUT_DIALECT,
+                sql_dialect=self._output_dialect,
                 ddl_schema=ddl_schema,
                 apply_heuristics=True,
             )
 
-        sql_query = sql_query.strip().replace('"', "`")
+        sql_query = sql_query.strip()
+        if self._output_dialect == "bigquery":
+            sql_query = sql_query.replace('"', "`")
         sql_query = self._apply_heuristics(sql_query)
 
         return sql_query
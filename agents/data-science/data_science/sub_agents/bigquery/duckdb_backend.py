@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Embedded DuckDB backend, for offline runs and small datasets.
+
+CSV files are loaded into an in-memory DuckDB database, as tables of a
+`project.dataset` named like the BigQuery dataset they stand in for. The schema
+is presented, and queries are accepted, in GoogleSQL, so the agent works the
+same as on BigQuery.
+"""
+
+import glob
+import logging
+import os
+
+import duckdb
+import pyarrow as pa
+import sqlglot
+from sqlglot import exp
+
+from .backends import QueryBackend
+from .tools import NUM_SAMPLE_ROWS, _serialize_value_for_sql
+
+DEFAULT_DATA_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "utils", "data"
+)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _bigquery_type(duckdb_type):
+    """GoogleSQL name of a DuckDB column type."""
+    try:
+        return exp.DataType.build(duckdb_type, dialect="duckdb").sql("bigquery")
+    except sqlglot.errors.SqlglotError:
+        return duckdb_type
+
+
+class DuckDBBackend(QueryBackend):
+    """Runs the agent's queries on an embedded DuckDB database."""
+
+    def __init__(self):
+        self.connection = duckdb.connect(":memory:")
+
+    def load_csv_dir(self, project_id, dataset_id, data_dir=DEFAULT_DATA_DIR):
+        """Loads every CSV file of a directory as a table of the dataset.
+
+        Args:
+            project_id (str): Project the tables are created under.
+            dataset_id (str): Dataset the tables are created under.
+            data_dir (str): Directory of the CSV files, each loaded as a table
+              named after the file.
+        """
+        catalog = _quote(project_id)
+        schema = f"{catalog}.{_quote(dataset_id)}"
+        self.connection.execute(f"ATTACH IF NOT EXISTS ':memory:' AS {catalog}")
+        self.connection.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for path in sorted(glob.glob(os.path.join(data_dir, "*.csv"))):
+            table = os.path.splitext(os.path.basename(path))[0]
+            self.connection.execute(
+                f"CREATE OR REPLACE TABLE {schema}.{_quote(table)} AS"
+                " SELECT * FROM read_csv_auto(?)",
+                [path],
+            )
+            logging.info(f"Loaded {path} into {project_id}.{dataset_id}.{table}")
+
+    def get_schema(self, project_id, dataset_id, warm_start=False):
+        cursor = self.connection.cursor()
+        columns = cursor.execute(
+            "SELECT table_name, column_name, data_type"
+            " FROM information_schema.columns"
+            " WHERE table_catalog = ? AND table_schema = ?"
+            " ORDER BY table_name, ordinal_position",
+            [project_id, dataset_id],
+        ).fetchall()
+        tables = {}
+        for table_name, column_name, data_type in columns:
+            tables.setdefault(table_name, []).append((column_name, data_type))
+
+        ddl_statements = []
+        for table_name, table_columns in tables.items():
+            table_ref = f"{project_id}.{dataset_id}.{table_name}"
+            column_defs = ",\n".join(
+                f"  `{name}` {_bigquery_type(data_type)}"
+                for name, data_type in table_columns
+            )
+            ddl = f"CREATE OR REPLACE TABLE `{table_ref}` (\n{column_defs}\n);\n\n"
+            rows = cursor.execute(
+                f"SELECT * FROM {_quote(project_id)}.{_quote(dataset_id)}"
+                f".{_quote(table_name)} LIMIT {NUM_SAMPLE_ROWS}"
+            ).fetch_arrow_table().to_pandas()
+            if not rows.empty:
+                ddl += f"-- Example values for table `{table_ref}`:\n"
+                for _, row in rows.iterrows():
+                    values = ", ".join(_serialize_value_for_sql(v) for v in row.values)
+                    ddl += f"INSERT INTO `{table_ref}` VALUES ({values});\n\n"
+            ddl_statements.append(ddl)
+        return "".join(ddl_statements)
+
+    def run_query(self, sql, max_rows, canceller=None):
+        sql = sqlglot.transpile(
+            sql,
+            read=self.sql_dialect,
+            write="duckdb",
+            error_level=sqlglot.ErrorLevel.IMMEDIATE,
+        )[0]
+        # Cursors are independent connections to the same database, so
+        # concurrent sessions don't share one.
+        cursor = self.connection.cursor()
+        if canceller is not None:
+            canceller.on_start(cursor.interrupt)
+            if canceller.cancelled:
+                raise duckdb.InterruptException("Query cancelled")
+        result = cursor.execute(sql)
+        if result.description is None:
+            return None, 0
+        reader = result.fetch_record_batch(max_rows)
+        batches = []
+        total_rows = 0
+        for batch in reader:
+            if total_rows < max_rows:
+                batches.append(batch.slice(0, max_rows - total_rows))
+            total_rows += batch.num_rows
+        return pa.Table.from_batches(batches, schema=reader.schema), total_rows
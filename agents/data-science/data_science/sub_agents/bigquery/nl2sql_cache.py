@@ -0,0 +1,283 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Cache of generated SQL by question, shared across processes via SQLite.
+
+Entries are keyed on the normalized question, a hash of the schema in the
+prompt, the generation method and the model. Optionally, a question with no
+exact entry is matched to the most similar cached question (token overlap)
+for the same schema, method and model, unless the two questions differ in a
+value that changes the SQL: a number, a quoted string, a month or weekday, or
+a table, column or sample value of the schema.
+"""
+
+import contextlib
+import functools
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from .schema_index import tokenize
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "data_science", "nl2sql_cache.sqlite3"
+)
+# Number of recent entries compared in similarity lookups
+MAX_SIMILARITY_CANDIDATES = 1000
+
+# Words that are filter values rather than phrasing
+DATE_WORDS = frozenset(
+    tokenize(
+        "january february march april may june july august september october"
+        " november december jan feb mar apr jun jul aug sep sept oct nov dec"
+        " monday tuesday wednesday thursday friday saturday sunday"
+    )
+)
+QUOTED = re.compile(r"""(?<!\w)(["'`])(.+?)\1(?!\w)""")
+
+
+def normalize_question(question):
+    """Lowercases a question and collapses whitespace and trailing punctuation."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!").strip().lower()
+
+
+def schema_hash(ddl_schema):
+    return hashlib.sha256(ddl_schema.encode()).hexdigest()
+
+
+def similarity(a, b):
+    """Jaccard similarity of the token sets of two questions."""
+    a, b = set(tokenize(a)), set(tokenize(b))
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@functools.lru_cache(maxsize=4)
+def schema_value_tokens(ddl_schema):
+    """Tokens of the table and column names and sample values of a schema."""
+    identifiers = re.findall(r"`([^`]+)`", ddl_schema)
+    values = re.findall(r"(?m)^INSERT INTO `[^`]+` VALUES \((.*)\);$", ddl_schema)
+    return frozenset(tokenize(" ".join(identifiers + values)))
+
+
+def differ_in_values(a, b, value_tokens):
+    """Whether two questions differ in a token that is likely a SQL value.
+
+    Args:
+        a (str): A question.
+        b (str): Another question.
+        value_tokens (frozenset): Tokens of the schema's names and values.
+
+    Returns:
+        bool: True if a differing token is a number, a date word, part of a
+          quoted string or one of `value_tokens`.
+    """
+    quoted = {
+        token
+        for question in (a, b)
+        for match in QUOTED.finditer(question)
+        for token in tokenize(match.group(2))
+    }
+    return any(
+        token in value_tokens
+        or token in quoted
+        or token in DATE_WORDS
+        or any(c.isdigit() for c in token)
+        for token in set(tokenize(a)) ^ set(tokenize(b))
+    )
+
+
+class NL2SQLCache:
+    """SQLite-backed question -> SQL cache with a TTL and a size bound."""
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl_seconds=24 * 3600,
+        max_entries=10000,
+        similarity_threshold=None,
+    ):
+        """Initializes the cache, creating the database if needed.
+
+        Args:
+            path (str): SQLite database file, shared by all processes using it.
+            ttl_seconds (float): Age after which entries are no longer served.
+            max_entries (int): Entries kept; the least recently used are evicted.
+            similarity_threshold (float): If set, serve the most similar cached
+              question with at least this similarity (0 to 1) on exact misses.
+
+        Raises:
+            OSError: If the cache directory can't be created.
+            sqlite3.Error: If the database can't be opened or initialized.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS nl2sql (
+                    question TEXT NOT NULL,
+                    schema_hash TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (question, schema_hash, method, model)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS nl2sql_last_used ON nl2sql (last_used_at)"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # One short-lived connection per operation, so the cache can be used
+        # from any thread and by several processes at once
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, question, ddl_schema, method, model):
+        """Returns the cached SQL for a question, or None on a miss."""
+        question = normalize_question(question)
+        key = (schema_hash(ddl_schema), method, model or "")
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT question, sql FROM nl2sql WHERE question = ?"
+                    " AND schema_hash = ? AND method = ? AND model = ?"
+                    " AND created_at > ?",
+                    (question, *key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is None and self.similarity_threshold is not None:
+                    row = self._most_similar(conn, question, ddl_schema, key, now)
+                if row is not None:
+                    conn.execute(
+                        "UPDATE nl2sql SET last_used_at = ? WHERE question = ?"
+                        " AND schema_hash = ? AND method = ? AND model = ?",
+                        (now, row[0], *key),
+                    )
+        except sqlite3.Error as e:
+            logging.warning(f"NL2SQL cache lookup failed: {e}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[1]
+
+    def _most_similar(self, conn, question, ddl_schema, key, now):
+        candidates = conn.execute(
+            "SELECT question, sql FROM nl2sql WHERE schema_hash = ? AND method = ?"
+            " AND model = ? AND created_at > ? ORDER BY last_used_at DESC LIMIT ?",
+            (*key, now - self.ttl_seconds, MAX_SIMILARITY_CANDIDATES),
+        ).fetchall()
+        value_tokens = schema_value_tokens(ddl_schema)
+        best, best_score = None, self.similarity_threshold
+        for candidate in candidates:
+            score = similarity(question, candidate[0])
+            if score >= best_score and not differ_in_values(
+                question, candidate[0], value_tokens
+            ):
+                best, best_score = candidate, score
+        return best
+
+    def put(self, question, ddl_schema, method, model, sql):
+        """Stores the SQL generated for a question, evicting old entries."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO nl2sql VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        normalize_question(question),
+                        schema_hash(ddl_schema),
+                        method,
+                        model or "",
+                        sql,
+                        now,
+                        now,
+                    ),
+                )
+                conn.execute(
+                    "DELETE FROM nl2sql WHERE created_at <= ?",
+                    (now - self.ttl_seconds,),
+                )
+                conn.execute(
+                    "DELETE FROM nl2sql WHERE rowid NOT IN (SELECT rowid FROM"
+                    " nl2sql ORDER BY last_used_at DESC LIMIT ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"NL2SQL cache update failed: {e}")
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+_cache = None
+_cache_disabled = False
+_cache_lock = threading.Lock()
+
+
+def get_nl2sql_cache():
+    """Returns the process-wide NL2SQL cache, or None if it is disabled.
+
+    Configured with NL2SQL_CACHE_PATH (set to '' to disable),
+    NL2SQL_CACHE_TTL_SECONDS, NL2SQL_CACHE_MAX_ENTRIES and
+    NL2SQL_CACHE_SIMILARITY (a threshold between 0 and 1; unset to only serve
+    exact matches). If the database can't be opened, the cache is disabled
+    for the life of the process.
+    """
+    global _cache, _cache_disabled
+    path = os.getenv("NL2SQL_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_disabled:
+            threshold = os.getenv("NL2SQL_CACHE_SIMILARITY")
+            try:
+                _cache = NL2SQLCache(
+                    path,
+                    ttl_seconds=float(
+                        os.getenv("NL2SQL_CACHE_TTL_SECONDS", 24 * 3600)
+                    ),
+                    max_entries=int(os.getenv("NL2SQL_CACHE_MAX_ENTRIES", 10000)),
+                    similarity_threshold=float(threshold) if threshold else None,
+                )
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"NL2SQL cache disabled: {e}")
+                _cache_disabled = True
+    return _cache
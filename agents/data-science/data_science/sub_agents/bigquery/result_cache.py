@@ -0,0 +1,212 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory cache of BigQuery query results, shared by all sessions.
+
+Queries are keyed on a fingerprint of their parsed SQL, which ignores
+whitespace, keyword casing, comments and table alias names, together with the
+last modification time of every table they read. Queries that are not
+deterministic (including TABLESAMPLE), or that read views, external tables, wildcard tables or tables
+with a streaming buffer, are never cached.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import sqlglot
+from sqlglot import exp
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Functions whose result changes between runs of the same query
+NONDETERMINISTIC_FUNCTIONS = frozenset(
+    {
+        "CURRENT_DATE",
+        "CURRENT_DATETIME",
+        "CURRENT_TIME",
+        "CURRENT_TIMESTAMP",
+        "RAND",
+        "UUID",
+        "SESSION_USER",
+    }
+)
+# Tables whose modification time reflects any change to their contents
+CACHEABLE_TABLE_TYPES = ("TABLE", "SNAPSHOT")
+
+
+def canonical_sql(sql):
+    """Parses BigQuery SQL and returns its canonical text and tables read.
+
+    Returns:
+        tuple: The canonical SQL and the sorted (project, dataset, table)
+          names of the tables read, or None if the query cannot be cached.
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read="bigquery")
+    except sqlglot.errors.ParseError:
+        return None
+    if not isinstance(tree, exp.Query):
+        return None
+    if tree.find(exp.TableSample):
+        # Each run samples different blocks of the table
+        return None
+    for func in tree.find_all(exp.Func):
+        name = func.name if isinstance(func, exp.Anonymous) else func.sql_name()
+        if name.upper() in NONDETERMINISTIC_FUNCTIONS:
+            return None
+
+    cte_names = {cte.alias_or_name.lower() for cte in tree.find_all(exp.CTE)}
+    tables = set()
+    aliases = {}
+    for table in tree.find_all(exp.Table):
+        if not table.db and table.name.lower() in cte_names:
+            continue
+        if not table.db or "*" in table.name:
+            return None
+        if "information_schema" in f"{table.db}.{table.name}".lower():
+            return None
+        tables.add((table.catalog, table.db, table.name))
+        if table.alias:
+            # Alias names are case insensitive in BigQuery
+            canonical = aliases.setdefault(
+                table.alias.lower(), f"__alias{len(aliases)}"
+            )
+            table.args["alias"].set("this", exp.to_identifier(canonical))
+    for column in tree.find_all(exp.Column):
+        if column.table.lower() in aliases:
+            column.set("table", exp.to_identifier(aliases[column.table.lower()]))
+
+    return tree.sql(dialect="bigquery", comments=False), sorted(tables)
+
+
+class ResultCache:
+    """LRU cache of query results, bounded by their JSON-encoded size."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, client, sql):
+        """Fingerprints a query, or returns None if it cannot be cached.
+
+        Args:
+            client (bigquery.Client): Client used to look up the tables read.
+            sql (str): The query.
+
+        Returns:
+            str: A fingerprint of the canonical query and the modification time
+              of every table it reads.
+        """
+        parsed = canonical_sql(sql)
+        if parsed is None:
+            return None
+        canonical, tables = parsed
+        table_ids = [
+            f"{project or client.project}.{dataset}.{table}"
+            for project, dataset, table in tables
+        ]
+        try:
+            if len(table_ids) > 1:
+                with ThreadPoolExecutor(max_workers=len(table_ids)) as executor:
+                    table_objs = list(executor.map(client.get_table, table_ids))
+            else:
+                table_objs = [client.get_table(t) for t in table_ids]
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.info(f"Not caching query result: {e}")
+            return None
+        versions = []
+        for table_id, table_obj in zip(table_ids, table_objs):
+            if (
+                table_obj.table_type not in CACHEABLE_TABLE_TYPES
+                or table_obj.streaming_buffer is not None
+                or table_obj.modified is None
+            ):
+                return None
+            versions.append(f"{table_id}@{table_obj.modified.isoformat()}")
+        return hashlib.sha256("\n".join([canonical, *versions]).encode()).hexdigest()
+
+    def get(self, key):
+        """Returns the cached result for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            logging.info(
+                "Query result cache hit rate: %.1f%% (%d/%d)",
+                100 * self.hit_rate,
+                self.hits,
+                self.hits + self.misses,
+            )
+        return None if entry is None else entry[0]
+
+    def put(self, key, value):
+        """Caches a JSON-serializable result, evicting least recently used ones."""
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.num_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.num_bytes += size
+            while self.num_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.num_bytes -= evicted_size
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Returns the hit and size counters of the cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "entries": len(self._entries),
+                "bytes": self.num_bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Returns the process-wide result cache, or None if it is disabled.
+
+    Its size is set with BQ_RESULT_CACHE_MAX_BYTES (0 disables it).
+    """
+    global _cache
+    max_bytes = int(os.getenv("BQ_RESULT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    if max_bytes <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(max_bytes)
+    return _cache
@@ -0,0 +1,124 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar hand-off of query results from the database agent to the ds agent.
+
+A query result is stored in the session state as a compressed Parquet file
+(base64-encoded), along with its schema, per-column summary statistics and a
+few preview rows. The analytics agent's prompt only gets the description and
+preview; the file itself is passed to its code executor to be loaded there.
+"""
+
+import base64
+import datetime
+import decimal
+import hashlib
+import io
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+PREVIEW_ROWS = 5
+PARQUET_MIME_TYPE = "application/vnd.apache.parquet"
+RESULT_FILE_PREFIX = "query_result_"
+
+
+def _json_value(value):
+    """Converts an Arrow scalar's Python value into a JSON-friendly one."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def column_stats(column):
+    """Summary statistics of an Arrow column (nulls, range, mean, distinct)."""
+    stats = {"null_count": column.null_count}
+    type_ = column.type
+    if pa.types.is_nested(type_) or len(column) == column.null_count:
+        return stats
+    if (
+        pa.types.is_integer(type_)
+        or pa.types.is_floating(type_)
+        or pa.types.is_decimal(type_)
+    ):
+        min_max = pc.min_max(column).as_py()
+        stats["min"] = _json_value(min_max["min"])
+        stats["max"] = _json_value(min_max["max"])
+        stats["mean"] = _json_value(pc.mean(column).as_py())
+    elif pa.types.is_temporal(type_):
+        min_max = pc.min_max(column).as_py()
+        stats["min"] = _json_value(min_max["min"])
+        stats["max"] = _json_value(min_max["max"])
+    elif pa.types.is_string(type_) or pa.types.is_large_string(type_):
+        stats["distinct_count"] = pc.count_distinct(column).as_py()
+    return stats
+
+
+def describe_result(table, preview, total_rows):
+    """Packs a query result for the state, as Parquet plus its description.
+
+    Args:
+        table (pyarrow.Table): The fetched rows of the result.
+        preview (list): The first rows, formatted as in the tool response.
+        total_rows (int): Number of rows of the full result.
+
+    Returns:
+        dict: The file name, base64-encoded Parquet data, row counts, schema,
+          column statistics and preview of the result.
+    """
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    data = buffer.getvalue()
+    return {
+        "file_name": (
+            f"{RESULT_FILE_PREFIX}{hashlib.sha256(data).hexdigest()[:12]}.parquet"
+        ),
+        "data": base64.b64encode(data).decode(),
+        "num_rows": table.num_rows,
+        "total_rows": total_rows,
+        "schema": [
+            {"name": field.name, "type": str(field.type)} for field in table.schema
+        ],
+        "stats": {
+            name: column_stats(column)
+            for name, column in zip(table.column_names, table.columns)
+        },
+        "preview": [
+            {key: _json_value(value) for key, value in row.items()}
+            for row in preview[:PREVIEW_ROWS]
+        ],
+    }
+
+
+def describe_for_prompt(result):
+    """Describes a packed query result for the analytics agent's prompt."""
+    rows = f"{result['num_rows']} rows"
+    if result["total_rows"] > result["num_rows"]:
+        rows += f", the first of {result['total_rows']}"
+    columns = "\n".join(
+        f"  - {column['name']} ({column['type']}): {result['stats'][column['name']]}"
+        for column in result["schema"]
+    )
+    return f"""The data to analyze is in the file `{result['file_name']}` ({rows}).
+  Load it with `pd.read_parquet('{result['file_name']}')`.
+
+  Columns and summary statistics:
+{columns}
+
+  First rows:
+  {result['preview']}
+"""
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""On-disk cache of the per-table DDL used as the BigQuery schema."""
+
+import json
+import logging
+import os
+import tempfile
+
+# Bump when the cached DDL format changes, so stale caches are rebuilt.
+SCHEMA_CACHE_VERSION = 1
+
+DEFAULT_SCHEMA_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "data_science", "bq_schema"
+)
+
+
+class SchemaCache:
+    """Stores one JSON file per (project, dataset) under a cache directory.
+
+    Each file maps table names to their type, `last_modified_time` and DDL
+    (including the sample rows), so a table only needs to be introspected again
+    once it has been modified.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_SCHEMA_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, project_id, dataset_id):
+        return os.path.join(self.cache_dir, f"{project_id}.{dataset_id}.json")
+
+    def load(self, project_id, dataset_id):
+        """Loads the cached tables of a dataset.
+
+        Returns:
+            dict: Table name -> {"table_type", "last_modified_time", "ddl"}, or
+              None if there is no usable cache.
+        """
+        try:
+            with open(self.path(project_id, dataset_id)) as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable schema cache: {e}")
+            return None
+        if cached.get("version") != SCHEMA_CACHE_VERSION:
+            return None
+        return cached["tables"]
+
+    def save(self, project_id, dataset_id, tables):
+        """Atomically replaces the cached tables of a dataset."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        contents = {
+            "version": SCHEMA_CACHE_VERSION,
+            "project_id": project_id,
+            "dataset_id": dataset_id,
+            "tables": tables,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(contents, f)
+            os.replace(tmp_path, self.path(project_id, dataset_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def load_ddl(self, project_id, dataset_id):
+        """Assembles the cached DDL of a dataset, or returns None if not cached."""
+        tables = self.load(project_id, dataset_id)
+        if tables is None:
+            return None
+        return "".join(tables[name]["ddl"] for name in sorted(tables))
@@ -0,0 +1,268 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Question-relevant pruning of the BigQuery DDL schema for prompts.
+
+The DDL schema is split into one block per table (its CREATE statement and
+sample INSERTs). Blocks are ranked against the question with BM25 over the
+table name, column names, descriptions and sample values, and the top tables,
+plus any table needed to join them, are packed into a token budget. Schemas
+that already fit the budget are returned unchanged.
+"""
+
+from collections import Counter
+from collections import deque
+import functools
+import math
+import os
+import re
+
+DEFAULT_TOP_K = int(os.getenv("BQ_SCHEMA_TOP_K", "10"))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("BQ_SCHEMA_TOKEN_BUDGET", "16000"))
+
+# Extra weight of table and column names over descriptions and sample values
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 2
+
+# Columns treated as join keys when two tables share them: snake_case names
+# ending in an id, key or code suffix, in any case, and camelCase ones. Bare
+# `id`, `key` and `code` columns are each table's own, so they are not keys.
+KEY_COLUMN = re.compile(r"(?i:_(id|key|code))$|[a-z](Id|ID|Key|Code)$")
+MAX_JOIN_KEYS = 20
+# Most intermediate tables added to join two selected tables
+MAX_BRIDGE_TABLES = 3
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it me of on or show the "
+    "to was what when where which who with".split()
+)
+
+
+def estimate_tokens(text):
+    """Rough token count of `text` (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def tokenize(text):
+    """Lowercased word tokens, with identifiers split on `_` and camelCase."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class TableEntry:
+    """One table of the schema, with its DDL block and term frequencies."""
+
+    def __init__(self, block):
+        self.block = block
+        match = re.search(r"`([^`]+)`", block)
+        self.name = match.group(1) if match else ""
+        # The DDL without the sample rows, used when the full block won't fit
+        self.ddl_only = block.split("-- Example values", 1)[0].rstrip("\n") + "\n\n"
+        self.columns = set(re.findall(r"(?m)^\s+`([^`]+)`", block))
+        self.keys = {c for c in self.columns if KEY_COLUMN.search(c)}
+        terms = tokenize(block)
+        terms += tokenize(self.name.rsplit(".", 1)[-1]) * TABLE_NAME_WEIGHT
+        for column in self.columns:
+            terms += tokenize(column) * COLUMN_NAME_WEIGHT
+        self.term_counts = Counter(terms)
+        self.length = len(terms)
+
+
+def split_ddl(ddl_schema):
+    """Splits a DDL schema into per-table blocks, in schema order."""
+    return [
+        block
+        for block in re.split(r"(?m)^(?=CREATE )", ddl_schema)
+        if block.startswith("CREATE ")
+    ]
+
+
+class SchemaIndex:
+    """BM25 index over the tables of a DDL schema."""
+
+    def __init__(self, ddl_schema):
+        self.ddl_schema = ddl_schema
+        self.tables = [TableEntry(block) for block in split_ddl(ddl_schema)]
+        self.document_frequency = Counter()
+        for table in self.tables:
+            self.document_frequency.update(table.term_counts.keys())
+        self.average_length = sum(t.length for t in self.tables) / max(
+            len(self.tables), 1
+        )
+
+    def scores(self, question):
+        """BM25 score of every table against `question`, in schema order."""
+        terms = set(tokenize(question))
+        num_tables = len(self.tables)
+        scores = []
+        for table in self.tables:
+            score = 0.0
+            for term in terms:
+                tf = table.term_counts.get(term, 0)
+                if not tf:
+                    continue
+                df = self.document_frequency[term]
+                idf = math.log(1 + (num_tables - df + 0.5) / (df + 0.5))
+                norm = BM25_K1 * (
+                    1 - BM25_B + BM25_B * table.length / self.average_length
+                )
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def _join_keys(self, i, j):
+        """Key-like columns (ids, keys, codes) shared by two tables."""
+        return sorted(self.tables[i].keys & self.tables[j].keys)
+
+    @functools.cached_property
+    def _neighbours(self):
+        """For each table, the tables sharing a join key with it."""
+        return [
+            [j for j in range(len(self.tables)) if j != i and self._join_keys(i, j)]
+            for i in range(len(self.tables))
+        ]
+
+    def _join_path(self, i, j):
+        """Tables between `i` and `j` on a shortest join path, or None.
+
+        Breadth-first search over shared key columns, going through at most
+        MAX_BRIDGE_TABLES intermediate tables.
+        """
+        previous = {i: None}
+        frontier = deque([(i, 0)])
+        while frontier:
+            k, depth = frontier.popleft()
+            if depth > MAX_BRIDGE_TABLES:
+                break
+            for n in self._neighbours[k]:
+                if n in previous:
+                    continue
+                previous[n] = k
+                if n == j:
+                    path = []
+                    while previous[n] != i:
+                        n = previous[n]
+                        path.append(n)
+                    return path[::-1]
+                frontier.append((n, depth + 1))
+        return None
+
+    def _bridges(self, selected):
+        """Tables joining two selected tables that share no key directly."""
+        bridges = []
+        for a, i in enumerate(selected):
+            for j in selected[a + 1 :]:
+                if self._join_keys(i, j):
+                    continue
+                for k in self._join_path(i, j) or ():
+                    if k not in selected and k not in bridges:
+                        bridges.append(k)
+        return bridges
+
+    def prune(self, question, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Returns the part of the schema most relevant to `question`.
+
+        Args:
+            question (str): Natural language question.
+            top_k (int): Maximum number of tables ranked by relevance to keep,
+              not counting the tables needed to join them.
+            token_budget (int): Approximate token budget of the result.
+
+        Returns:
+            str: The pruned DDL schema, or the whole schema if it fits.
+        """
+        if estimate_tokens(self.ddl_schema) <= token_budget or not self.tables:
+            return self.ddl_schema
+
+        scores = self.scores(question)
+        ranked = sorted(range(len(self.tables)), key=lambda i: (-scores[i], i))
+        selected = ranked[:top_k]
+        candidates = selected + self._bridges(selected)
+
+        blocks = {}
+        used = 0
+        for i in candidates:
+            table = self.tables[i]
+            block = next(
+                (
+                    block
+                    for block in (table.block, table.ddl_only)
+                    if used + estimate_tokens(block) <= token_budget
+                ),
+                None,
+            )
+            if block is None and not blocks:
+                # Always keep the most relevant table, even if over budget
+                block = table.ddl_only
+            if block is not None:
+                blocks[i] = block
+                used += estimate_tokens(block)
+
+        # Most relevant tables first
+        kept = list(blocks)
+        join_keys = [
+            f"`{self.tables[i].name}`.{key} = `{self.tables[j].name}`.{key}"
+            for a, i in enumerate(kept)
+            for j in kept[a + 1 :]
+            for key in self._join_keys(i, j)
+        ][:MAX_JOIN_KEYS]
+        header = (
+            f"-- Showing the {len(kept)} of {len(self.tables)} tables most "
+            "relevant to the question.\n"
+        )
+        if join_keys:
+            header += f"-- Join keys: {'; '.join(join_keys)}\n"
+        return header + "\n" + "".join(blocks[i] for i in kept)
+
+
+@functools.lru_cache(maxsize=4)
+def get_schema_index(ddl_schema):
+    """Builds (once per schema) the index of a DDL schema."""
+    return SchemaIndex(ddl_schema)
+
+
+def content_text(content):
+    """The text of a `types.Content` (e.g. the user's message), or ""."""
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text or "" for part in content.parts)
+
+
+def select_schema(database_settings, question):
+    """The DDL schema from `database_settings`, pruned for `question`.
+
+    The number of tables and the token budget come from the `schema_top_k`
+    and `schema_token_budget` settings, falling back to the BQ_SCHEMA_TOP_K
+    and BQ_SCHEMA_TOKEN_BUDGET environment variables.
+    """
+    ddl_schema = database_settings["bq_ddl_schema"]
+    if not question:
+        return ddl_schema
+    return get_schema_index(ddl_schema).prune(
+        question,
+        top_k=database_settings.get("schema_top_k", DEFAULT_TOP_K),
+        token_budget=database_settings.get(
+            "schema_token_budget", DEFAULT_TOKEN_BUDGET
+        ),
+    )
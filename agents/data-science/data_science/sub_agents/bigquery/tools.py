@@ -14,6 +14,8 @@
 
 """This file contains the tools used by the database agent."""
 
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import logging
 import os
@@ -21,12 +23,20 @@ import re
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from data_science.utils.utils import get_env_var
 from google.adk.tools import ToolContext
 from google.cloud import bigquery
 from google.genai import Client
 
+from .backends import QueryBackend
 from .chase_sql import chase_constants
+from .nl2sql_cache import get_nl2sql_cache
+from .result_cache import get_result_cache
+from .result_data import describe_result
+from .schema_cache import DEFAULT_SCHEMA_CACHE_DIR, SchemaCache
+from .schema_index import select_schema
 
 # Assume that `BQ_COMPUTE_PROJECT_ID` and `BQ_DATA_PROJECT_ID` are set in the
 # environment. See the `data_agent` README for more details.
@@ -37,6 +47,19 @@ location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
 llm_client = Client(vertexai=True, project=vertex_project, location=location)
 
 MAX_NUM_ROWS = 80
+# Sample rows shown per table in the schema, and the number of tables sampled
+# concurrently during schema introspection.
+NUM_SAMPLE_ROWS = 5
+SCHEMA_MAX_WORKERS = int(os.getenv("BQ_SCHEMA_MAX_WORKERS", "8"))
+# INFORMATION_SCHEMA table types whose DDL includes sample rows.
+BASE_TABLE_TYPES = ("BASE TABLE", "CLONE")
+# Statements (DML and DDL) that the agent may not run
+DISALLOWED_SQL = re.compile(
+    r"(?i)(update|delete|drop|insert|create|alter|truncate|merge)"
+)
+# Read query results through the BigQuery Storage Read API (requires the
+# google-cloud-bigquery-storage package), which is faster for wide results.
+RESULT_STORAGE_API = os.getenv("BQ_RESULT_STORAGE_API", "0") == "1"
 
 
 def _serialize_value_for_sql(value):
@@ -63,6 +86,8 @@ def _serialize_value_for_sql(value):
 
 database_settings = None
 bq_client = None
+bqstorage_client = None
+backend = None
 
 
 def get_bq_client():
@@ -74,6 +99,23 @@ def get_bq_client():
     return bq_client
 
 
+def get_bqstorage_client():
+    """Get BigQuery Storage Read API client, or None if it is not installed."""
+    global bqstorage_client
+    if bqstorage_client is None:
+        try:
+            # pylint: disable-next=import-outside-toplevel
+            from google.cloud import bigquery_storage
+        except ImportError:
+            logging.warning(
+                "google-cloud-bigquery-storage is not installed, reading query"
+                " results through the REST API."
+            )
+            return None
+        bqstorage_client = bigquery_storage.BigQueryReadClient()
+    return bqstorage_client
+
+
 def get_database_settings():
     """Get database settings."""
     global database_settings
@@ -82,14 +124,96 @@ def get_database_settings():
     return database_settings
 
 
-def update_database_settings():
-    """Update database settings."""
+def get_schema_cache():
+    """Get the on-disk schema cache, or None if BQ_SCHEMA_CACHE_DIR is empty."""
+    cache_dir = os.getenv("BQ_SCHEMA_CACHE_DIR", DEFAULT_SCHEMA_CACHE_DIR)
+    return SchemaCache(cache_dir) if cache_dir else None
+
+
+class BigQueryBackend(QueryBackend):
+    """Runs the agent's queries on BigQuery."""
+
+    @property
+    def client(self):
+        return get_bq_client()
+
+    def get_schema(self, project_id, dataset_id, warm_start=False):
+        cache = get_schema_cache()
+        if warm_start and cache is not None:
+            ddl_schema = cache.load_ddl(project_id, dataset_id)
+            if ddl_schema is not None:
+                return ddl_schema
+        return get_bigquery_schema(
+            dataset_id=dataset_id,
+            data_project_id=project_id,
+            client=self.client,
+            compute_project_id=get_env_var("BQ_COMPUTE_PROJECT_ID"),
+            cache=cache,
+        )
+
+    def run_query(self, sql, max_rows, canceller=None):
+        query_job = self.client.query(sql)
+        if canceller is not None:
+            canceller.on_start(query_job.cancel)
+        results, table = _fetch_result(query_job, max_rows)
+        if not results.schema:
+            return None, 0
+        if table is None:
+            table = pa.table({})
+        total_rows = results.total_rows
+        if total_rows is None:
+            total_rows = table.num_rows
+        return table, total_rows
+
+    def result_cache_key(self, sql):
+        cache = get_result_cache()
+        return cache.key(self.client, sql) if cache else None
+
+
+def get_backend():
+    """Get the query backend selected by the DATABASE_BACKEND env variable.
+
+    `bigquery` (the default) queries BigQuery. `duckdb` loads the CSV files of
+    DUCKDB_DATA_DIR (by default the sample data) into an embedded database.
+    """
+    global backend
+    if backend is None:
+        name = os.getenv("DATABASE_BACKEND", "bigquery").lower()
+        if name == "bigquery":
+            backend = BigQueryBackend()
+        elif name == "duckdb":
+            # pylint: disable-next=import-outside-toplevel
+            from .duckdb_backend import DEFAULT_DATA_DIR, DuckDBBackend
+
+            backend = DuckDBBackend()
+            backend.load_csv_dir(
+                get_env_var("BQ_DATA_PROJECT_ID"),
+                get_env_var("BQ_DATASET_ID"),
+                os.getenv("DUCKDB_DATA_DIR", DEFAULT_DATA_DIR),
+            )
+        else:
+            raise ValueError(f"Unsupported DATABASE_BACKEND: {name}")
+    return backend
+
+
+def update_database_settings(warm_start=None):
+    """Update database settings.
+
+    The schema is refreshed through the on-disk schema cache, so only tables
+    modified since they were cached are introspected again.
+
+    Args:
+        warm_start (bool): If true and the dataset is cached, use the cached
+          schema as is, without any BigQuery calls. Defaults to the
+          BQ_SCHEMA_WARM_START environment variable.
+    """
     global database_settings
-    ddl_schema = get_bigquery_schema(
-        dataset_id=get_env_var("BQ_DATASET_ID"),
-        data_project_id=get_env_var("BQ_DATA_PROJECT_ID"),
-        client=get_bq_client(),
-        compute_project_id=get_env_var("BQ_COMPUTE_PROJECT_ID")
+    if warm_start is None:
+        warm_start = os.getenv("BQ_SCHEMA_WARM_START", "").lower() in ("1", "true")
+    ddl_schema = get_backend().get_schema(
+        get_env_var("BQ_DATA_PROJECT_ID"),
+        get_env_var("BQ_DATASET_ID"),
+        warm_start=warm_start,
     )
     database_settings = {
         "bq_project_id": get_env_var("BQ_DATA_PROJECT_ID"),
@@ -101,70 +225,137 @@ def update_database_settings():
     return database_settings
 
 
-def get_bigquery_schema(dataset_id,
-                        data_project_id,
-                        client=None,
-                        compute_project_id=None):
-    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
+def _list_tables(client, data_project_id, dataset_id):
+    """Lists the tables of a dataset with their type, view definition and
+    last modification time.
 
-    Args:
-        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
-        data_project_id (str): Project used for BQ data.
-        client (bigquery.Client): A BigQuery client.
-        compute_project_id (str): Project used for BQ compute.
+    Query INFORMATION_SCHEMA to robustly list tables. This is the recommended
+    approach when a dataset may contain BigLake tables like Apache Iceberg,
+    as the tables.list API can fail in those cases.
 
     Returns:
-        str: A string containing the generated DDL statements.
+        list: Rows of (table_name, table_type, view_definition,
+          last_modified_time), by table name.
+    """
+    prefix = f"{data_project_id}.{dataset_id}.INFORMATION_SCHEMA"
+    query = f"""
+        SELECT t.table_name, t.table_type, v.view_definition, m.last_modified_time
+        FROM `{prefix}.TABLES` AS t
+        LEFT JOIN `{prefix}.VIEWS` AS v USING (table_name)
+        LEFT JOIN `{data_project_id}.{dataset_id}.__TABLES__` AS m
+          ON m.table_id = t.table_name
+        ORDER BY t.table_name
     """
+    return list(client.query(query).result())
 
-    if client is None:
-        client = bigquery.Client(project=compute_project_id)
 
-    # dataset_ref = client.dataset(dataset_id)
-    dataset_ref = bigquery.DatasetReference(data_project_id, dataset_id)
+def _list_columns(client, data_project_id, dataset_id, table_names):
+    """Fetches the columns of the given tables of a dataset with a single query.
+
+    Returns:
+        dict: Table name -> list of (column_name, data_type, description), in
+          column order.
+    """
+    prefix = f"{data_project_id}.{dataset_id}.INFORMATION_SCHEMA"
+    query = f"""
+        SELECT c.table_name, c.column_name, c.data_type, p.description
+        FROM `{prefix}.COLUMNS` AS c
+        LEFT JOIN `{prefix}.COLUMN_FIELD_PATHS` AS p
+          ON p.table_name = c.table_name
+          AND p.column_name = c.column_name
+          AND p.field_path = c.column_name
+        WHERE c.is_hidden = 'NO' AND c.table_name IN UNNEST(@table_names)
+        ORDER BY c.table_name, c.ordinal_position
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[
+            bigquery.ArrayQueryParameter("table_names", "STRING", table_names)
+        ]
+    )
+    columns = defaultdict(list)
+    for row in client.query(query, job_config=job_config).result():
+        columns[row.table_name].append(
+            (row.column_name, row.data_type, row.description)
+        )
+    return columns
+
 
-    ddl_statements = ""
+def _fetch_sample_rows(client, table_ref):
+    """Fetches a few rows of a table as a DataFrame.
 
-    # Query INFORMATION_SCHEMA to robustly list tables. This is the recommended
-    # approach when a dataset may contain BigLake tables like Apache Iceberg,
-    # as the tables.list API can fail in those cases.
-    info_schema_query = f"""
-        SELECT table_name
-        FROM `{data_project_id}.{dataset_id}.INFORMATION_SCHEMA.TABLES`
+    Rows are read with tabledata.list, which needs no query job. BigLake tables
+    such as Iceberg may not support it, so fall back to a LIMIT query.
     """
-    query_job = client.query(info_schema_query)
+    try:
+        return client.list_rows(table_ref, max_results=NUM_SAMPLE_ROWS).to_dataframe(
+            create_bqstorage_client=False
+        )
+    except Exception:  # pylint: disable=broad-exception-caught
+        sample_query = f"SELECT * FROM `{table_ref}` LIMIT {NUM_SAMPLE_ROWS}"
+        return client.query(sample_query).to_dataframe()
 
-    for table_row in query_job.result():
-        table_ref = dataset_ref.table(table_row.table_name)
-        table_obj = client.get_table(table_ref)
 
-        if table_obj.table_type == "VIEW":
-            view_query = table_obj.view_query
-            ddl_statements += (
-                f"CREATE OR REPLACE VIEW `{table_ref}` AS\n{view_query};\n\n"
-            )
-            continue
-        elif table_obj.table_type == "EXTERNAL":
-            if (
-                table_obj.external_data_configuration
-                and table_obj.external_data_configuration.source_format
-                == "ICEBERG"
-            ):
-                config = table_obj.external_data_configuration
-                uris_list_str = ",\n    ".join(
-                    [f"'{uri}'" for uri in config.source_uris]
-                )
+def _table_ddl(table_ref, columns, sample_rows):
+    """Builds the DDL of a table, followed by its example values if available.
+
+    Returns:
+        tuple: The DDL, and whether the sample rows could be retrieved.
+
+    Args:
+        table_ref (bigquery.TableReference): The table.
+        columns (list): (column_name, data_type, description) of the table.
+        sample_rows (concurrent.futures.Future): Resolves to a DataFrame of
+          example rows.
+    """
+    column_defs = []
+    for column_name, data_type, description in columns:
+        col_def = f"  `{column_name}` {data_type}"
+        if description:
+            # Use OPTIONS for column descriptions
+            col_def += f" OPTIONS(description='{description.replace("'", "''")}')"
+        column_defs.append(col_def)
+
+    ddl_statement = (
+        f"CREATE OR REPLACE TABLE `{table_ref}` "
+        f"(\n{',\n'.join(column_defs)}\n);\n\n"
+    )
 
-                # Build column definitions from schema
-                column_defs = []
-                for field in table_obj.schema:
-                    col_type = field.field_type
-                    if field.mode == "REPEATED":
-                        col_type = f"ARRAY<{col_type}>"
-                    column_defs.append(f"  `{field.name}` {col_type}")
-                columns_str = ",\n".join(column_defs)
+    try:
+        rows = sample_rows.result()
+        if not rows.empty:
+            ddl_statement += f"-- Example values for table `{table_ref}`:\n"
+            for _, row in rows.iterrows():
+                values_str = ", ".join(_serialize_value_for_sql(v) for v in row.values)
+                ddl_statement += f"INSERT INTO `{table_ref}` VALUES ({values_str});\n\n"
+    except Exception as e:
+        logging.warning(
+            f"Could not retrieve sample rows for table {table_ref.path}: {e}"
+        )
+        ddl_statement += f"-- NOTE: Could not retrieve sample rows for table {table_ref.path}.\n\n"
+        return ddl_statement, False
+    return ddl_statement, True
 
-                ddl_statements += f"""CREATE EXTERNAL TABLE `{table_ref}` (
+
+def _external_table_ddl(table_ref, table_obj):
+    """Builds the DDL of an Iceberg table; other external tables are skipped."""
+    if not (
+        table_obj.external_data_configuration
+        and table_obj.external_data_configuration.source_format == "ICEBERG"
+    ):
+        return ""
+    config = table_obj.external_data_configuration
+    uris_list_str = ",\n    ".join([f"'{uri}'" for uri in config.source_uris])
+
+    # Build column definitions from schema
+    column_defs = []
+    for field in table_obj.schema:
+        col_type = field.field_type
+        if field.mode == "REPEATED":
+            col_type = f"ARRAY<{col_type}>"
+        column_defs.append(f"  `{field.name}` {col_type}")
+    columns_str = ",\n".join(column_defs)
+
+    return f"""CREATE EXTERNAL TABLE `{table_ref}` (
 {columns_str}
 )
 WITH CONNECTION `{config.connection_id}`
@@ -172,55 +363,136 @@ OPTIONS (
   uris = [{uris_list_str}],
   format = 'ICEBERG'
 );\n\n"""
-            # Skip DDL generation for other external tables.
-            continue
-        elif table_obj.table_type == "TABLE":
-            column_defs = []
-            for field in table_obj.schema:
-                col_type = field.field_type
-                if field.mode == "REPEATED":
-                    col_type = f"ARRAY<{col_type}>"
-                col_def = f"  `{field.name}` {col_type}"
-                if field.description:
-                    # Use OPTIONS for column descriptions
-                    col_def += (
-                        " OPTIONS(description='"
-                        f"{field.description.replace("'", "''")}')"
-                    )
-                column_defs.append(col_def)
-
-            ddl_statement = (
-                f"CREATE OR REPLACE TABLE `{table_ref}` "
-                f"(\n{',\n'.join(column_defs)}\n);\n\n"
-            )
 
-            # Add example values if available by running a query. This is more
-            # robust than list_rows, especially for BigLake tables like Iceberg.
-            try:
-                sample_query = f"SELECT * FROM `{table_ref}` LIMIT 5"
-                rows = client.query(sample_query).to_dataframe()
-
-                if not rows.empty:
-                    ddl_statement += f"-- Example values for table `{table_ref}`:\n"
-                    for _, row in rows.iterrows():
-                        values_str = ", ".join(
-                            _serialize_value_for_sql(v) for v in row.values
-                        )
-                        ddl_statement += (
-                            f"INSERT INTO `{table_ref}` VALUES ({values_str});\n\n"
-                        )
-            except Exception as e:
-                logging.warning(
-                    f"Could not retrieve sample rows for table {table_ref.path}: {e}"
+
+def _introspect_tables(client, dataset_ref, tables, max_workers):
+    """Generates the DDL of the given tables.
+
+    Columns are read with one INFORMATION_SCHEMA query, then sample rows (and
+    the metadata of Iceberg tables) are fetched concurrently.
+
+    Returns:
+        dict: Table name -> (DDL, whether it is complete and can be cached).
+    """
+    columns = _list_columns(
+        client,
+        dataset_ref.project,
+        dataset_ref.dataset_id,
+        [t.table_name for t in tables if t.table_type in BASE_TABLE_TYPES],
+    )
+
+    ddls = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for table_row in tables:
+            table_ref = dataset_ref.table(table_row.table_name)
+            if table_row.table_type in BASE_TABLE_TYPES:
+                pending[table_row.table_name] = executor.submit(
+                    _fetch_sample_rows, client, table_ref
                 )
-                ddl_statement += f"-- NOTE: Could not retrieve sample rows for table {table_ref.path}.\n\n"
+            elif table_row.table_type == "EXTERNAL":
+                pending[table_row.table_name] = executor.submit(
+                    client.get_table, table_ref
+                )
+
+        for table_row in tables:
+            table_ref = dataset_ref.table(table_row.table_name)
+            if table_row.table_type == "VIEW":
+                ddls[table_row.table_name] = (
+                    f"CREATE OR REPLACE VIEW `{table_ref}` AS\n"
+                    f"{table_row.view_definition};\n\n",
+                    True,
+                )
+            elif table_row.table_type == "EXTERNAL":
+                ddls[table_row.table_name] = (
+                    _external_table_ddl(
+                        table_ref, pending[table_row.table_name].result()
+                    ),
+                    True,
+                )
+            elif table_row.table_type in BASE_TABLE_TYPES:
+                ddls[table_row.table_name] = _table_ddl(
+                    table_ref,
+                    columns[table_row.table_name],
+                    pending[table_row.table_name],
+                )
+            else:
+                # Skip other types like MATERIALIZED VIEW, SNAPSHOT etc.
+                ddls[table_row.table_name] = ("", True)
+    return ddls
+
+
+def _is_cached(entry, table_row):
+    """Whether a cache entry is still valid for a table listed by _list_tables."""
+    return (
+        entry is not None
+        and table_row.last_modified_time is not None
+        and entry["last_modified_time"] == table_row.last_modified_time
+        and entry["table_type"] == table_row.table_type
+    )
+
+
+def get_bigquery_schema(dataset_id,
+                        data_project_id,
+                        client=None,
+                        compute_project_id=None,
+                        max_workers=SCHEMA_MAX_WORKERS,
+                        cache=None):
+    """Retrieves schema and generates DDL with example values for a BigQuery dataset.
+
+    Tables and views are listed with one INFORMATION_SCHEMA query. With a
+    `cache`, only tables modified since they were cached are introspected
+    again, and the cache is updated. The DDL is assembled in table name order.
+
+    Args:
+        dataset_id (str): The ID of the BigQuery dataset (e.g., 'my_dataset').
+        data_project_id (str): Project used for BQ data.
+        client (bigquery.Client): A BigQuery client.
+        compute_project_id (str): Project used for BQ compute.
+        max_workers (int): Maximum number of concurrent per-table requests.
+        cache (SchemaCache): On-disk cache of per-table DDL.
+
+    Returns:
+        str: A string containing the generated DDL statements.
+    """
+
+    if client is None:
+        client = bigquery.Client(project=compute_project_id)
+
+    # dataset_ref = client.dataset(dataset_id)
+    dataset_ref = bigquery.DatasetReference(data_project_id, dataset_id)
 
-            ddl_statements += ddl_statement
+    tables = _list_tables(client, data_project_id, dataset_id)
+    cached = {}
+    if cache is not None:
+        cached = cache.load(data_project_id, dataset_id) or {}
+    stale = [t for t in tables if not _is_cached(cached.get(t.table_name), t)]
+    ddls = _introspect_tables(client, dataset_ref, stale, max_workers) if stale else {}
+
+    entries = {}
+    for table_row in tables:
+        if table_row.table_name in ddls:
+            ddl, complete = ddls[table_row.table_name]
         else:
-            # Skip other types like MATERIALIZED_VIEW, SNAPSHOT etc.
-            continue
+            ddl, complete = cached[table_row.table_name]["ddl"], True
+        entries[table_row.table_name] = {
+            "table_type": table_row.table_type,
+            # Incomplete entries never match, so they are retried next time
+            "last_modified_time": table_row.last_modified_time if complete else None,
+            "ddl": ddl,
+        }
+    if cache is not None and (stale or entries.keys() != cached.keys()):
+        try:
+            cache.save(data_project_id, dataset_id, entries)
+        except OSError as e:
+            # The cache is an optimization; a read-only home must not break it
+            logging.warning(f"Could not save the schema cache: {e}")
+    logging.info(
+        f"Introspected {len(stale)} of {len(tables)} tables in "
+        f"{data_project_id}.{dataset_id}"
+    )
 
-    return ddl_statements
+    return "".join(entries[t.table_name]["ddl"] for t in tables)
 
 
 def initial_bq_nl2sql(
@@ -269,21 +541,27 @@ The database structure is defined by the following table schemas (possibly with
 
    """
 
-    ddl_schema = tool_context.state["database_settings"]["bq_ddl_schema"]
+    ddl_schema = select_schema(tool_context.state["database_settings"], question)
 
     prompt = prompt_template.format(
         MAX_NUM_ROWS=MAX_NUM_ROWS, SCHEMA=ddl_schema, QUESTION=question
     )
 
-    response = llm_client.models.generate_content(
-        model=os.getenv("BASELINE_NL2SQL_MODEL"),
-        contents=prompt,
-        config={"temperature": 0.1},
-    )
+    model = os.getenv("BASELINE_NL2SQL_MODEL")
+    cache = get_nl2sql_cache()
+    sql = cache.get(question, ddl_schema, "BASELINE", model) if cache else None
+    if sql is None:
+        response = llm_client.models.generate_content(
+            model=model,
+            contents=prompt,
+            config={"temperature": 0.1},
+        )
 
-    sql = response.text
-    if sql:
-        sql = sql.replace("```sql", "").replace("```", "").strip()
+        sql = response.text
+        if sql:
+            sql = sql.replace("```sql", "").replace("```", "").strip()
+            if cache:
+                cache.put(question, ddl_schema, "BASELINE", model, sql)
 
     print("\n sql:", sql)
 
@@ -292,6 +570,59 @@ The database structure is defined by the following table schemas (possibly with
     return sql
 
 
+def _arrow_to_records(table):
+    """Converts an Arrow table to a list of row dicts, with dates as YYYY-MM-DD."""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type) or pa.types.is_timestamp(field.type):
+            table = table.set_column(
+                i, field.name, pc.strftime(table.column(i), format="%Y-%m-%d")
+            )
+    return table.to_pylist()
+
+
+def _fetch_result(query_job, max_rows=MAX_NUM_ROWS):
+    """Fetches at most `max_rows` rows of the result of a query.
+
+    Over the REST API only the first `max_rows` rows are requested. The Storage
+    Read API path stops reading the result once `max_rows` rows have arrived.
+
+    Args:
+        query_job (bigquery.QueryJob): The query.
+        max_rows (int): Maximum number of rows to fetch.
+
+    Returns:
+        tuple: The `RowIterator` of the result (for its schema and total row
+          count) and the fetched rows as a `pyarrow.Table`, or None if the
+          query returned no data.
+    """
+    storage_client = get_bqstorage_client() if RESULT_STORAGE_API else None
+    if storage_client is None:
+        results = query_job.result(max_results=max_rows, page_size=max_rows)
+        if not results.schema:
+            return results, None
+        return results, results.to_arrow(create_bqstorage_client=False)
+
+    results = query_job.result(page_size=max_rows)
+    if not results.schema:
+        return results, None
+    batches = []
+    num_rows = 0
+    stream = results.to_arrow_iterable(
+        bqstorage_client=storage_client, max_stream_count=1
+    )
+    try:
+        for batch in stream:
+            batches.append(batch.slice(0, max_rows - num_rows))
+            num_rows += batches[-1].num_rows
+            if num_rows >= max_rows:
+                break
+    finally:
+        stream.close()
+    if not batches:
+        return results, None
+    return results, pa.Table.from_batches(batches)
+
+
 def run_bigquery_validation(
     sql_string: str,
     tool_context: ToolContext,
@@ -306,11 +637,13 @@ def run_bigquery_validation(
     2. **DML/DDL Restriction:**  Rejects any SQL queries containing DML or DDL
        statements (e.g., UPDATE, DELETE, INSERT, CREATE, ALTER) to ensure
        read-only operations.
-    3. **Syntax and Execution:** Sends the cleaned SQL to BigQuery for validation.
+    3. **Syntax and Execution:** Sends the cleaned SQL to BigQuery (or the
+       configured query backend, see `get_backend`) for validation.
        If the query is syntactically correct and executable, it retrieves the
        results.
     4. **Result Analysis:**  Checks if the query produced any results. If so, it
-       formats the first few rows of the result set for inspection.
+       fetches and formats at most `MAX_NUM_ROWS` rows of the result set for
+       inspection, along with the total row count and whether it was truncated.
 
     Args:
         sql_string (str): The SQL query string to validate.
@@ -340,10 +673,8 @@ def run_bigquery_validation(
         # 4. Replace escaped newlines (those not preceded by a backslash)
         sql_string = sql_string.replace("\\n", "\n")
 
-        # 5. Add limit clause if not present
-        if "limit" not in sql_string.lower():
-            sql_string = sql_string + " limit " + str(MAX_NUM_ROWS)
-
+        # No LIMIT is added: only MAX_NUM_ROWS rows are fetched anyway, and
+        # the result's total row count tells the agent whether it was cut.
         return sql_string
 
     logging.info("Validating SQL: %s", sql_string)
@@ -353,36 +684,48 @@ def run_bigquery_validation(
     final_result = {"query_result": None, "error_message": None}
 
     # More restrictive check for BigQuery - disallow DML and DDL
-    if re.search(
-        r"(?i)(update|delete|drop|insert|create|alter|truncate|merge)", sql_string
-    ):
+    if DISALLOWED_SQL.search(sql_string):
         final_result["error_message"] = (
             "Invalid SQL: Contains disallowed DML/DDL operations."
         )
         return final_result
 
     try:
-        query_job = get_bq_client().query(sql_string)
-        results = query_job.result()  # Get the query results
-
-        if results.schema:  # Check if query returned data
-            rows = [
-                {
-                    key: (
-                        value
-                        if not isinstance(value, datetime.date)
-                        else value.strftime("%Y-%m-%d")
-                    )
-                    for (key, value) in row.items()
-                }
-                for row in results
-            ][
-                :MAX_NUM_ROWS
-            ]  # Convert BigQuery RowIterator to list of dicts
+        backend = get_backend()
+        cache = get_result_cache()
+        cache_key = backend.result_cache_key(sql_string)
+        if cache_key is not None:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                final_result.update(cached["result"])
+                tool_context.state["query_result"] = cached["data"]
+                return final_result
+
+        table, total_rows = backend.run_query(sql_string, MAX_NUM_ROWS)
+
+        if table is not None:  # Check if query returned data
+            rows = _arrow_to_records(table)
             # return f"Valid SQL. Results: {rows}"
             final_result["query_result"] = rows
-
-            tool_context.state["query_result"] = rows
+            final_result["total_rows"] = total_rows
+            final_result["truncated"] = total_rows > len(rows)
+
+            # The analytics agent gets the rows as a Parquet file
+            data = None
+            if table.num_columns:
+                data = describe_result(table, rows, total_rows)
+            tool_context.state["query_result"] = data
+            if cache_key is not None:
+                cache.put(
+                    cache_key,
+                    {
+                        "result": {
+                            key: final_result[key]
+                            for key in ("query_result", "total_rows", "truncated")
+                        },
+                        "data": data,
+                    },
+                )
 
         else:
             final_result["error_message"] = (
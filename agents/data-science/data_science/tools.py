@@ -18,10 +18,17 @@
 -- then, it use NL2Py to do further data analysis as needed
 """
 
+from google.adk.code_executors.code_execution_utils import File
+from google.adk.code_executors.code_executor_context import CodeExecutorContext
 from google.adk.tools import ToolContext
 from google.adk.tools.agent_tool import AgentTool
 
 from .sub_agents import ds_agent, db_agent
+from .sub_agents.bigquery.result_data import (
+    PARQUET_MIME_TYPE,
+    RESULT_FILE_PREFIX,
+    describe_for_prompt,
+)
 
 
 async def call_db_agent(
@@ -52,14 +59,39 @@ async def call_ds_agent(
     if question == "N/A":
         return tool_context.state["db_agent_output"]
 
-    input_data = tool_context.state["query_result"]
+    input_data = tool_context.state.get("query_result")
+
+    if input_data:
+        # Hand the data to the code executor as a file, and only describe it in
+        # the prompt
+        if "data" in input_data:
+            code_executor_context = CodeExecutorContext(tool_context.state)
+            # Replace the file of the previous query result, if any
+            input_files = [
+                f
+                for f in code_executor_context.get_input_files()
+                if not f.name.startswith(RESULT_FILE_PREFIX)
+            ]
+            input_files.append(
+                File(
+                    name=input_data["file_name"],
+                    content=input_data["data"],
+                    mime_type=PARQUET_MIME_TYPE,
+                )
+            )
+            code_executor_context.clear_input_files()
+            code_executor_context.add_input_files(input_files)
+            # The input file is now the only copy of the data
+            input_data = {k: v for k, v in input_data.items() if k != "data"}
+            tool_context.state["query_result"] = input_data
+        data_description = describe_for_prompt(input_data)
+    else:
+        data_description = "No data was retrieved for the previous question."
 
     question_with_data = f"""
   Question to answer: {question}
 
-  Actual data to analyze prevoius quesiton is already in the following:
-  {input_data}
-
+  {data_description}
   """
 
     agent_tool = AgentTool(agent=ds_agent)
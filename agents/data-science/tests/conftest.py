@@ -0,0 +1,40 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Settings that let the agent modules be imported by offline unit tests.
+
+Values from the environment (or `.env`) take precedence.
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+for name, value in {
+    "GOOGLE_CLOUD_PROJECT": "test-project",
+    "GOOGLE_CLOUD_LOCATION": "us-central1",
+    "BQ_COMPUTE_PROJECT_ID": "test-project",
+    "BQ_DATA_PROJECT_ID": "test-project",
+    "BQ_DATASET_ID": "test_dataset",
+    "ROOT_AGENT_MODEL": "gemini-2.5-flash",
+    "ANALYTICS_AGENT_MODEL": "gemini-2.5-flash",
+    "BIGQUERY_AGENT_MODEL": "gemini-2.5-flash",
+    "BASELINE_NL2SQL_MODEL": "gemini-2.5-flash",
+    "CHASE_NL2SQL_MODEL": "gemini-2.5-flash",
+    "BQML_AGENT_MODEL": "gemini-2.5-flash",
+    "NL2SQL_METHOD": "BASELINE",
+    "CODE_INTERPRETER_EXTENSION_NAME": "",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,240 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the DDL generated from a dataset's INFORMATION_SCHEMA."""
+
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pandas as pd
+
+from data_science.sub_agents.bigquery import tools
+
+TableRow = namedtuple(
+    "TableRow", ["table_name", "table_type", "view_definition", "last_modified_time"]
+)
+ColumnRow = namedtuple(
+    "ColumnRow", ["table_name", "column_name", "data_type", "description"]
+)
+
+TABLES = [
+    TableRow("csv_files", "EXTERNAL", None, 1),
+    TableRow("daily_orders", "VIEW", "SELECT DATE(ts) AS day FROM orders", 1),
+    TableRow("lake", "EXTERNAL", None, 1),
+    TableRow("order_totals", "MATERIALIZED VIEW", "SELECT 1", 1),
+    TableRow("orders", "BASE TABLE", None, 1),
+    TableRow("orders_clone", "CLONE", None, 1),
+    TableRow("orders_snapshot", "SNAPSHOT", None, 1),
+]
+
+ORDER_COLUMNS = [
+    ("order_id", "INT64", None),
+    ("items", "ARRAY<STRUCT<sku STRING, quantity INT64>>", "Line items"),
+    ("shipping", "STRUCT<city STRING, tags ARRAY<STRING>>", None),
+    ("note", "STRING", "Customer's note"),
+]
+COLUMNS = [
+    ColumnRow(table, *column)
+    for table in ("orders", "orders_clone", "orders_snapshot")
+    for column in ORDER_COLUMNS
+]
+SAMPLE_ROWS = pd.DataFrame(
+    {
+        "order_id": [1],
+        "items": [[{"sku": "a-1", "quantity": 2}]],
+        "shipping": [{"city": "Paris", "tags": ["gift"]}],
+        "note": ["it's fragile"],
+    }
+)
+
+
+def field(name, field_type, mode="NULLABLE"):
+    return SimpleNamespace(name=name, field_type=field_type, mode=mode)
+
+
+EXTERNAL_TABLES = {
+    "lake": SimpleNamespace(
+        external_data_configuration=SimpleNamespace(
+            source_format="ICEBERG",
+            source_uris=["gs://bucket/lake/metadata.json"],
+            connection_id="us.lake",
+        ),
+        schema=[
+            field("id", "INT64"),
+            field("labels", "STRING", mode="REPEATED"),
+            field("attrs", "RECORD"),
+        ],
+    ),
+    "csv_files": SimpleNamespace(
+        external_data_configuration=SimpleNamespace(source_format="CSV"),
+        schema=[field("line", "STRING")],
+    ),
+}
+
+
+class FakeQuery:
+    def __init__(self, rows=(), frame=None):
+        self.rows = list(rows)
+        self.frame = frame
+
+    def result(self):
+        return self.rows
+
+    def to_dataframe(self, **kwargs):
+        return self.frame
+
+
+class FakeClient:
+    """BigQuery client answering the schema queries, recording its calls"""
+
+    def __init__(self, unlistable=()):
+        self.unlistable = set(unlistable)
+        self.column_tables = None
+        self.listed_rows = []
+        self.fetched_tables = []
+        self.queried_rows = []
+
+    def query(self, sql, job_config=None):
+        if "INFORMATION_SCHEMA.COLUMNS" in sql:
+            (table_names,) = job_config.query_parameters
+            self.column_tables = sorted(table_names.values)
+            return FakeQuery(
+                c for c in COLUMNS if c.table_name in table_names.values
+            )
+        if "INFORMATION_SCHEMA.TABLES" in sql:
+            return FakeQuery(TABLES)
+        assert "LIMIT" in sql
+        self.queried_rows.append(sql)
+        return FakeQuery(frame=SAMPLE_ROWS)
+
+    def list_rows(self, table_ref, max_results):
+        self.listed_rows.append(table_ref.table_id)
+        if table_ref.table_id in self.unlistable:
+            raise RuntimeError("tabledata.list is not supported")
+        return FakeQuery(frame=SAMPLE_ROWS)
+
+    def get_table(self, table_ref):
+        self.fetched_tables.append(table_ref.table_id)
+        return EXTERNAL_TABLES[table_ref.table_id]
+
+
+def ddl_by_table(client):
+    """Table name -> DDL generated for every table of the fake dataset"""
+    ddls = tools._introspect_tables(
+        client,
+        tools.bigquery.DatasetReference("test-project", "test_dataset"),
+        tools._list_tables(client, "test-project", "test_dataset"),
+        max_workers=4,
+    )
+    return {name: ddl for name, (ddl, _) in ddls.items()}
+
+
+def test_nested_and_repeated_columns_keep_their_full_types():
+    ddl = ddl_by_table(FakeClient())["orders"]
+    assert ddl.startswith(
+        "CREATE OR REPLACE TABLE `test-project.test_dataset.orders` (\n"
+        "  `order_id` INT64,\n"
+        "  `items` ARRAY<STRUCT<sku STRING, quantity INT64>>"
+        " OPTIONS(description='Line items'),\n"
+        "  `shipping` STRUCT<city STRING, tags ARRAY<STRING>>,\n"
+        "  `note` STRING OPTIONS(description='Customer''s note')\n"
+        ");\n\n"
+    )
+    assert (
+        "INSERT INTO `test-project.test_dataset.orders` VALUES "
+        "(1, [('a-1', 2)], ('Paris', ['gift']), 'it''s fragile');\n"
+    ) in ddl
+
+
+def test_each_table_type():
+    client = FakeClient()
+    ddls = ddl_by_table(client)
+
+    assert set(ddls) == {t.table_name for t in TABLES}
+    # Clones are tables; snapshots, materialized views and non-Iceberg
+    # external tables are left out
+    assert ddls["orders_clone"].startswith(
+        "CREATE OR REPLACE TABLE `test-project.test_dataset.orders_clone` ("
+    )
+    assert ddls["orders_snapshot"] == ""
+    assert ddls["order_totals"] == ""
+    assert ddls["csv_files"] == ""
+    assert ddls["daily_orders"] == (
+        "CREATE OR REPLACE VIEW `test-project.test_dataset.daily_orders` AS\n"
+        "SELECT DATE(ts) AS day FROM orders;\n\n"
+    )
+    assert ddls["lake"] == (
+        "CREATE EXTERNAL TABLE `test-project.test_dataset.lake` (\n"
+        "  `id` INT64,\n"
+        "  `labels` ARRAY<STRING>,\n"
+        "  `attrs` RECORD\n"
+        ")\n"
+        "WITH CONNECTION `us.lake`\n"
+        "OPTIONS (\n"
+        "  uris = ['gs://bucket/lake/metadata.json'],\n"
+        "  format = 'ICEBERG'\n"
+        ");\n\n"
+    )
+
+    # Columns are read for tables only, in one query, and rows are sampled
+    # from tables only; external tables are described from their metadata
+    assert client.column_tables == ["orders", "orders_clone"]
+    assert sorted(client.listed_rows) == ["orders", "orders_clone"]
+    assert sorted(client.fetched_tables) == ["csv_files", "lake"]
+    assert client.queried_rows == []
+
+
+def test_tables_without_tabledata_list_are_sampled_with_a_query():
+    client = FakeClient(unlistable={"orders_clone"})
+    ddls = ddl_by_table(client)
+
+    assert client.queried_rows == [
+        "SELECT * FROM `test-project.test_dataset.orders_clone` LIMIT 5"
+    ]
+    assert "INSERT INTO `test-project.test_dataset.orders_clone`" in (
+        ddls["orders_clone"]
+    )
+
+
+def test_schema_is_assembled_in_table_order():
+    schema = tools.get_bigquery_schema(
+        "test_dataset", "test-project", client=FakeClient()
+    )
+    positions = [
+        schema.index(f"`test-project.test_dataset.{name}`")
+        for name in ("daily_orders", "lake", "orders", "orders_clone")
+    ]
+    assert positions == sorted(positions)
+    assert "orders_snapshot" not in schema
+
+
+def test_sample_failures_are_noted_and_not_cached():
+    class FailingClient(FakeClient):
+        def list_rows(self, table_ref, max_results):
+            raise RuntimeError("tabledata.list is not supported")
+
+        def query(self, sql, job_config=None):
+            if "LIMIT" in sql:
+                raise RuntimeError("access denied")
+            return super().query(sql, job_config)
+
+    ddls = tools._introspect_tables(
+        FailingClient(),
+        tools.bigquery.DatasetReference("test-project", "test_dataset"),
+        [t for t in TABLES if t.table_name == "orders"],
+        max_workers=1,
+    )
+    ddl, complete = ddls["orders"]
+    assert not complete
+    assert "-- NOTE: Could not retrieve sample rows" in ddl
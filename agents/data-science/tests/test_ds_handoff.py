@@ -0,0 +1,66 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the hand-off of query results to the analytics agent."""
+
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.code_executors.code_execution_utils import File
+from google.adk.code_executors.code_executor_context import CodeExecutorContext
+import pyarrow as pa
+
+from data_science import tools
+from data_science.sub_agents.bigquery.result_data import describe_result
+
+
+class FakeAgentTool:
+    """Records the requests instead of running the agent"""
+
+    requests = []
+
+    def __init__(self, agent):
+        self.agent = agent
+
+    async def run_async(self, args, tool_context):
+        self.requests.append(args["request"])
+        return "analysis"
+
+
+def query_result(values):
+    table = pa.table({"value": values})
+    return describe_result(table, table.to_pylist(), table.num_rows)
+
+
+def test_each_result_replaces_the_previous_file(monkeypatch):
+    monkeypatch.setattr(tools, "AgentTool", FakeAgentTool)
+    state = {}
+    tool_context = SimpleNamespace(state=state)
+    CodeExecutorContext(state).add_input_files(
+        [File(name="notes.csv", content="a,b\n", mime_type="text/csv")]
+    )
+
+    first, second = query_result([1, 2]), query_result([3, 4, 5])
+    for result in (first, second):
+        state["query_result"] = result
+        asyncio.run(tools.call_ds_agent("plot it", tool_context))
+        # Asking again about the same result keeps its file
+        asyncio.run(tools.call_ds_agent("and now?", tool_context))
+
+    files = CodeExecutorContext(state).get_input_files()
+    assert [f.name for f in files] == ["notes.csv", second["file_name"]]
+    assert files[1].content == second["data"]
+    assert "data" not in state["query_result"]
+    assert state["query_result"]["file_name"] == second["file_name"]
+    assert second["file_name"] in FakeAgentTool.requests[-1]
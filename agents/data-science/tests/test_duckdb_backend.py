@@ -0,0 +1,80 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the embedded DuckDB backend."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from data_science.sub_agents.bigquery import tools
+from data_science.sub_agents.bigquery.duckdb_backend import DuckDBBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    (tmp_path / "orders.csv").write_text(
+        "order_id,customer,total\n"
+        + "".join(f"{i},customer {i % 3},{i * 1.5}\n" for i in range(1, 11))
+    )
+    (tmp_path / "events.csv").write_text(
+        "event_id\n" + "".join(f"{i}\n" for i in range(tools.MAX_NUM_ROWS + 20))
+    )
+    backend = DuckDBBackend()
+    backend.load_csv_dir("my-project", "shop", data_dir=str(tmp_path))
+    return backend
+
+
+def test_schema_is_googlesql_ddl_with_sample_rows(backend):
+    schema = backend.get_schema("my-project", "shop")
+    assert "CREATE OR REPLACE TABLE `my-project.shop.orders` (\n" in schema
+    assert "  `order_id` INT64" in schema
+    assert "  `total` FLOAT64" in schema
+    assert "INSERT INTO `my-project.shop.orders` VALUES (1, 'customer 1', 1.5);" in (
+        schema
+    )
+
+
+def test_googlesql_queries_are_run(backend):
+    table, total_rows = backend.run_query(
+        "SELECT customer, COUNT(*) AS n FROM `my-project.shop.orders`"
+        " GROUP BY customer ORDER BY customer",
+        max_rows=80,
+    )
+    assert total_rows == 3
+    assert table.to_pylist() == [
+        {"customer": "customer 0", "n": 3},
+        {"customer": "customer 1", "n": 4},
+        {"customer": "customer 2", "n": 3},
+    ]
+
+
+def test_results_are_capped_but_fully_counted(backend):
+    table, total_rows = backend.run_query(
+        "SELECT * FROM `my-project.shop.orders` ORDER BY order_id", max_rows=4
+    )
+    assert total_rows == 10
+    assert table.column("order_id").to_pylist() == [1, 2, 3, 4]
+
+
+def test_validation_reports_the_full_row_count(backend, monkeypatch):
+    monkeypatch.setattr(tools, "backend", backend)
+    tool_context = SimpleNamespace(state={})
+    result = tools.run_bigquery_validation(
+        "SELECT * FROM `my-project.shop.events`", tool_context
+    )
+    assert result["error_message"] is None
+    assert len(result["query_result"]) == tools.MAX_NUM_ROWS
+    assert result["total_rows"] == tools.MAX_NUM_ROWS + 20
+    assert result["truncated"]
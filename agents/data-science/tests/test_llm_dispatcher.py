@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the dispatcher of LLM requests."""
+
+import asyncio
+
+import pytest
+
+from data_science.sub_agents.bigquery.chase_sql.llm_dispatcher import (
+    LLMDispatcher,
+)
+
+
+class FakeLLM:
+    """Answers requests after `latency` seconds, counting calls in flight"""
+
+    def __init__(self, latency=0.0, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.cancelled = 0
+
+    async def generate(self, latency=None):
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency if latency is None else latency)
+            if call <= self.failures:
+                raise RuntimeError("Service unavailable")
+            return call
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+
+def make_dispatcher(**kwargs):
+    kwargs = {
+        "requests_per_minute": 0,
+        "hedge_after": 0,
+        "base_delay": 0.01,
+        "max_delay": 0.01,
+        **kwargs,
+    }
+    return LLMDispatcher(**kwargs)
+
+
+def run_many(dispatcher, llm, num_requests, timeout=None):
+    async def many():
+        return await asyncio.gather(
+            *(
+                dispatcher.request("model", llm.generate, timeout)
+                for _ in range(num_requests)
+            )
+        )
+
+    return dispatcher.run(many())
+
+
+def test_requests_in_flight_are_capped():
+    llm = FakeLLM(latency=0.02)
+    results = run_many(make_dispatcher(max_concurrency=2), llm, 8)
+    assert sorted(results) == list(range(1, 9))
+    assert llm.max_in_flight == 2
+
+
+def test_queued_requests_are_not_hedged():
+    llm = FakeLLM(latency=0.05)
+    dispatcher = make_dispatcher(max_concurrency=2, hedge_after=0.08)
+    run_many(dispatcher, llm, 8)
+    assert llm.calls == 8
+
+
+def test_slow_requests_are_hedged():
+    llm = FakeLLM()
+    latencies = [1.0, 0.01]
+    dispatcher = make_dispatcher(hedge_after=0.05)
+    result = dispatcher.run(
+        dispatcher.request("model", lambda: llm.generate(latencies.pop(0)))
+    )
+    # The hedge answers first, and the primary request is cancelled
+    assert result == 2
+    assert llm.cancelled == 1
+
+
+def test_failed_requests_are_retried():
+    llm = FakeLLM(failures=2)
+    assert run_many(make_dispatcher(max_attempts=3), llm, 1) == [3]
+    llm = FakeLLM(failures=3)
+    with pytest.raises(RuntimeError):
+        run_many(make_dispatcher(max_attempts=3), llm, 1)
+    assert llm.calls == 3
+
+
+def test_timeouts_cancel_the_request():
+    llm = FakeLLM(latency=1.0)
+    with pytest.raises(asyncio.TimeoutError):
+        run_many(make_dispatcher(), llm, 1, timeout=0.05)
+    assert llm.cancelled == 1
+
+
+def test_arun_works_from_another_event_loop():
+    llm = FakeLLM()
+    dispatcher = make_dispatcher()
+    assert asyncio.run(dispatcher.arun(dispatcher.request("model", llm.generate))) == 1
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the question -> SQL cache."""
+
+import pytest
+
+from data_science.sub_agents.bigquery import nl2sql_cache
+from data_science.sub_agents.bigquery.nl2sql_cache import NL2SQLCache
+
+SCHEMA = (
+    "CREATE OR REPLACE TABLE `p.d.sales` (\n"
+    "  `region` STRING,\n  `amount` FLOAT64,\n  `sold_on` DATE\n);\n\n"
+    "-- Example values for table `p.d.sales`:\n"
+    "INSERT INTO `p.d.sales` VALUES ('Europe', 12.5, '2024-04-01');\n\n"
+)
+SQL = "SELECT SUM(amount) FROM `p.d.sales`"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NL2SQLCache(str(tmp_path / "cache.sqlite3"), similarity_threshold=0.5)
+
+
+def test_exact_hits_ignore_case_and_punctuation(cache):
+    cache.put("Total sales?", SCHEMA, "BASELINE", "model", SQL)
+    assert cache.get("  total   SALES ", SCHEMA, "BASELINE", "model") == SQL
+    assert cache.get("Total sales", SCHEMA, "CHASE", "model") is None
+    assert cache.get("Total sales", SCHEMA + "\n", "BASELINE", "model") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = NL2SQLCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0)
+    cache.put("Total sales", SCHEMA, "BASELINE", "model", SQL)
+    assert cache.get("Total sales", SCHEMA, "BASELINE", "model") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = NL2SQLCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for question in ("first", "second", "third"):
+        cache.put(question, SCHEMA, "BASELINE", "model", question)
+    assert cache.get("first", SCHEMA, "BASELINE", "model") is None
+    assert cache.get("third", SCHEMA, "BASELINE", "model") == "third"
+
+
+def test_rephrased_questions_are_served_by_similarity(cache):
+    cache.put("show me the total amount of sales", SCHEMA, "BASELINE", "model", SQL)
+    assert cache.get("total amount of sales please", SCHEMA, "BASELINE", "model") == SQL
+
+
+@pytest.mark.parametrize(
+    "cached, asked",
+    [
+        ("total sales amount in april", "total sales amount in march"),
+        ("total sales amount in 2023", "total sales amount in 2024"),
+        ("total sales amount for 'north'", "total sales amount for 'south'"),
+        ("total sales amount in europe", "total sales amount in asia"),
+        ("total sales amount by region", "total sales amount by day"),
+    ],
+)
+def test_questions_differing_in_a_value_are_not_served(cache, cached, asked):
+    cache.put(cached, SCHEMA, "BASELINE", "model", SQL)
+    assert nl2sql_cache.similarity(cached, asked) >= 0.5
+    assert cache.get(asked, SCHEMA, "BASELINE", "model") is None
+
+
+def test_unusable_cache_path_disables_the_cache(tmp_path, monkeypatch):
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+    monkeypatch.setenv("NL2SQL_CACHE_PATH", str(not_a_directory / "cache.sqlite3"))
+    monkeypatch.setattr(nl2sql_cache, "_cache", None)
+    monkeypatch.setattr(nl2sql_cache, "_cache_disabled", False)
+    assert nl2sql_cache.get_nl2sql_cache() is None
+    assert nl2sql_cache._cache_disabled
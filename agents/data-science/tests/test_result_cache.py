@@ -0,0 +1,117 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the query result cache."""
+
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from data_science.sub_agents.bigquery.result_cache import ResultCache
+from data_science.sub_agents.bigquery.result_cache import canonical_sql
+
+QUERY = "SELECT o.id, o.total FROM `p.d.orders` AS o WHERE o.total > 10"
+
+
+@pytest.mark.parametrize(
+    "equivalent",
+    [
+        "select o.id,   o.total\nfrom `p.d.orders` as o where o.total > 10",
+        "SELECT o.id, o.total -- the order\nFROM `p.d.orders` AS o WHERE o.total > 10",
+        "SELECT x.id, x.total FROM `p.d.orders` AS x WHERE x.total > 10",
+        "SELECT O.id, O.total FROM `p.d.orders` AS o WHERE o.total > 10",
+    ],
+)
+def test_equivalent_queries_have_the_same_canonical_sql(equivalent):
+    assert canonical_sql(equivalent) == canonical_sql(QUERY)
+    assert canonical_sql(QUERY)[1] == [("p", "d", "orders")]
+
+
+def test_queries_reading_ctes_list_only_real_tables():
+    sql = "WITH big AS (SELECT * FROM `p.d.orders`) SELECT COUNT(*) FROM big"
+    assert canonical_sql(sql)[1] == [("p", "d", "orders")]
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT RAND() FROM `p.d.orders`",
+        "SELECT * FROM `p.d.orders` WHERE day = CURRENT_DATE()",
+        "SELECT GENERATE_UUID() AS id, * FROM `p.d.orders`",
+        "SELECT * FROM `p.d.orders` TABLESAMPLE SYSTEM (10 PERCENT)",
+        "SELECT * FROM `p.d.events_*`",
+        "SELECT * FROM `p.d.INFORMATION_SCHEMA.TABLES`",
+        "SELECT * FROM orders",
+        "DELETE FROM `p.d.orders` WHERE TRUE",
+        "SELECT FROM WHERE",
+    ],
+)
+def test_uncacheable_queries(sql):
+    assert canonical_sql(sql) is None
+
+
+class FakeClient:
+    """Looks up tables in a dict of table id -> table"""
+
+    project = "p"
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def get_table(self, table_id):
+        return self.tables[table_id]
+
+
+def table(modified, table_type="TABLE", streaming_buffer=None):
+    return SimpleNamespace(
+        table_type=table_type,
+        streaming_buffer=streaming_buffer,
+        modified=datetime.datetime(2025, 1, modified, tzinfo=datetime.timezone.utc),
+    )
+
+
+def test_keys_change_with_the_table_version():
+    client = FakeClient({"p.d.orders": table(1)})
+    cache = ResultCache()
+    key = cache.key(client, QUERY)
+    assert key is not None
+    assert cache.key(client, QUERY.replace("o.", "x.").replace(" o ", " x ")) == key
+    client.tables["p.d.orders"] = table(2)
+    assert cache.key(client, QUERY) != key
+
+
+@pytest.mark.parametrize(
+    "orders", [table(1, table_type="VIEW"), table(1, streaming_buffer=object())]
+)
+def test_views_and_streaming_tables_are_not_cached(orders):
+    assert ResultCache().key(FakeClient({"p.d.orders": orders}), QUERY) is None
+
+
+def test_missing_tables_are_not_cached():
+    assert ResultCache().key(FakeClient({}), QUERY) is None
+
+
+def test_least_recently_used_results_are_evicted_by_size():
+    cache = ResultCache(max_bytes=30)
+    cache.put("a", ["x" * 8])
+    cache.put("b", ["y" * 8])
+    assert cache.get("a") == ["x" * 8]
+    cache.put("c", ["z" * 8])
+    assert cache.get("b") is None
+    assert cache.get("a") == ["x" * 8]
+    assert cache.stats()["bytes"] <= 30
+    cache.put("huge", ["w" * 100])
+    assert cache.get("huge") is None
+    assert (cache.hits, cache.misses) == (2, 2)
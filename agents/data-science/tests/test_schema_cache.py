@@ -0,0 +1,69 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the on-disk schema cache."""
+
+from collections import namedtuple
+
+from data_science.sub_agents.bigquery import tools
+from data_science.sub_agents.bigquery.schema_cache import SchemaCache
+
+TableRow = namedtuple(
+    "TableRow", ["table_name", "table_type", "view_definition", "last_modified_time"]
+)
+
+
+def fake_dataset(monkeypatch, introspected):
+    """Makes the dataset contain two tables, returned as a mutable list"""
+    tables = [
+        TableRow("orders", "BASE TABLE", None, 100),
+        TableRow("users", "BASE TABLE", None, 200),
+    ]
+    monkeypatch.setattr(tools, "_list_tables", lambda *args: list(tables))
+
+    def introspect(client, dataset_ref, tables, max_workers):
+        introspected.extend(t.table_name for t in tables)
+        return {t.table_name: (f"-- {t.table_name}\n", True) for t in tables}
+
+    monkeypatch.setattr(tools, "_introspect_tables", introspect)
+    return tables
+
+
+def get_schema(cache):
+    return tools.get_bigquery_schema(
+        "test_dataset", "test-project", client=object(), cache=cache
+    )
+
+
+def test_only_modified_tables_are_introspected_again(tmp_path, monkeypatch):
+    introspected = []
+    tables = fake_dataset(monkeypatch, introspected)
+    cache = SchemaCache(str(tmp_path))
+
+    assert get_schema(cache) == "-- orders\n-- users\n"
+    assert introspected == ["orders", "users"]
+    tables[1] = tables[1]._replace(last_modified_time=300)
+    assert get_schema(cache) == "-- orders\n-- users\n"
+    assert introspected == ["orders", "users", "users"]
+    assert cache.load_ddl("test-project", "test_dataset") == "-- orders\n-- users\n"
+
+
+def test_unwritable_cache_directory_is_ignored(tmp_path, monkeypatch):
+    fake_dataset(monkeypatch, [])
+    (tmp_path / "file").write_text("")
+    # A cache directory that cannot be created
+    cache = SchemaCache(str(tmp_path / "file" / "cache"))
+
+    assert get_schema(cache) == "-- orders\n-- users\n"
+    assert cache.load("test-project", "test_dataset") is None
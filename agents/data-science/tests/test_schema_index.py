@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the question-relevant pruning of the DDL schema."""
+
+import pytest
+
+from data_science.sub_agents.bigquery import schema_index
+from data_science.sub_agents.bigquery.schema_index import KEY_COLUMN, SchemaIndex
+
+
+def ddl(name, *columns):
+    """The DDL block of table `name`, as `tools.get_bigquery_schema` writes it"""
+    column_defs = ",\n".join(f"  `{column}` STRING" for column in columns)
+    return f"CREATE OR REPLACE TABLE `p.d.{name}` (\n{column_defs}\n);\n\n"
+
+
+SHOP = [
+    ddl("products", "product_id", "product_name", "category"),
+    ddl("order_items", "order_id", "product_id", "quantity"),
+    ddl("orders", "order_id", "customer_id", "order_date"),
+    ddl("customers", "customer_id", "customer_name", "city"),
+    ddl("audit_log", *(f"field_{i}" for i in range(40))),
+]
+
+
+def kept_tables(pruned):
+    return [
+        line.split("`")[1].rsplit(".", 1)[-1]
+        for line in pruned.splitlines()
+        if line.startswith("CREATE ")
+    ]
+
+
+def test_small_schema_is_returned_unchanged():
+    schema = "".join(SHOP)
+    assert SchemaIndex(schema).prune("products", token_budget=10**6) == schema
+
+
+def test_most_relevant_tables_come_first():
+    index = SchemaIndex("".join(SHOP))
+    pruned = index.prune("customer names by city", top_k=1, token_budget=100)
+    assert kept_tables(pruned) == ["customers"]
+
+
+def test_tables_are_joined_through_a_multi_table_path():
+    index = SchemaIndex("".join(SHOP))
+    pruned = index.prune(
+        "product names bought by each customer name", top_k=2, token_budget=300
+    )
+    assert sorted(kept_tables(pruned)) == [
+        "customers",
+        "order_items",
+        "orders",
+        "products",
+    ]
+    assert "`p.d.order_items`.order_id = `p.d.orders`.order_id" in pruned
+    assert "audit_log" not in pruned
+
+
+def test_join_paths_are_depth_limited(monkeypatch):
+    monkeypatch.setattr(schema_index, "MAX_BRIDGE_TABLES", 1)
+    index = SchemaIndex("".join(SHOP))
+    products, order_items, orders, customers = range(4)
+    assert index._join_path(products, orders) == [order_items]
+    assert index._join_path(products, customers) is None
+
+
+@pytest.mark.parametrize(
+    "column",
+    ["customer_id", "CUSTOMER_ID", "api_key", "zip_code", "customerId", "userID",
+     "productKey", "countryCode"],
+)
+def test_key_columns(column):
+    assert KEY_COLUMN.search(column)
+
+
+@pytest.mark.parametrize(
+    "column",
+    ["paid", "amount_paid", "is_valid", "hockey", "barcode", "PAID", "Valid",
+     "id", "ID", "key", "code", "identity", "key_name"],
+)
+def test_non_key_columns(column):
+    assert not KEY_COLUMN.search(column)
+
+
+def test_bare_id_columns_do_not_join_tables():
+    index = SchemaIndex(
+        ddl("payments", "id", "amount_paid", "order_id")
+        + ddl("orders", "id", "order_id")
+        + ddl("players", "id", "hockey", "barcode")
+    )
+    payments, orders, players = range(3)
+    assert index._join_keys(payments, orders) == ["order_id"]
+    assert index._join_keys(payments, players) == []
+    assert index._join_keys(orders, players) == []
@@ -0,0 +1,137 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the execution-based selection of CHASE-SQL candidates."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from data_science.sub_agents.bigquery import tools
+from data_science.sub_agents.bigquery.chase_sql import chase_db_tools
+from data_science.sub_agents.bigquery.duckdb_backend import DuckDBBackend
+
+COUNT = "SELECT COUNT(*) AS n FROM `p.d.orders`"
+# Same result as COUNT, different SQL
+COUNT_TOO = "SELECT COUNT(order_id) AS orders FROM `p.d.orders`"
+SUM = "SELECT SUM(total) AS s FROM `p.d.orders`"
+SLOW = "SELECT 'slow'"
+
+
+class FakeModel:
+    """Answers the n-th call with the n-th SQL, and never answers SLOW"""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.cancelled = 0
+        self._lock = threading.Lock()
+
+    async def acall(self, prompt, parser_func=None, timeout=None):
+        with self._lock:
+            sql = self.answers.pop(0)
+        if sql == SLOW:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                with self._lock:
+                    self.cancelled += 1
+                raise
+        return parser_func(f"```sql\n{sql}\n```")
+
+
+@pytest.fixture(autouse=True)
+def duckdb_backend(tmp_path, monkeypatch):
+    (tmp_path / "orders.csv").write_text("order_id,total\n1,10.0\n2,5.5\n3,1.0\n")
+    backend = DuckDBBackend()
+    backend.load_csv_dir("p", "d", data_dir=str(tmp_path))
+    monkeypatch.setattr(tools, "backend", backend)
+    return backend
+
+
+def test_majority_wins_and_stragglers_are_cancelled():
+    model = FakeModel([SUM, COUNT, COUNT_TOO, SLOW, COUNT])
+    start = time.monotonic()
+    assert chase_db_tools.select_candidate(model, "prompt", 5) == COUNT
+    assert time.monotonic() - start < 30
+    deadline = time.monotonic() + 5
+    while model.cancelled < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert model.cancelled == 1
+
+
+def test_without_majority_the_largest_group_wins():
+    model = FakeModel([SUM, "DELETE FROM `p.d.orders`", COUNT, COUNT_TOO])
+    assert chase_db_tools.select_candidate(model, "prompt", 4) == COUNT
+
+
+def test_failing_candidates_are_skipped():
+    model = FakeModel(["SELECT * FROM `p.d.missing`", SUM, "not sql"])
+    assert chase_db_tools.select_candidate(model, "prompt", 3) == SUM
+
+
+def test_queries_still_running_are_cancelled(monkeypatch):
+    cancelled = threading.Event()
+
+    class BlockingBackend:
+        """Runs SLOW until it is cancelled, and the rest on DuckDB"""
+
+        def __init__(self, backend):
+            self.backend = backend
+
+        def run_query(self, sql, max_rows, canceller=None):
+            if sql != SLOW:
+                return self.backend.run_query(sql, max_rows, canceller)
+            canceller.on_start(cancelled.set)
+            if not cancelled.wait(timeout=30):
+                raise AssertionError("The query was never cancelled")
+            raise RuntimeError("Job cancelled")
+
+    async def acall(prompt, parser_func=None, timeout=None):
+        # Let the slow candidate start its query first
+        if answers[0] != SLOW:
+            await asyncio.sleep(0.2)
+        return answers.pop(0)
+
+    answers = [SLOW, COUNT, COUNT_TOO]
+    model = FakeModel([])
+    model.acall = acall
+    monkeypatch.setattr(tools, "backend", BlockingBackend(tools.backend))
+    assert chase_db_tools.select_candidate(model, "prompt", 3) in (COUNT, COUNT_TOO)
+    assert cancelled.wait(timeout=5)
+
+
+def test_slow_candidates_time_out():
+    timeouts = []
+
+    class TimedModel(FakeModel):
+        async def acall(self, prompt, parser_func=None, timeout=None):
+            timeouts.append(timeout)
+            return await super().acall(prompt, parser_func, timeout)
+
+    model = TimedModel([SLOW, SUM, SLOW])
+    start = time.monotonic()
+    assert chase_db_tools.select_candidate(model, "prompt", 3, timeout=0.5) == SUM
+    assert time.monotonic() - start < 5
+    assert timeouts == [0.5] * 3
+    deadline = time.monotonic() + 5
+    while model.cancelled < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert model.cancelled == 2
+
+
+def test_no_candidate_before_the_timeout():
+    model = FakeModel([SLOW, SLOW])
+    assert chase_db_tools.select_candidate(model, "prompt", 2, timeout=0.2) is None
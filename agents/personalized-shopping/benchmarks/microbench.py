@@ -0,0 +1,368 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Microbenchmarks for the hot functions of the shopping simulator.
+
+Every benchmark runs on fixed, in-memory fixtures (no catalog download, search
+index or JVM needed) and reports the time per call and the peak memory
+allocated during one call, as traced by `tracemalloc`. Times are also reported
+relative to a fixed pure-Python calibration workload measured in the same run;
+thresholds on that ratio (`time_ratio`) carry over between machines far better
+than thresholds in microseconds (`us_per_call`, still honored if present).
+
+    # Print the measurements
+    python benchmarks/microbench.py
+
+    # Fail (exit code 1) if any benchmark exceeds its threshold
+    python benchmarks/microbench.py --check benchmarks/thresholds.json
+
+    # Record new thresholds from the current machine, with headroom
+    python benchmarks/microbench.py --write-thresholds benchmarks/thresholds.json
+
+Benchmarks without an entry in the threshold file are reported but never fail
+the check, and benchmarks needing something unavailable offline (the spaCy
+model `en_core_web_sm` for `get_type_reward`) are skipped.
+"""
+
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.engine import (
+    get_product_per_page,
+    get_top_n_product_from_keywords,
+    map_action_to_html,
+    parse_action,
+    process_product,
+)
+from personalized_shopping.shared_libraries.web_agent_site.engine.goal import (
+    get_attribute_reward,
+    get_nlp,
+    get_option_reward,
+    get_type_reward,
+)
+from personalized_shopping.shared_libraries.web_agent_site.engine.normalize import (
+    normalize_color,
+    normalize_option_values,
+)
+from personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env import (
+    WebAgentTextEnv,
+)
+
+NOUNS = ["shirt", "dress", "sneaker", "hoodie", "skirt", "jacket", "sandal"]
+COLORS = ["navy blue", "light grey", "heather red", "black", "off white"]
+SIZES = ["small", "medium", "x-large", "3t", "10.5 wide"]
+
+
+def make_products(num_products=200):
+    """A deterministic catalog of raw products run through `process_product`"""
+    context = dict(
+        attributes={},
+        human_attributes={},
+        human_goals=True,
+        all_reviews={},
+        all_ratings={},
+    )
+    products = []
+    for i in range(num_products):
+        noun = NOUNS[i % len(NOUNS)]
+        asin = f"B{i:08d}X"
+        raw = dict(
+            asin=asin,
+            name=f"Women's Casual Cotton {noun.title()} Relaxed Fit {i}",
+            full_description=" ".join(
+                f"This soft cotton {noun} is machine washable and breathable."
+                for _ in range(20)
+            ),
+            small_description=[
+                f"Relaxed fit {noun} for everyday wear",
+                "Machine wash cold, tumble dry low",
+                "Imported",
+            ],
+            category="fashion",
+            query=f"women's {noun}s",
+            product_category=f"Clothing, Shoes & Jewelry › Women › {noun.title()}",
+            pricing=f"${10 + i % 40}.99" if i % 3 else "$12.00 - $30.00",
+            customization_options={
+                "Color": [{"value": c, "image": None} for c in COLORS],
+                "Size": [{"value": s} for s in SIZES],
+            },
+            images=[f"https://example.com/{asin}.jpg"],
+        )
+        product = process_product(raw, context)
+        product["Attributes"] = ["machine wash", "relaxed fit", "cotton"]
+        products.append(product)
+    normalize_option_values(products)
+    return products
+
+
+class FixtureSearchEngine:
+    """Stand-in for `LuceneSearcher` ranking products by title word overlap"""
+
+    class _Hit:
+        def __init__(self, docid, score):
+            self.docid = docid
+            self.score = score
+
+    class _Doc:
+        def __init__(self, docid):
+            self._raw = json.dumps({"id": docid})
+
+        def raw(self):
+            return self._raw
+
+    def __init__(self, products):
+        self.titles = [(p["asin"], set(p["Title"].lower().split())) for p in products]
+
+    def search(self, keywords, k=10):
+        words = set(keywords.lower().split())
+        scored = [(len(words & title), asin) for asin, title in self.titles]
+        scored.sort(key=lambda x: -x[0])
+        return [self._Hit(asin, float(score)) for score, asin in scored[:k]]
+
+    def doc(self, docid):
+        return self._Doc(docid)
+
+
+class ObservationFixture:
+    """Just enough of `WebAgentTextEnv` to run `convert_html_to_text`"""
+
+    _parse_html = WebAgentTextEnv._parse_html
+    convert_html_to_text = WebAgentTextEnv.convert_html_to_text
+
+    def __init__(self, url, asins):
+        self.state = dict(url=url)
+        self.session = "fixture"
+        self.server = type("Server", (), {})()
+        self.server.user_sessions = {"fixture": {"asins": asins}}
+
+
+def calibration_workload():
+    """Fixed pure-Python work (string formatting, dict updates and sorting)
+    that benchmark times are expressed relative to
+    """
+    counts = {}
+    for i in range(2000):
+        word = f"w{i % 97}"
+        counts[word] = counts.get(word, 0) + 1
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def spacy_skip_reason():
+    """Returns why spaCy benchmarks cannot run here, or None if they can"""
+    try:
+        get_nlp()
+    except (ImportError, OSError) as e:
+        return f"spaCy model unavailable ({e.__class__.__name__}: {e})"
+    return None
+
+
+def make_benchmarks():
+    """Returns (name, zero-argument callable) pairs over shared fixtures, and a
+    dict of the benchmarks that cannot run here to the reason why
+    """
+    products = make_products()
+    product_item_dict = {p["asin"]: p for p in products}
+    search_engine = FixtureSearchEngine(products)
+    keywords = ["women's", "cotton", "shirt", "relaxed"]
+    top_n_products = get_top_n_product_from_keywords(
+        keywords, search_engine, products, product_item_dict
+    )
+    product = products[0]
+    goal = dict(
+        asin=product["asin"],
+        category="fashion",
+        query="women's shirts",
+        name="Relaxed Fit Cotton Shirt for Women",
+        product_category="Clothing, Shoes & Jewelry › Women › Shirt",
+        instruction_text="i want a relaxed fit cotton shirt",
+        attributes=["relaxed fit", "long sleeve", "button down"],
+        price_upper=40.0,
+        goal_options=["navy blue", "x-large"],
+        weight=1,
+    )
+    options = {"color": "navy blue", "size": "x-large"}
+    instruction_text = goal["instruction_text"]
+    results_html = map_action_to_html(
+        "search",
+        session_id="fixture",
+        products=get_product_per_page(top_n_products, 1),
+        keywords=keywords,
+        page=1,
+        total=len(top_n_products),
+        instruction_text=instruction_text,
+    )
+    item_kwargs = dict(
+        session_id="fixture",
+        product_info=product,
+        keywords=keywords,
+        page=1,
+        asin=product["asin"],
+        options=options,
+        instruction_text=instruction_text,
+        show_attrs=False,
+    )
+    item_html = map_action_to_html("click", **item_kwargs)
+    results_env = ObservationFixture("", {products[1]["asin"]})
+    item_env = ObservationFixture(json.dumps(options), set())
+
+    skipped = {}
+    spacy_skipped = spacy_skip_reason()
+    if spacy_skipped is not None:
+        skipped["get_type_reward"] = spacy_skipped
+
+    benchmarks = [
+        ("parse_action", lambda: parse_action("click[b00000000x]")),
+        (
+            "get_top_n_product_from_keywords",
+            lambda: get_top_n_product_from_keywords(
+                keywords, search_engine, products, product_item_dict
+            ),
+        ),
+        ("get_product_per_page", lambda: get_product_per_page(top_n_products, 2)),
+        (
+            "map_action_to_html[search]",
+            lambda: map_action_to_html(
+                "search",
+                session_id="fixture",
+                products=get_product_per_page(top_n_products, 1),
+                keywords=keywords,
+                page=1,
+                total=len(top_n_products),
+                instruction_text=instruction_text,
+            ),
+        ),
+        (
+            "map_action_to_html[item]",
+            lambda: map_action_to_html("click", **item_kwargs),
+        ),
+        (
+            "convert_html_to_text[search]",
+            lambda: results_env.convert_html_to_text(results_html),
+        ),
+        (
+            "convert_html_to_text[item]",
+            lambda: item_env.convert_html_to_text(item_html),
+        ),
+        ("get_type_reward", lambda: get_type_reward(product, goal)),
+        ("get_attribute_reward", lambda: get_attribute_reward(product, goal)),
+        (
+            "get_option_reward",
+            lambda: get_option_reward(list(options.values()), goal["goal_options"]),
+        ),
+        ("normalize_color", lambda: normalize_color("Heather Navy Blue")),
+    ]
+    return [(name, fn) for name, fn in benchmarks if name not in skipped], skipped
+
+
+def measure(fn, repeat=5):
+    """Returns microseconds per call (best of `repeat`) and the peak number of
+    bytes allocated while running `fn` once
+    """
+    fn()  # warm up caches (and load spaCy) outside of the measurements
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    us_per_call = min(timer.repeat(repeat, number)) / number * 1e6
+
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dict(us_per_call=us_per_call, peak_alloc_bytes=peak - start)
+
+
+def check(results, thresholds):
+    """Returns descriptions of the measurements exceeding their thresholds"""
+    failures = []
+    for name, result in results.items():
+        for metric, limit in thresholds.get(name, {}).items():
+            if result[metric] > limit:
+                failures.append(f"{name}: {metric} {result[metric]:.4g} > {limit}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--check", metavar="PATH", help="threshold file to enforce")
+    parser.add_argument(
+        "--write-thresholds", metavar="PATH", help="record thresholds to PATH"
+    )
+    parser.add_argument(
+        "--time-headroom",
+        type=float,
+        default=3.0,
+        help="factor applied to measured times when recording thresholds",
+    )
+    parser.add_argument(
+        "--alloc-headroom",
+        type=float,
+        default=1.5,
+        help="factor applied to measured allocations when recording thresholds",
+    )
+    parser.add_argument("-k", default="", help="only run benchmarks matching this")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="timing repeats per benchmark"
+    )
+    args = parser.parse_args(argv)
+
+    benchmarks, skipped = make_benchmarks()
+    calibration_us = measure(calibration_workload, args.repeat)["us_per_call"]
+    print(f"calibration workload: {calibration_us:.2f} us/call")
+
+    results = {}
+    print(f"{'benchmark':<36}{'us/call':>12}{'x calib.':>10}{'peak alloc (B)':>16}")
+    for name, fn in benchmarks:
+        if args.k not in name:
+            continue
+        results[name] = measure(fn, args.repeat)
+        results[name]["time_ratio"] = results[name]["us_per_call"] / calibration_us
+        print(
+            f"{name:<36}{results[name]['us_per_call']:>12.2f}"
+            f"{results[name]['time_ratio']:>10.3f}"
+            f"{results[name]['peak_alloc_bytes']:>16}"
+        )
+    for name, reason in skipped.items():
+        if args.k in name:
+            print(f"{name:<36}skipped: {reason}")
+
+    if args.write_thresholds:
+        thresholds = {
+            name: dict(
+                time_ratio=float(f"{r['time_ratio'] * args.time_headroom:.3g}"),
+                peak_alloc_bytes=int(r["peak_alloc_bytes"] * args.alloc_headroom)
+                + 1024,
+            )
+            for name, r in results.items()
+        }
+        with open(args.write_thresholds, "w") as f:
+            json.dump(thresholds, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.check:
+        with open(args.check) as f:
+            failures = check(results, json.load(f))
+        for failure in failures:
+            print(f"REGRESSION {failure}")
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,26 +12,77 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import gym
+"""Lazily initialized WebShop environment shared by the agent tools.
 
-gym.envs.registration.register(
-    id="WebAgentTextEnv-v0",
-    entry_point=(
-        "personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env:WebAgentTextEnv"
-    ),
-)
+Nothing heavy (gym, spaCy, pyserini and its JVM, the product catalog) is
+loaded at import time. The environment is built on the first call to
+`get_webshop_env()`, or ahead of time with `warm_up()`; either way a profile of
+the time and memory spent per component is printed once it is ready.
+"""
+
+import sys
+import threading
+
+from .web_agent_site.utils import STARTUP_PROFILE
+
+ENV_ID = "WebAgentTextEnv-v0"
+
+num_product_items = 1000
+
+_webshop_env = None
+_webshop_env_lock = threading.Lock()
 
 
 def init_env(num_products):
+    import gym
+
+    try:
+        gym.spec(ENV_ID)
+    except gym.error.Error:
+        gym.envs.registration.register(
+            id=ENV_ID,
+            entry_point=(
+                "personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env:WebAgentTextEnv"
+            ),
+        )
     env = gym.make(
-        "WebAgentTextEnv-v0",
+        ENV_ID,
         observation_mode="text",
         num_products=num_products,
     )
     return env
 
 
-num_product_items = 1000
-webshop_env = init_env(num_product_items)
-webshop_env.reset()
-print(f"Finished initializing WebshopEnv with {num_product_items} items.")
+def get_webshop_env():
+    """Returns the shared environment, initializing it on first use"""
+    global _webshop_env
+    with _webshop_env_lock:
+        if _webshop_env is None:
+            with STARTUP_PROFILE.component("webshop_env"):
+                env = init_env(num_product_items)
+                env.reset()
+            # Workaround to Resolve the PyTorch-Streamlit Incompatibility Issue
+            if "torch" in sys.modules:
+                sys.modules["torch"].classes.__path__ = []
+            _webshop_env = env
+            print(f"Finished initializing WebshopEnv with {num_product_items} items.")
+            print(STARTUP_PROFILE.report())
+    return _webshop_env
+
+
+def warm_up():
+    """Initialize every heavy component now rather than on first use, e.g.
+    before serving requests. Returns the startup profile.
+    """
+    from .web_agent_site.engine.goal import get_nlp
+
+    get_webshop_env()
+    get_nlp()
+    return STARTUP_PROFILE
+
+
+def __getattr__(name):
+    # Backwards compatible access to the shared environment
+    if name == "webshop_env":
+        return get_webshop_env()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
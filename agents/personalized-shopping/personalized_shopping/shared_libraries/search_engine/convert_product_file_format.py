@@ -13,12 +13,18 @@
 # limitations under the License.
 
 import json
+import os
 import sys
 from tqdm import tqdm
 
 sys.path.insert(0, "../")
 
 from web_agent_site.engine.engine import load_products
+from web_agent_site.engine.sharding import shard_of
+
+# Optionally also write per-shard resources for `SimServer(num_shards=...)`,
+# e.g. `python convert_product_file_format.py 4`.
+NUM_SHARDS = int(sys.argv[1]) if len(sys.argv) > 1 else 0
 
 all_products, *_ = load_products(filepath="../data/items_shuffle_1000.json")
 
@@ -59,3 +65,15 @@ with open("./resources_10k/documents.jsonl", "w+") as f:
 with open("./resources_50k/documents.jsonl", "w+") as f:
     for doc in docs[:50000]:
         f.write(json.dumps(doc) + "\n")
+
+if NUM_SHARDS > 1:
+    for size, n in [("100", 100), ("1k", 1000), ("10k", 10000), ("50k", 50000)]:
+        shard_files = []
+        for shard_id in range(NUM_SHARDS):
+            shard_dir = f"./resources_{size}_shards{NUM_SHARDS}/shard_{shard_id}"
+            os.makedirs(shard_dir, exist_ok=True)
+            shard_files.append(open(f"{shard_dir}/documents.jsonl", "w+"))
+        for doc in docs[:n]:
+            shard_files[shard_of(doc["id"], NUM_SHARDS)].write(json.dumps(doc) + "\n")
+        for f in shard_files:
+            f.close()
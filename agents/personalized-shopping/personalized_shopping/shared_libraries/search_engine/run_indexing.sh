@@ -45,3 +45,15 @@ python -m pyserini.index.lucene \
   --generator DefaultLuceneDocumentGenerator \
   --threads 1 \
   --storePositions --storeDocvectors --storeRaw
+
+# Index per-shard resources written by `convert_product_file_format.py N`.
+for shard_dir in resources_*_shards*/shard_*; do
+  [ -d "$shard_dir" ] || continue
+  python -m pyserini.index.lucene \
+    --collection JsonCollection \
+    --input "$shard_dir" \
+    --index "${shard_dir/resources_/indexes_}" \
+    --generator DefaultLuceneDocumentGenerator \
+    --threads 1 \
+    --storePositions --storeDocvectors --storeRaw
+done
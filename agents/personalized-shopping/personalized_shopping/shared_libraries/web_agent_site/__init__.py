@@ -12,4 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .envs.web_agent_text_env import WebAgentTextEnv
+
+def __getattr__(name):
+    # Importing the environment pulls in gym, pyserini and the catalog loaders,
+    # so defer it until `WebAgentTextEnv` is actually requested.
+    if name == "WebAgentTextEnv":
+        from .envs.web_agent_text_env import WebAgentTextEnv
+
+        return WebAgentTextEnv
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -15,18 +15,27 @@
 """ """
 
 from ast import literal_eval
-from collections import defaultdict
+from collections import defaultdict, deque
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from decimal import Decimal
+import gc
+import itertools
 import json
+import multiprocessing
 import os
 import random
 import re
+from typing import NamedTuple, Optional
+from urllib.parse import urlencode
 
-from flask import render_template_string
-from pyserini.search.lucene import LuceneSearcher
+from jinja2 import Environment, FileSystemLoader
+import numpy as np
 from rich import print
 from tqdm import tqdm
 
+from .normalize import normalize_option_values
 from ..utils import (
     BASE_DIR,
     DEFAULT_ATTR_PATH,
@@ -51,72 +60,180 @@ ACTION_TO_TEMPLATE = {
     "Attributes": "attributes_page.html",
 }
 
+# Page routes of the WebShop app. The simulator only needs their URLs for
+# rendering; they are all served from the root with the arguments encoded in
+# the query string, which is what Flask's `url_for` produced for them.
+ROUTES = ("index", "search_results", "item_page", "item_sub_page", "done")
+
+
+def url_for(endpoint, **values):
+    """Context-free replacement for Flask's `url_for` used by the templates"""
+    if endpoint == "static":
+        return f"/static/{values['filename']}"
+    if endpoint not in ROUTES:
+        raise ValueError(f"Unknown endpoint {endpoint}.")
+    query = []
+    for key, value in values.items():
+        if isinstance(value, (list, tuple)):
+            query.extend((key, v) for v in value if v is not None)
+        elif value is not None:
+            query.append((key, value))
+    return "/?" + urlencode(query, safe="!$'()*,/:;?@") if query else "/"
+
+
+TEMPLATE_ENV = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=True,
+    auto_reload=False,
+)
+TEMPLATE_ENV.globals["url_for"] = url_for
 
-def map_action_to_html(action, **kwargs):
+
+def _start_page_context(kwargs):
+    return dict(
+        session_id=kwargs["session_id"],
+        instruction_text=kwargs["instruction_text"],
+    )
+
+
+def _results_page_context(kwargs):
+    return dict(
+        session_id=kwargs["session_id"],
+        products=kwargs["products"],
+        keywords=kwargs["keywords"],
+        page=kwargs["page"],
+        total=kwargs["total"],
+        instruction_text=kwargs["instruction_text"],
+    )
+
+
+def _done_page_context(kwargs):
+    return dict(
+        session_id=kwargs["session_id"],
+        reward=kwargs["reward"],
+        asin=kwargs["asin"],
+        options=kwargs["options"],
+        reward_info=kwargs.get("reward_info"),
+        goal_attrs=kwargs.get("goal_attrs"),
+        purchased_attrs=kwargs.get("purchased_attrs"),
+        goal=kwargs.get("goal"),
+        mturk_code=kwargs.get("mturk_code"),
+        query=kwargs.get("query"),
+        category=kwargs.get("category"),
+        product_category=kwargs.get("product_category"),
+    )
+
+
+def _sub_page_context(kwargs):
+    return dict(
+        session_id=kwargs["session_id"],
+        product_info=kwargs["product_info"],
+        keywords=kwargs["keywords"],
+        page=kwargs["page"],
+        asin=kwargs["asin"],
+        options=kwargs["options"],
+        instruction_text=kwargs.get("instruction_text"),
+    )
+
+
+def _item_page_context(kwargs):
+    return dict(_sub_page_context(kwargs), show_attrs=kwargs["show_attrs"])
+
+
+class Clickable(NamedTuple):
+    """Lightweight record of an element that can be clicked on a rendered page
+
+    `kind` is one of "search" (the search bar's submit button), "button",
+    "product" (a product link) or "option" (a buying option radio button, in
+    which case `option_name` is the option it sets).
+    """
+
+    kind: str
+    label: str
+    option_name: Optional[str] = None
+
+
+def _buttons(*labels):
+    return [Clickable("button", label.lower()) for label in labels]
+
+
+# The functions below list the clickables of each page in document order,
+# mirroring the templates: buttons and product links first, then options.
+def _start_page_clickables(context):
+    return [Clickable("search", "search")]
+
+
+def _results_page_clickables(context):
+    clickables = _buttons(BACK_TO_SEARCH)
+    if context["page"] > 1:
+        clickables += _buttons(PREV_PAGE)
+    clickables += _buttons(NEXT_PAGE)
+    clickables += [
+        Clickable("product", product["asin"].lower()) for product in context["products"]
+    ]
+    return clickables
+
+
+def _done_page_clickables(context):
+    return []
+
+
+def _sub_page_clickables(context):
+    return _buttons(BACK_TO_SEARCH, PREV_PAGE)
+
+
+def _item_page_clickables(context):
+    sub_pages = ["Description", "Features", "Reviews"]
+    if context["show_attrs"]:
+        sub_pages.append("Attributes")
+    clickables = _buttons(BACK_TO_SEARCH, PREV_PAGE, *sub_pages, END_BUTTON)
+    for option_name, option_contents in context["product_info"]["options"].items():
+        clickables += [
+            Clickable("option", option_content, option_name)
+            for option_content in option_contents
+        ]
+    return clickables
+
+
+# Page type -> (template, function selecting the template variables,
+# function listing the page's clickables from those variables)
+PAGE_RENDERERS = {
+    "start": ("search_page.html", _start_page_context, _start_page_clickables),
+    "search": ("results_page.html", _results_page_context, _results_page_clickables),
+    "done": ("done_page.html", _done_page_context, _done_page_clickables),
+    "item": ("item_page.html", _item_page_context, _item_page_clickables),
+    **{
+        sub_page: (template, _sub_page_context, _sub_page_clickables)
+        for sub_page, template in ACTION_TO_TEMPLATE.items()
+    },
+}
+
+
+def get_page_type(action):
+    """Map an action string to the key of the page it renders in PAGE_RENDERERS"""
     action_name, action_arg = parse_action(action)
-    if action_name == "start":
-        path = os.path.join(TEMPLATE_DIR, "search_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
-            session_id=kwargs["session_id"],
-            instruction_text=kwargs["instruction_text"],
-        )
-    elif action_name == "search":
-        path = os.path.join(TEMPLATE_DIR, "results_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
-            session_id=kwargs["session_id"],
-            products=kwargs["products"],
-            keywords=kwargs["keywords"],
-            page=kwargs["page"],
-            total=kwargs["total"],
-            instruction_text=kwargs["instruction_text"],
-        )
-    elif action_name == "click" and action_arg == END_BUTTON:
-        path = os.path.join(TEMPLATE_DIR, "done_page.html")
-        html = render_template_string(
-            read_html_template(path),
-            session_id=kwargs["session_id"],
-            reward=kwargs["reward"],
-            asin=kwargs["asin"],
-            options=kwargs["options"],
-            reward_info=kwargs.get("reward_info"),
-            goal_attrs=kwargs.get("goal_attrs"),
-            purchased_attrs=kwargs.get("purchased_attrs"),
-            goal=kwargs.get("goal"),
-            mturk_code=kwargs.get("mturk_code"),
-            query=kwargs.get("query"),
-            category=kwargs.get("category"),
-            product_category=kwargs.get("product_category"),
-        )
-    elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
-        path = os.path.join(TEMPLATE_DIR, ACTION_TO_TEMPLATE[action_arg])
-        html = render_template_string(
-            read_html_template(path),
-            session_id=kwargs["session_id"],
-            product_info=kwargs["product_info"],
-            keywords=kwargs["keywords"],
-            page=kwargs["page"],
-            asin=kwargs["asin"],
-            options=kwargs["options"],
-            instruction_text=kwargs.get("instruction_text"),
-        )
-    elif action_name == "click":
-        path = os.path.join(TEMPLATE_DIR, "item_page.html")
-        html = render_template_string(
-            read_html_template(path),
-            session_id=kwargs["session_id"],
-            product_info=kwargs["product_info"],
-            keywords=kwargs["keywords"],
-            page=kwargs["page"],
-            asin=kwargs["asin"],
-            options=kwargs["options"],
-            instruction_text=kwargs.get("instruction_text"),
-            show_attrs=kwargs["show_attrs"],
-        )
-    else:
-        raise ValueError("Action name not recognized.")
-    return html
+    if action_name in ("start", "search"):
+        return action_name
+    if action_name == "click":
+        if action_arg == END_BUTTON:
+            return "done"
+        if action_arg in ACTION_TO_TEMPLATE:
+            return action_arg
+        return "item"
+    raise ValueError("Action name not recognized.")
+
+
+def map_action_to_html(action, **kwargs):
+    template_name, get_context, _ = PAGE_RENDERERS[get_page_type(action)]
+    return TEMPLATE_ENV.get_template(template_name).render(get_context(kwargs))
+
+
+def map_action_to_clickables(action, **kwargs):
+    """Returns the clickables of the page rendered for `action`, keyed by the
+    text an agent uses to click them
+    """
+    _, get_context, get_clickables = PAGE_RENDERERS[get_page_type(action)]
+    return {c.label: c for c in get_clickables(get_context(kwargs))}
 
 
 def read_html_template(path):
@@ -154,6 +271,15 @@ def convert_web_app_string_to_var(name, string):
     return var
 
 
+def _products_where(all_products, field, values):
+    """Products whose `field` is one of `values`, in catalog order; sharded
+    catalogs filter on their shards instead of sending every product over
+    """
+    if hasattr(all_products, "where"):
+        return all_products.where(field, values)
+    return [p for p in all_products if p[field] in values]
+
+
 def get_top_n_product_from_keywords(
     keywords,
     search_engine,
@@ -162,25 +288,31 @@ def get_top_n_product_from_keywords(
     attribute_to_asins=None,
 ):
     if keywords[0] == "<r>":
-        top_n_products = random.sample(all_products, k=SEARCH_RETURN_N)
+        if hasattr(all_products, "sample"):
+            top_n_products = all_products.sample(SEARCH_RETURN_N)
+        else:
+            top_n_products = random.sample(all_products, k=SEARCH_RETURN_N)
     elif keywords[0] == "<a>":
         attribute = " ".join(keywords[1:]).strip()
         asins = attribute_to_asins[attribute]
-        top_n_products = [p for p in all_products if p["asin"] in asins]
+        top_n_products = _products_where(all_products, "asin", asins)
     elif keywords[0] == "<c>":
         category = keywords[1].strip()
-        top_n_products = [p for p in all_products if p["category"] == category]
+        top_n_products = _products_where(all_products, "category", {category})
     elif keywords[0] == "<q>":
         query = " ".join(keywords[1:]).strip()
-        top_n_products = [p for p in all_products if p["query"] == query]
+        top_n_products = _products_where(all_products, "query", {query})
     else:
         keywords = " ".join(keywords)
         hits = search_engine.search(keywords, k=SEARCH_RETURN_N)
         docs = [search_engine.doc(hit.docid) for hit in hits]
         top_n_asins = [json.loads(doc.raw())["id"] for doc in docs]
-        top_n_products = [
-            product_item_dict[asin] for asin in top_n_asins if asin in product_item_dict
-        ]
+        if hasattr(product_item_dict, "get_many"):
+            # One batched request per shard instead of two per hit
+            found = product_item_dict.get_many(top_n_asins)
+        else:
+            found = [product_item_dict.get(asin) for asin in top_n_asins]
+        top_n_products = [p for p in found if p is not None]
     return top_n_products
 
 
@@ -188,22 +320,52 @@ def get_product_per_page(top_n_products, page):
     return top_n_products[(page - 1) * PRODUCT_WINDOW : page * PRODUCT_WINDOW]
 
 
+class ProductPrices(Mapping):
+    """Product prices stored as one NumPy array aligned with catalog order
+
+    `array[i]` is the price of `asins[i]`; lookups by asin go through the usual
+    mapping interface.
+    """
+
+    def __init__(self, asins, prices):
+        self.asins = list(asins)
+        self.array = np.asarray(prices, dtype=float)
+        self.positions = {asin: i for i, asin in enumerate(self.asins)}
+
+    def __getitem__(self, asin):
+        return float(self.array[self.positions[asin]])
+
+    def __iter__(self):
+        return iter(self.asins)
+
+    def __len__(self):
+        return len(self.asins)
+
+    def take(self, asins):
+        """Prices of `asins` as an array, in the given order"""
+        return self.array[[self.positions[asin] for asin in asins]]
+
+
 def generate_product_prices(all_products):
-    product_prices = dict()
-    for product in all_products:
-        asin = product["asin"]
+    """Draws a price for every product within its listed price range
+
+    Products without pricing cost 100.0 and products with a single price keep
+    it. The draws come from one NumPy generator seeded from `random`, so
+    seeding `random` still fixes the prices.
+    """
+    low = np.full(len(all_products), 100.0)
+    high = np.full(len(all_products), 100.0)
+    for i, product in enumerate(all_products):
         pricing = product["pricing"]
-        if not pricing:
-            price = 100.0
-        elif len(pricing) == 1:
-            price = pricing[0]
-        else:
-            price = random.uniform(*pricing[:2])
-        product_prices[asin] = price
-    return product_prices
+        if pricing:
+            low[i] = pricing[0]
+            high[i] = pricing[1] if len(pricing) > 1 else pricing[0]
+    rng = np.random.default_rng(random.getrandbits(64))
+    prices = low + (high - low) * rng.random(len(all_products))
+    return ProductPrices((product["asin"] for product in all_products), prices)
 
 
-def init_search_engine(num_products=None):
+def get_index_name(num_products=None):
     if num_products == 100:
         indexes = "indexes_100"
     elif num_products == 1000:
@@ -218,38 +380,280 @@ def init_search_engine(num_products=None):
         raise NotImplementedError(
             f"num_products being {num_products} is not supported yet."
         )
-    search_engine = LuceneSearcher(
-        os.path.join(BASE_DIR, f"../search_engine/{indexes}")
-    )
+    return indexes
+
+
+def init_search_engine(num_products=None, index_path=None):
+    # Imported here since loading pyserini starts the JVM
+    from pyserini.search.lucene import LuceneSearcher
+
+    if index_path is None:
+        indexes = get_index_name(num_products)
+        index_path = os.path.join(BASE_DIR, f"../search_engine/{indexes}")
+    search_engine = LuceneSearcher(index_path)
     return search_engine
 
 
-def clean_product_keys(products):
-    for product in products:
-        product.pop("product_information", None)
-        product.pop("brand", None)
-        product.pop("brand_url", None)
-        product.pop("list_price", None)
-        product.pop("availability_quantity", None)
-        product.pop("availability_status", None)
-        product.pop("total_reviews", None)
-        product.pop("total_answered_questions", None)
-        product.pop("seller_id", None)
-        product.pop("seller_name", None)
-        product.pop("fulfilled_by_amazon", None)
-        product.pop("fast_track_message", None)
-        product.pop("aplus_present", None)
-        product.pop("small_description_old", None)
-    print("Keys cleaned.")
-    return products
-
-
-def load_products(filepath, num_products=None, human_goals=True):
-    # TODO: move to preprocessing step -> enforce single source of truth
+CLEANED_PRODUCT_KEYS = (
+    "product_information",
+    "brand",
+    "brand_url",
+    "list_price",
+    "availability_quantity",
+    "availability_status",
+    "total_reviews",
+    "total_answered_questions",
+    "seller_id",
+    "seller_name",
+    "fulfilled_by_amazon",
+    "fast_track_message",
+    "aplus_present",
+    "small_description_old",
+)
+
+# Raw products handed to a worker process at a time by `load_products`
+LOAD_CHUNK_SIZE = 2000
+
+
+def iter_json_array(filepath, buffer_size=1 << 20):
+    """Yields the elements of the top-level JSON array in `filepath` one at a
+    time, without reading the whole file into memory
+    """
+    decoder = json.JSONDecoder()
     with open(filepath) as f:
-        products = json.load(f)
-    print("Products loaded.")
-    products = clean_product_keys(products)
+        buffer, pos, eof = "", 0, False
+
+        def fill(buffer, pos):
+            """Drop the consumed prefix and append the next block of the file"""
+            more = f.read(buffer_size)
+            return buffer[pos:] + more, 0, not more
+
+        def skip(buffer, pos, eof):
+            """Advance past whitespace, reading more as needed"""
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer, pos, eof
+                buffer, pos, eof = fill(buffer, pos)
+
+        buffer, pos, eof = skip(buffer, pos, eof)
+        if buffer[pos : pos + 1] != "[":
+            raise ValueError(f"{filepath} does not contain a JSON array")
+        buffer, pos, eof = skip(buffer, pos + 1, eof)
+        if buffer[pos : pos + 1] == "]":
+            return
+        while True:
+            buffer, pos, eof = skip(buffer, pos, eof)
+            # Elements are never empty, e.g. `[1,,2]` or `[1,]`
+            if buffer[pos : pos + 1] in (",", "]"):
+                raise ValueError(f"Malformed JSON array in {filepath}")
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer, pos, eof = fill(buffer, pos)
+                continue
+            # A scalar cut by the end of the buffer (e.g. `1.` of `1.5`) decodes
+            # as a shorter value, so only accept the element once it is followed
+            # by a separator
+            after = end
+            while after < len(buffer) and buffer[after].isspace():
+                after += 1
+            if buffer[after : after + 1] not in (",", "]"):
+                if eof:
+                    raise ValueError(f"Malformed JSON array in {filepath}")
+                buffer, pos, eof = fill(buffer, pos)
+                continue
+            yield item
+            if buffer[after] == "]":
+                return
+            pos = after + 1
+
+
+def process_product(p, context):
+    """Turn one raw catalog entry into the product record used by the simulator
+
+    Pure function of `p` and the shared `context` (attributes, reviews, ...), so
+    products can be processed in any order and in any process. Returns None for
+    entries without a valid asin.
+    """
+    asin = p["asin"]
+    if asin == "nan" or len(asin) > 10:
+        return None
+    for key in CLEANED_PRODUCT_KEYS:
+        p.pop(key, None)
+
+    p["Title"] = p["name"]
+    p["Description"] = p["full_description"]
+    p["Reviews"] = context["all_reviews"].get(asin, [])
+    p["Rating"] = context["all_ratings"].get(asin, "N.A.")
+    for r in p["Reviews"]:
+        if "score" not in r:
+            r["score"] = r.pop("stars")
+        if "review" not in r:
+            r["body"] = ""
+        else:
+            r["body"] = r.pop("review")
+    p["BulletPoints"] = (
+        p["small_description"]
+        if isinstance(p["small_description"], list)
+        else [p["small_description"]]
+    )
+
+    pricing = p.get("pricing")
+    if pricing is None or not pricing:
+        pricing = [100.0]
+        price_tag = "$100.0"
+    else:
+        pricing = [
+            float(Decimal(re.sub(r"[^\d.]", "", price)))
+            for price in pricing.split("$")[1:]
+        ]
+        if len(pricing) == 1:
+            price_tag = f"${pricing[0]}"
+        else:
+            price_tag = f"${pricing[0]} to ${pricing[1]}"
+            pricing = pricing[:2]
+    p["pricing"] = pricing
+    p["Price"] = price_tag
+
+    options = dict()
+    customization_options = p["customization_options"]
+    option_to_image = dict()
+    if customization_options:
+        for option_name, option_contents in customization_options.items():
+            if option_contents is None:
+                continue
+            option_name = option_name.lower()
+
+            option_values = []
+            for option_content in option_contents:
+                option_value = (
+                    option_content["value"].strip().replace("/", " | ").lower()
+                )
+                option_image = option_content.get("image", None)
+
+                option_values.append(option_value)
+                option_to_image[option_value] = option_image
+            options[option_name] = option_values
+    p["options"] = options
+    p["option_to_image"] = option_to_image
+
+    # without color, size, price, availability
+    # if asin in attributes and 'attributes' in attributes[asin]:
+    #     products[i]['Attributes'] = attributes[asin]['attributes']
+    # else:
+    #     products[i]['Attributes'] = ['DUMMY_ATTR']
+    # products[i]['instruction_text'] = \
+    #     attributes[asin].get('instruction', None)
+    # products[i]['instruction_attributes'] = \
+    #     attributes[asin].get('instruction_attributes', None)
+
+    # without color, size, price, availability
+    attributes = context["attributes"]
+    if asin in attributes and "attributes" in attributes[asin]:
+        p["Attributes"] = attributes[asin]["attributes"]
+    else:
+        p["Attributes"] = ["DUMMY_ATTR"]
+
+    if context["human_goals"]:
+        if asin in context["human_attributes"]:
+            p["instructions"] = context["human_attributes"][asin]
+    else:
+        p["instruction_text"] = attributes[asin].get("instruction", None)
+
+        p["instruction_attributes"] = attributes[asin].get(
+            "instruction_attributes", None
+        )
+
+    p["MainImage"] = p["images"][0]
+    p["query"] = p["query"].lower().strip()
+    return p
+
+
+_worker_context = None
+
+
+def _init_load_worker(context):
+    global _worker_context
+    _worker_context = context
+
+
+def _process_chunk(chunk):
+    return [process_product(p, _worker_context) for p in chunk]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _process_chunks_in_pool(chunks, context, num_workers):
+    """Process chunks in worker processes, yielding results in input order while
+    keeping at most two chunks per worker in flight
+    """
+    # Spawn rather than fork: the parent may already hold a running JVM.
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_load_worker,
+        initargs=(context,),
+    ) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_process_chunk, chunk))
+            if len(pending) >= 2 * num_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+@contextmanager
+def _gc_paused():
+    """Suspend the cyclic garbage collector while building the catalog, which
+    would otherwise rescan the growing set of product objects over and over
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def load_products(
+    filepath, num_products=None, human_goals=True, num_workers=1, asin_filter=None
+):
+    """Load, clean and annotate the product catalog
+
+    Arguments:
+
+    num_products (`int`) -- Only consider the first `num_products` catalog entries
+    num_workers (`int`) -- If greater than 1, transform products in this many
+      worker processes. The catalog is still parsed in this process and shipping
+      products to and from the workers costs about as much as transforming
+      them, so this only pays off for expensive per-product transformations.
+    asin_filter (`func`) -- Only keep (and transform) entries whose asin
+      satisfies this predicate, e.g. the products of one catalog shard
+    """
+    with _gc_paused():
+        return _load_products(
+            filepath, num_products, human_goals, num_workers, asin_filter
+        )
+
+
+def _load_products(filepath, num_products, human_goals, num_workers, asin_filter):
+    # TODO: move to preprocessing step -> enforce single source of truth
+    products = iter_json_array(filepath)
+    if num_products is not None:
+        # using item_shuffle.json, we assume products already shuffled
+        products = itertools.islice(products, num_products)
+    if asin_filter is not None:
+        products = (p for p in products if asin_filter(p["asin"]))
 
     # with open(DEFAULT_REVIEW_PATH) as f:
     #     reviews = json.load(f)
@@ -259,126 +663,52 @@ def load_products(filepath, num_products=None, human_goals=True):
     #     all_reviews[r['asin']] = r['reviews']
     #     all_ratings[r['asin']] = r['average_rating']
 
-    if human_goals:
-        with open(HUMAN_ATTR_PATH) as f:
-            human_attributes = json.load(f)
     with open(DEFAULT_ATTR_PATH) as f:
         attributes = json.load(f)
     with open(HUMAN_ATTR_PATH) as f:
         human_attributes = json.load(f)
     print("Attributes loaded.")
+    context = dict(
+        attributes=attributes,
+        human_attributes=human_attributes,
+        human_goals=human_goals,
+        all_reviews=all_reviews,
+        all_ratings=all_ratings,
+    )
+
+    chunks = _chunks(products, LOAD_CHUNK_SIZE)
+    first_chunks = list(itertools.islice(chunks, 2))
+    if num_workers > 1 and len(first_chunks) > 1:
+        results = _process_chunks_in_pool(
+            itertools.chain(first_chunks, chunks), context, num_workers
+        )
+    else:
+        results = (
+            [process_product(p, context) for p in chunk]
+            for chunk in itertools.chain(first_chunks, chunks)
+        )
 
+    # Deduplicate by asin afterwards, keeping the first occurrence
     asins = set()
     all_products = []
     attribute_to_asins = defaultdict(set)
-    if num_products is not None:
-        # using item_shuffle.json, we assume products already shuffled
-        products = products[:num_products]
-    for i, p in tqdm(enumerate(products), total=len(products)):
-        asin = p["asin"]
-        if asin == "nan" or len(asin) > 10:
-            continue
-
-        if asin in asins:
-            continue
-        else:
-            asins.add(asin)
-
-        products[i]["category"] = p["category"]
-        products[i]["query"] = p["query"]
-        products[i]["product_category"] = p["product_category"]
-
-        products[i]["Title"] = p["name"]
-        products[i]["Description"] = p["full_description"]
-        products[i]["Reviews"] = all_reviews.get(asin, [])
-        products[i]["Rating"] = all_ratings.get(asin, "N.A.")
-        for r in products[i]["Reviews"]:
-            if "score" not in r:
-                r["score"] = r.pop("stars")
-            if "review" not in r:
-                r["body"] = ""
-            else:
-                r["body"] = r.pop("review")
-        products[i]["BulletPoints"] = (
-            p["small_description"]
-            if isinstance(p["small_description"], list)
-            else [p["small_description"]]
-        )
-
-        pricing = p.get("pricing")
-        if pricing is None or not pricing:
-            pricing = [100.0]
-            price_tag = "$100.0"
-        else:
-            pricing = [
-                float(Decimal(re.sub(r"[^\d.]", "", price)))
-                for price in pricing.split("$")[1:]
-            ]
-            if len(pricing) == 1:
-                price_tag = f"${pricing[0]}"
-            else:
-                price_tag = f"${pricing[0]} to ${pricing[1]}"
-                pricing = pricing[:2]
-        products[i]["pricing"] = pricing
-        products[i]["Price"] = price_tag
-
-        options = dict()
-        customization_options = p["customization_options"]
-        option_to_image = dict()
-        if customization_options:
-            for option_name, option_contents in customization_options.items():
-                if option_contents is None:
+    with tqdm(unit=" products") as progress:
+        for processed in results:
+            progress.update(len(processed))
+            for p in processed:
+                if p is None or p["asin"] in asins:
                     continue
-                option_name = option_name.lower()
-
-                option_values = []
-                for option_content in option_contents:
-                    option_value = (
-                        option_content["value"].strip().replace("/", " | ").lower()
-                    )
-                    option_image = option_content.get("image", None)
-
-                    option_values.append(option_value)
-                    option_to_image[option_value] = option_image
-                options[option_name] = option_values
-        products[i]["options"] = options
-        products[i]["option_to_image"] = option_to_image
-
-        # without color, size, price, availability
-        # if asin in attributes and 'attributes' in attributes[asin]:
-        #     products[i]['Attributes'] = attributes[asin]['attributes']
-        # else:
-        #     products[i]['Attributes'] = ['DUMMY_ATTR']
-        # products[i]['instruction_text'] = \
-        #     attributes[asin].get('instruction', None)
-        # products[i]['instruction_attributes'] = \
-        #     attributes[asin].get('instruction_attributes', None)
-
-        # without color, size, price, availability
-        if asin in attributes and "attributes" in attributes[asin]:
-            products[i]["Attributes"] = attributes[asin]["attributes"]
-        else:
-            products[i]["Attributes"] = ["DUMMY_ATTR"]
-
-        if human_goals:
-            if asin in human_attributes:
-                products[i]["instructions"] = human_attributes[asin]
-        else:
-            products[i]["instruction_text"] = attributes[asin].get("instruction", None)
-
-            products[i]["instruction_attributes"] = attributes[asin].get(
-                "instruction_attributes", None
-            )
-
-        products[i]["MainImage"] = p["images"][0]
-        products[i]["query"] = p["query"].lower().strip()
-
-        all_products.append(products[i])
+                asins.add(p["asin"])
+                all_products.append(p)
+    print("Products loaded.")
 
     for p in all_products:
         for a in p["Attributes"]:
             attribute_to_asins[a].add(p["asin"])
 
+    num_option_values = normalize_option_values(all_products)
+    print(f"Normalized {num_option_values} option values.")
+
     product_item_dict = {p["asin"]: p for p in all_products}
     product_prices = generate_product_prices(all_products)
     return all_products, product_item_dict, product_prices, attribute_to_asins
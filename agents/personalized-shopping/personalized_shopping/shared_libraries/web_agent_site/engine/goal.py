@@ -15,16 +15,65 @@
 """Functions for specifying goals and reward calculations."""
 
 from collections import defaultdict
+import functools
 import itertools
 import random
+
+import numpy as np
 from rich import print
-import spacy
 from thefuzz import fuzz
 from .normalize import normalize_color
-
-nlp = spacy.load("en_core_web_sm")
+from ..utils import STARTUP_PROFILE
 
 PRICE_RANGE = [10.0 * i for i in range(1, 100)]
+PRICE_POINTS = np.array(PRICE_RANGE)
+NO_PRICE_UPPER = 1000000
+
+
+@functools.lru_cache(maxsize=None)
+def get_nlp():
+    """Loads the spaCy pipeline used to compare product types on first use"""
+    with STARTUP_PROFILE.component("spacy"):
+        import spacy
+
+        return spacy.load("en_core_web_sm")
+
+
+def sample_price_uppers(prices, rng):
+    """Price upper bounds for goals on products costing `prices`, in one pass
+
+    For each price, two of the (up to) four price points above it are drawn
+    without replacement and the larger one is the bound. Prices with fewer
+    than two points above them get `NO_PRICE_UPPER`.
+    """
+    prices = np.asarray(prices, dtype=float)
+    start = np.searchsorted(PRICE_POINTS, prices, side="right")
+    count = np.minimum(len(PRICE_POINTS) - start, 4)
+    n = np.maximum(count, 2)
+    first = rng.integers(0, n)
+    second = rng.integers(0, n - 1)
+    second += second >= first
+    offsets = np.minimum(start + np.maximum(first, second), len(PRICE_POINTS) - 1)
+    return np.where(count >= 2, PRICE_POINTS[offsets], NO_PRICE_UPPER)
+
+
+def get_price_constraints(asins, product_prices):
+    """Returns `(price_upper, price_text)` pairs for goals on `asins`"""
+    if product_prices is None:
+        return [(NO_PRICE_UPPER, "")] * len(asins)
+    if hasattr(product_prices, "take"):
+        prices = product_prices.take(asins)
+    else:
+        prices = [product_prices[asin] for asin in asins]
+    rng = np.random.default_rng(random.getrandbits(64))
+    constraints = []
+    for price_upper in sample_price_uppers(prices, rng).tolist():
+        if price_upper == NO_PRICE_UPPER:
+            constraints.append((NO_PRICE_UPPER, ""))
+        else:
+            price_text = f", and price lower than {price_upper:.2f} dollars"
+            constraints.append((price_upper, price_text))
+    return constraints
 
 
 def get_goals(all_products, product_prices, human_goals=True):
@@ -48,18 +97,6 @@ def get_human_goals(all_products, product_prices):
                 cnt += 1
                 continue
 
-            if product_prices is not None:
-                price = product_prices[asin]
-                price_range = [p for p in PRICE_RANGE if p > price][:4]
-                if len(price_range) >= 2:
-                    _, price_upper = sorted(random.sample(price_range, 2))
-                    price_text = f", and price lower than {price_upper:.2f} dollars"
-                else:
-                    price_upper = 1000000
-                    price_text = ""
-            else:
-                price_upper = 1000000
-
             goals.append(
                 {
                     "asin": asin,
@@ -67,16 +104,18 @@ def get_human_goals(all_products, product_prices):
                     "query": item["query"],
                     "name": item["name"],
                     "product_category": item["product_category"],
-                    "instruction_text": product["instruction"].strip(".") + price_text,
+                    "instruction_text": product["instruction"].strip("."),
                     "attributes": attributes,
-                    "price_upper": price_upper,
                     "goal_options": product["instruction_options"],
                 }
             )
             for att in attributes:
                 cnt_atts[att] += 1
             # goals += product_goals
-    for goal in goals:
+    constraints = get_price_constraints([g["asin"] for g in goals], product_prices)
+    for goal, (price_upper, price_text) in zip(goals, constraints):
+        goal["instruction_text"] += price_text
+        goal["price_upper"] = price_upper
         goal["weight"] = 1
     print(cnt, "skipped")
     return goals
@@ -85,27 +124,18 @@ def get_human_goals(all_products, product_prices):
 def get_synthetic_goals(all_products, product_prices):
     goals = []
     cnt_atts = defaultdict(int)
-    for product in all_products:
-        if "instruction_text" not in product or product["instruction_text"] is None:
-            continue
+    products = [
+        product
+        for product in all_products
+        if product.get("instruction_text") is not None
+    ]
+    constraints = get_price_constraints([p["asin"] for p in products], product_prices)
+    for product, (price_upper, price_text) in zip(products, constraints):
         product_goals = []
         asin = product["asin"]
         attributes = product["instruction_attributes"]
         assert len(attributes) > 0
 
-        if product_prices is not None:
-            price = product_prices[asin]
-            price_range = [p for p in PRICE_RANGE if p > price][:4]
-            if len(price_range) >= 2:
-                _, price_upper = sorted(random.sample(price_range, 2))
-                price_text = f", and price lower than {price_upper:.2f} dollars"
-            else:
-                price_upper = 1000000
-                price_text = ""
-        else:
-            price_upper = 1000000
-            price_text = ""
-
         instruction_text = product["instruction_text"]
 
         options = product["options"]
@@ -161,6 +191,7 @@ def get_type_reward(purchased_product, goal):
     purchased_type = purchased_product["name"]
     desired_type = goal["name"]
 
+    nlp = get_nlp()
     purchased_type_parse = nlp(purchased_type)
     desired_type_parse = nlp(desired_type)
 
@@ -202,10 +233,28 @@ def get_type_reward(purchased_product, goal):
     )
 
 
+def get_attribute_text(product):
+    """Lowercased title, bullet points and description of a product, searched by
+    `get_attribute_reward` for goal attributes missing from the attribute list
+
+    The fields are separated by NUL characters so that a match cannot span two
+    of them, exactly as if each were tested on its own.
+    """
+    return "\0".join(
+        (
+            product["Title"].lower(),
+            " ".join(product["BulletPoints"]).lower(),
+            product["Description"].lower(),
+        )
+    )
+
+
 def get_attribute_reward(purchased_product, goal):
     """Determines whether purchased products shares same attributes as goal"""
     purchased_attrs = purchased_product["Attributes"]
     goal_attrs = goal["attributes"]
+    # Built on first use, once per call rather than once per goal attribute
+    attribute_text = None
 
     num_attr_matches = 0
     for g_attr in goal_attrs:
@@ -218,13 +267,12 @@ def get_attribute_reward(purchased_product, goal):
                 matched = True
                 break
         # If not in purchased attrs, check Title, Bullet Points (Features), Desc
-        if not matched and (
-            g_attr in purchased_product["Title"].lower()
-            or g_attr in " ".join(purchased_product["BulletPoints"]).lower()
-            or g_attr in purchased_product["Description"].lower()
-        ):
-            num_attr_matches += 1
-            matched = True
+        if not matched:
+            if attribute_text is None:
+                attribute_text = get_attribute_text(purchased_product)
+            if g_attr in attribute_text:
+                num_attr_matches += 1
+                matched = True
 
     r_attr = num_attr_matches / len(goal_attrs)
     return r_attr, num_attr_matches
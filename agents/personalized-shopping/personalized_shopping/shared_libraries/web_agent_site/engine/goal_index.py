@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Lookup indexes and declarative filtering over a list of goals.
+
+Filters are lists of `(column, op, value)` triples that must all hold, e.g.
+
+    [("category", "in", {"fashion", "beauty"}), ("num_attributes", ">=", 2)]
+
+String columns (`asin`, `category`, `query`, `product_category`) support
+`==`, `!=`, `in` and `not in`. Numeric columns (`price_upper`, `weight`,
+`num_attributes`, `num_options`) additionally support `<`, `<=`, `>` and
+`>=`. The `attributes` column supports `contains` / `not contains` for one
+attribute and `in` / `not in` for any of several.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+STRING_COLUMNS = ("asin", "category", "query", "product_category")
+NUMERIC_COLUMNS = ("price_upper", "weight", "num_attributes", "num_options")
+
+COMPARISONS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+}
+
+
+def _positions(index):
+    return {key: np.array(value, dtype=np.int64) for key, value in index.items()}
+
+
+class GoalIndex:
+    """Inverted indexes and columnar arrays built once over `goals`.
+
+    Positions returned by lookups and filters refer to the `goals` list the
+    index was built from.
+    """
+
+    def __init__(self, goals):
+        self.num_goals = len(goals)
+        # value -> positions, for the string columns and each attribute
+        self.indexes = {}
+        # value -> code, and the per-goal codes, for the string columns
+        self.vocabularies = {}
+        self.codes = {}
+        for column in STRING_COLUMNS:
+            index = defaultdict(list)
+            for i, goal in enumerate(goals):
+                index[goal[column]].append(i)
+            self.vocabularies[column] = {
+                value: code for code, value in enumerate(index)
+            }
+            codes = np.empty(len(goals), dtype=np.int64)
+            for code, positions in enumerate(index.values()):
+                codes[positions] = code
+            self.codes[column] = codes
+            self.indexes[column] = _positions(index)
+        index = defaultdict(list)
+        for i, goal in enumerate(goals):
+            for attribute in goal["attributes"]:
+                index[attribute].append(i)
+        self.indexes["attributes"] = _positions(index)
+
+        self.numeric = {
+            "price_upper": np.array([g["price_upper"] for g in goals], dtype=float),
+            "weight": np.array([g["weight"] for g in goals], dtype=float),
+            "num_attributes": np.array(
+                [len(g["attributes"]) for g in goals], dtype=np.int64
+            ),
+            "num_options": np.array(
+                [len(g["goal_options"]) for g in goals], dtype=np.int64
+            ),
+        }
+
+    def lookup(self, column, value):
+        """Positions of the goals whose `column` equals (or, for `attributes`,
+        contains) `value`
+        """
+        if column not in self.indexes:
+            raise ValueError(f"Cannot look up goals by {column!r}")
+        return self.indexes[column].get(value, np.empty(0, dtype=np.int64))
+
+    def by_asin(self, asin):
+        return self.lookup("asin", asin)
+
+    def by_category(self, category):
+        return self.lookup("category", category)
+
+    def by_query(self, query):
+        return self.lookup("query", query)
+
+    def by_attribute(self, attribute):
+        return self.lookup("attributes", attribute)
+
+    def mask(self, filters):
+        """Boolean array marking the goals that satisfy every filter"""
+        mask = np.ones(self.num_goals, dtype=bool)
+        for column, op, value in filters:
+            mask &= self._evaluate(column, op, value)
+        return mask
+
+    def select(self, filters):
+        """Positions of the goals that satisfy every filter, in order"""
+        return np.flatnonzero(self.mask(filters))
+
+    def _evaluate(self, column, op, value):
+        if column == "attributes":
+            return self._evaluate_attributes(op, value)
+        if column in self.codes:
+            vocabulary = self.vocabularies[column]
+            codes = self.codes[column]
+            if op in ("==", "!="):
+                values = [value]
+            elif op in ("in", "not in"):
+                values = value
+            else:
+                raise ValueError(f"Unsupported operator {op!r} for {column!r}")
+            matches = np.isin(codes, [vocabulary[v] for v in values if v in vocabulary])
+            return ~matches if op in ("!=", "not in") else matches
+        if column in self.numeric:
+            array = self.numeric[column]
+            if op in COMPARISONS:
+                return COMPARISONS[op](array, value)
+            if op in ("in", "not in"):
+                matches = np.isin(array, list(value))
+                return ~matches if op == "not in" else matches
+            raise ValueError(f"Unsupported operator {op!r} for {column!r}")
+        raise ValueError(f"Unknown goal column {column!r}")
+
+    def _evaluate_attributes(self, op, value):
+        if op in ("contains", "not contains"):
+            values = [value]
+        elif op in ("in", "not in"):
+            values = value
+        else:
+            raise ValueError(f"Unsupported operator {op!r} for 'attributes'")
+        matches = np.zeros(self.num_goals, dtype=bool)
+        for v in values:
+            matches[self.by_attribute(v)] = True
+        return ~matches if op in ("not contains", "not in") else matches
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import re
 from typing import Tuple
 
@@ -168,12 +169,71 @@ SIZE_PATTERNS = [
 SIZE_PATTERNS = [re.compile(s) for s in SIZE_SET] + SIZE_PATTERNS
 
 
+# Single-pass matchers equivalent to scanning COLOR_SET / SIZE_PATTERNS in
+# order. The color lookahead reports every (possibly overlapping) occurrence so
+# the earliest entry of COLOR_SET can be picked; each size alternative is
+# anchored at the start and tried in list order, so the first pattern that
+# `re.search` would accept wins.
+_COLOR_INDEX = {color: i for i, color in enumerate(COLOR_SET)}
+_COLOR_MATCHER = re.compile(
+    "(?=(" + "|".join(re.escape(color) for color in COLOR_SET) + "))"
+)
+_SIZE_MATCHER = re.compile(
+    "|".join(
+        f"(?P<p{i}>(?s:.*?)(?:{pattern.pattern}))"
+        for i, pattern in enumerate(SIZE_PATTERNS)
+    )
+)
+
+
+def _match_color(color_string: str):
+    """Returns the first entry of COLOR_SET contained in the string, or None"""
+    found = _COLOR_MATCHER.findall(color_string)
+    if not found:
+        return None
+    return min(found, key=_COLOR_INDEX.__getitem__)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _normalize_color_cached(color_string: str) -> str:
+    norm_color = _match_color(color_string)
+    return color_string if norm_color is None else norm_color
+
+
 def normalize_color(color_string: str) -> str:
     """Extracts the first color found if exists"""
-    for norm_color in COLOR_SET:
-        if norm_color in color_string:
-            return norm_color
-    return color_string
+    if not isinstance(color_string, str):
+        # Goal options may be (name, value) pairs, where `in` means equality.
+        for norm_color in COLOR_SET:
+            if norm_color in color_string:
+                return norm_color
+        return color_string
+    return _normalize_color_cached(color_string)
+
+
+def normalize_size(size_string: str) -> str:
+    """Maps a lowercased size value to the matching SIZE_PATTERNS pattern"""
+    m = _SIZE_MATCHER.match(size_string)
+    if m is not None:
+        return SIZE_PATTERNS[int(m.lastgroup[1:])].pattern
+    if size_string.replace(".", "", 1).isdigit():
+        return "numeric_size"
+    return "not_matched"
+
+
+def normalize_option_values(products) -> int:
+    """Warms the color cache with every option value of the catalog.
+
+    Meant to be called once at load time so that reward computation only hits
+    memoized results. Returns the number of distinct values normalized.
+    """
+    values = set()
+    for product in products:
+        for option_values in product.get("options", {}).values():
+            values.update(option_values)
+    for value in values:
+        normalize_color(value)
+    return len(values)
 
 
 def normalize_color_size(product_prices: dict) -> Tuple[dict, dict]:
@@ -188,30 +248,12 @@ def normalize_color_size(product_prices: dict) -> Tuple[dict, dict]:
     # Create mapping of each original color value to corresponding set value
     color_mapping = {"N.A.": "not_matched"}
     for c in all_colors:
-        matched = False
-        for base in COLOR_SET:
-            if base in c:
-                color_mapping[c] = base
-                matched = True
-                break
-        if not matched:
-            color_mapping[c] = "not_matched"
+        base = _match_color(c)
+        color_mapping[c] = "not_matched" if base is None else base
 
     # Create mapping of each original size value to corresponding set value
     size_mapping = {"N.A.": "not_matched"}
     for s in all_sizes:
-        matched = False
-        for pattern in SIZE_PATTERNS:
-            m = re.search(pattern, s)
-            if m is not None:
-                matched = True
-                size_mapping[s] = pattern.pattern
-                break
-        if not matched:
-            if s.replace(".", "", 1).isdigit():
-                size_mapping[s] = "numeric_size"
-                matched = True
-        if not matched:
-            size_mapping[s] = "not_matched"
+        size_mapping[s] = normalize_size(s)
 
     return color_mapping, size_mapping
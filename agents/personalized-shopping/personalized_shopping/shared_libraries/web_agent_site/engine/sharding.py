@@ -0,0 +1,338 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Catalog sharding for serving large product catalogs across processes.
+
+Products are partitioned by a stable hash of their asin. Every shard runs in
+its own worker process holding its products, prices, goals and a Lucene index
+built over the same partition. The coordinator side exposes the pieces
+`SimServer` binds (`all_products`, `product_item_dict`, `product_prices`,
+`search_engine`) as proxies that route or fan out requests to the shards.
+
+Note that BM25 scores are computed per shard, so merged rankings use
+shard-local term statistics.
+"""
+
+import bisect
+from collections import defaultdict, namedtuple
+from collections.abc import Mapping, Sequence
+import heapq
+import json
+import multiprocessing
+import os
+import random
+import threading
+import zlib
+
+from ..utils import BASE_DIR
+
+SHARD_CHUNK_SIZE = 1000
+
+ShardHit = namedtuple("ShardHit", ["docid", "score"])
+
+
+def shard_of(asin, num_shards):
+    """Returns the shard owning `asin`; stable across processes and runs"""
+    return zlib.crc32(asin.encode()) % num_shards
+
+
+def shard_index_path(index_name, shard_id, num_shards):
+    """Location of the Lucene index for one shard of `index_name`"""
+    return os.path.join(
+        BASE_DIR,
+        f"../search_engine/{index_name}_shards{num_shards}/shard_{shard_id}",
+    )
+
+
+def shard_handlers(products, product_prices, goals, search):
+    """Requests a shard answers, by method name, over its slice of the catalog"""
+    product_item_dict = {p["asin"]: p for p in products}
+
+    def where(field, values):
+        values = set(values)
+        return [p for p in products if p[field] in values]
+
+    handlers = {
+        "product": product_item_dict.get,
+        "has_product": product_item_dict.__contains__,
+        "price": product_prices.get,
+        "products": lambda start, stop: products[start:stop],
+        "products_at": lambda indices: [products[i] for i in indices],
+        "where": where,
+        "goals": lambda: goals,
+        "search": search,
+    }
+    # Batched lookups, e.g. ("product", asins), answered in one round trip
+    handlers["get_many"] = lambda method, keys: [handlers[method](k) for k in keys]
+    return handlers
+
+
+def _serve_shard(conn, shard_id, num_shards, file_path, num_products, human_goals):
+    """Worker process entry point: load one shard and answer requests on `conn`"""
+    # Imported here so that the (spawned) worker pays for these, not the parent.
+    from pyserini.search.lucene import LuceneSearcher
+
+    from .engine import generate_product_prices, get_index_name, load_products
+    from .goal import get_goals
+
+    # Only the products owned by this shard are transformed and kept
+    products, *_ = load_products(
+        filepath=file_path,
+        num_products=num_products,
+        human_goals=human_goals,
+        asin_filter=lambda asin: shard_of(asin, num_shards) == shard_id,
+    )
+    product_prices = generate_product_prices(products)
+    goals = get_goals(products, product_prices, human_goals)
+    search_engine = LuceneSearcher(
+        shard_index_path(get_index_name(num_products), shard_id, num_shards)
+    )
+
+    asins = {p["asin"] for p in products}
+
+    def search(keywords, k):
+        hits = search_engine.search(keywords, k=k)
+        return [(hit.docid, hit.score) for hit in hits if hit.docid in asins]
+
+    handlers = shard_handlers(products, product_prices, goals, search)
+    conn.send(len(products))
+    while True:
+        method, args = conn.recv()
+        if method == "close":
+            break
+        try:
+            conn.send((True, handlers[method](*args)))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            conn.send((False, f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class CatalogShardPool:
+    """Owns the shard worker processes and the pipes used to talk to them"""
+
+    def __init__(self, num_shards, file_path, num_products=None, human_goals=True):
+        self.num_shards = num_shards
+        # Spawn rather than fork: the parent may already hold a running JVM.
+        ctx = multiprocessing.get_context("spawn")
+        self.conns, self.processes = [], []
+        for shard_id in range(num_shards):
+            parent_conn, child_conn = ctx.Pipe()
+            process = ctx.Process(
+                target=_serve_shard,
+                args=(
+                    child_conn,
+                    shard_id,
+                    num_shards,
+                    file_path,
+                    num_products,
+                    human_goals,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.conns.append(parent_conn)
+            self.processes.append(process)
+        self.locks = [threading.Lock() for _ in range(num_shards)]
+        # Shards load concurrently; wait for all of them to report their size.
+        self.sizes = [conn.recv() for conn in self.conns]
+        self.offsets = [0]
+        for size in self.sizes:
+            self.offsets.append(self.offsets[-1] + size)
+        print(f"Loaded {self.offsets[-1]} products across {num_shards} shards.")
+
+    @staticmethod
+    def _unwrap(response):
+        ok, result = response
+        if not ok:
+            raise RuntimeError(f"Catalog shard request failed: {result}")
+        return result
+
+    def call(self, shard_id, method, *args):
+        """Run `method` on a single shard"""
+        with self.locks[shard_id]:
+            self.conns[shard_id].send((method, args))
+            return self._unwrap(self.conns[shard_id].recv())
+
+    def route(self, asin, method, *args):
+        """Run `method` on the shard that owns `asin`"""
+        return self.call(shard_of(asin, self.num_shards), method, asin, *args)
+
+    def broadcast(self, method, *args):
+        """Run `method` on every shard concurrently and return results in shard order"""
+        shard_args = {shard_id: args for shard_id in range(self.num_shards)}
+        return list(self.scatter(method, shard_args).values())
+
+    def scatter(self, method, shard_args):
+        """Run `method` concurrently on several shards, each with its own arguments
+
+        `shard_args` maps shard ids to argument tuples. Returns a dict of shard
+        id to result, in shard order.
+        """
+        shard_ids = sorted(shard_args)
+        for shard_id in shard_ids:
+            self.locks[shard_id].acquire()
+        try:
+            for shard_id in shard_ids:
+                self.conns[shard_id].send((method, shard_args[shard_id]))
+            # Read every response before raising, so no pipe is left out of step
+            responses = {
+                shard_id: self.conns[shard_id].recv() for shard_id in shard_ids
+            }
+            return {
+                shard_id: self._unwrap(response)
+                for shard_id, response in responses.items()
+            }
+        finally:
+            for shard_id in shard_ids:
+                self.locks[shard_id].release()
+
+    def close(self):
+        for conn, lock in zip(self.conns, self.locks):
+            with lock:
+                conn.send(("close", ()))
+        for process in self.processes:
+            process.join()
+
+
+class ShardedMapping(Mapping):
+    """Read-only asin-keyed mapping whose lookups are routed to the owning shard"""
+
+    def __init__(self, pool, method):
+        self.pool = pool
+        self.method = method
+
+    def __getitem__(self, asin):
+        value = self.pool.route(asin, self.method)
+        if value is None:
+            raise KeyError(asin)
+        return value
+
+    def __contains__(self, asin):
+        return self.pool.route(asin, "has_product")
+
+    def get_many(self, asins):
+        """Values of `asins` (None for unknown ones), with one request per shard"""
+        by_shard = defaultdict(list)
+        for asin in asins:
+            by_shard[shard_of(asin, self.pool.num_shards)].append(asin)
+        results = self.pool.scatter(
+            "get_many",
+            {shard_id: (self.method, keys) for shard_id, keys in by_shard.items()},
+        )
+        values = {}
+        for shard_id, keys in by_shard.items():
+            values.update(zip(keys, results[shard_id]))
+        return [values[asin] for asin in asins]
+
+    def __iter__(self):
+        for product in ShardedProductList(self.pool):
+            yield product["asin"]
+
+    def __len__(self):
+        return self.pool.offsets[-1]
+
+
+class ShardedProductList(Sequence):
+    """All products of the catalog, in shard order, fetched from shards on demand"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __len__(self):
+        return self.pool.offsets[-1]
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        shard_id = bisect.bisect_right(self.pool.offsets, idx) - 1
+        local_idx = idx - self.pool.offsets[shard_id]
+        return self.pool.call(shard_id, "products", local_idx, local_idx + 1)[0]
+
+    def __iter__(self):
+        for shard_id, size in enumerate(self.pool.sizes):
+            for start in range(0, size, SHARD_CHUNK_SIZE):
+                yield from self.pool.call(
+                    shard_id, "products", start, start + SHARD_CHUNK_SIZE
+                )
+
+    def where(self, field, values):
+        """Products whose `field` is one of `values`, in list order
+
+        The shards filter their own products, and asin filters only go to the
+        shards owning the asins.
+        """
+        values = list(values)
+        if field == "asin":
+            by_shard = defaultdict(list)
+            for asin in values:
+                by_shard[shard_of(asin, self.pool.num_shards)].append(asin)
+            shard_args = {
+                shard_id: (field, asins) for shard_id, asins in by_shard.items()
+            }
+        else:
+            shard_args = {
+                shard_id: (field, values) for shard_id in range(self.pool.num_shards)
+            }
+        results = self.pool.scatter("where", shard_args)
+        return [product for products in results.values() for product in products]
+
+    def sample(self, k):
+        """Same as `random.sample(self, k)`, with one request per shard"""
+        indices = random.sample(range(len(self)), k)
+        by_shard = defaultdict(list)
+        for idx in indices:
+            shard_id = bisect.bisect_right(self.pool.offsets, idx) - 1
+            by_shard[shard_id].append(idx - self.pool.offsets[shard_id])
+        results = self.pool.scatter(
+            "products_at",
+            {shard_id: (local,) for shard_id, local in by_shard.items()},
+        )
+        products = {}
+        for shard_id, local in by_shard.items():
+            for local_idx, product in zip(local, results[shard_id]):
+                products[self.pool.offsets[shard_id] + local_idx] = product
+        return [products[idx] for idx in indices]
+
+
+class _StoredDoc:
+    def __init__(self, docid):
+        self.docid = docid
+
+    def raw(self):
+        return json.dumps({"id": self.docid})
+
+
+class ShardedSearchEngine:
+    """Drop-in for `LuceneSearcher` that fans a query out to every shard and
+    merges the per-shard top-k hits by score
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def search(self, keywords, k=10):
+        shard_hits = self.pool.broadcast("search", keywords, k)
+        merged = heapq.nlargest(
+            k,
+            (hit for hits in shard_hits for hit in hits),
+            key=lambda hit: hit[1],
+        )
+        return [ShardHit(docid, score) for docid, score in merged]
+
+    def doc(self, docid):
+        return _StoredDoc(docid)
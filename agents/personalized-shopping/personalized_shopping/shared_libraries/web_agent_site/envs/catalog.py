@@ -0,0 +1,141 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Versioned catalog snapshots served by `SimServer`.
+
+A `Catalog` bundles everything derived from one product file: products,
+prices, the search index and the goals sampled from them. `SimServer` swaps
+whole catalogs atomically, and every session keeps a reference to the catalog
+it started on, so running episodes are unaffected by a swap. A catalog is
+reclaimed once neither the server nor any session refers to it.
+"""
+
+import random
+import weakref
+
+import numpy as np
+
+from ..engine.engine import init_search_engine, load_products
+from ..engine.goal import get_goals
+from ..engine.goal_index import GoalIndex
+from ..engine.sharding import (
+    CatalogShardPool,
+    ShardedMapping,
+    ShardedProductList,
+    ShardedSearchEngine,
+)
+from ..utils import STARTUP_PROFILE, random_idx
+
+
+class Catalog:
+    """One version of the products, prices, search index and goals"""
+
+    def __init__(
+        self,
+        all_products,
+        product_item_dict,
+        product_prices,
+        search_engine,
+        goals,
+        shards=None,
+    ):
+        self.version = 0  # assigned by `SimServer.swap_catalog`
+        self.all_products = all_products
+        self.product_item_dict = product_item_dict
+        self.product_prices = product_prices
+        self.search_engine = search_engine
+        self.goals = goals
+        self.shards = shards
+        self.weights = [goal["weight"] for goal in goals]
+        self.cum_weights = [0] + np.cumsum(self.weights).tolist()
+        # Lookups by asin, category, query and attribute, and filters over goals
+        self.goal_index = GoalIndex(goals)
+        if shards is not None:
+            # Stop the shard workers once this version is no longer referenced
+            weakref.finalize(self, shards.close)
+
+
+def load_catalog(
+    file_path,
+    filter_goals=None,
+    limit_goals=-1,
+    num_products=None,
+    human_goals=0,
+    num_shards=None,
+    index_path=None,
+    num_workers=1,
+):
+    """Load products, search index and goals into a new `Catalog`
+
+    Arguments are those of `SimServer`, plus:
+
+    index_path (`str`) -- Lucene index to search instead of the default index
+      for `num_products` (ignored when sharded)
+    """
+    shards = None
+    if num_shards is not None and num_shards > 1:
+        with STARTUP_PROFILE.component("catalog_shards"):
+            shards = CatalogShardPool(num_shards, file_path, num_products, human_goals)
+        all_products = ShardedProductList(shards)
+        product_item_dict = ShardedMapping(shards, "product")
+        product_prices = ShardedMapping(shards, "price")
+        search_engine = ShardedSearchEngine(shards)
+        goals = [goal for goals in shards.broadcast("goals") for goal in goals]
+    else:
+        with STARTUP_PROFILE.component("catalog"):
+            all_products, product_item_dict, product_prices, _ = load_products(
+                filepath=file_path,
+                num_products=num_products,
+                human_goals=human_goals,
+                num_workers=num_workers,
+            )
+        with STARTUP_PROFILE.component("search_engine"):
+            search_engine = init_search_engine(
+                num_products=num_products, index_path=index_path
+            )
+        with STARTUP_PROFILE.component("goals"):
+            goals = get_goals(all_products, product_prices, human_goals)
+
+    # Fix outcome for random shuffling of goals, without reseeding the global
+    # generator that session ids and goal draws of running sessions use
+    rng = random.Random(233)
+    rng.shuffle(goals)
+
+    # Apply `filter_goals` parameter if exists to select speific goal(s)
+    if callable(filter_goals):
+        goals = [goal for (i, goal) in enumerate(goals) if filter_goals(i, goal)]
+    elif filter_goals is not None:
+        keep = GoalIndex(goals).select(filter_goals)
+        goals = [goals[i] for i in keep]
+
+    # Imposes `limit` on goals via random selection
+    if limit_goals != -1 and limit_goals < len(goals):
+        weights = [goal["weight"] for goal in goals]
+        cum_weights = [0] + np.cumsum(weights).tolist()
+        idxs = []
+        while len(idxs) < limit_goals:
+            idx = random_idx(cum_weights, rng)
+            if idx not in idxs:
+                idxs.append(idx)
+        goals = [goals[i] for i in idxs]
+    print(f"Loaded {len(goals)} goals.")
+
+    return Catalog(
+        all_products,
+        product_item_dict,
+        product_prices,
+        search_engine,
+        goals,
+        shards=shards,
+    )
@@ -0,0 +1,151 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Thin clients for a simulator served by `envs.http_server`.
+
+`SimServerClient` stands in for `SimServer`, so an agent process can run the
+usual environment without loading a catalog:
+
+    env = WebAgentTextEnv(server=SimServerClient("http://127.0.0.1:3000"))
+
+`HttpSimBrowser` offers the `SimBrowser` interface on its own, without
+importing the environment at all. Session state is mirrored locally from each
+response; snapshots restored with `WebAgentTextEnv.restore` only update the
+mirror, not the remote session.
+"""
+
+from ..engine.engine import Clickable
+
+
+class SimServerClient:
+    """Forwards `SimServer` calls to a remote simulator over pooled connections"""
+
+    def __init__(self, endpoint, timeout=60.0):
+        """Constructor for the client
+
+        Arguments:
+
+        endpoint (`str`) -- Base URL of the simulator, e.g. "http://127.0.0.1:3000"
+        timeout (`float`) -- Seconds to wait for a response
+        """
+        import httpx
+
+        self.http = httpx.Client(base_url=endpoint.rstrip("/"), timeout=timeout)
+        self.user_sessions = dict()
+        # Shown on rendered pages instead of the goal's instruction, if set
+        self.assigned_instruction_text = None
+
+    def _post(self, route, session_id, **action):
+        action["assigned_instruction_text"] = self.assigned_instruction_text
+        response = self.http.post(f"/{route}/{session_id}", json=action)
+        response.raise_for_status()
+        result = response.json()
+        self.user_sessions[session_id] = self._mirror(result["session"])
+        return result["html"], result["url"], result["status"]
+
+    @staticmethod
+    def _mirror(state):
+        state["asins"] = set(state["asins"])
+        state["clickables"] = {
+            text: Clickable(*clickable)
+            for text, clickable in state["clickables"].items()
+        }
+        return state
+
+    def receive(self, session_id, current_url, session_int=None, **kwargs):
+        """Same as `SimServer.receive`: start a session, search or click"""
+        if not kwargs:
+            return self._post(
+                "index", session_id, current_url=current_url, session_int=session_int
+            )
+        if "keywords" in kwargs:
+            return self._post(
+                "search_results",
+                session_id,
+                current_url=current_url,
+                keywords=kwargs["keywords"],
+                page=kwargs.get("page", 1),
+            )
+        # The server validates clicks against its own copy of the clickables
+        return self._post(
+            "click",
+            session_id,
+            current_url=current_url,
+            clickable_name=kwargs["clickable_name"],
+        )
+
+    def end_session(self, session_id):
+        self.user_sessions.pop(session_id, None)
+        self.http.delete(f"/session/{session_id}").raise_for_status()
+
+    def is_session_current(self, session_id):
+        response = self.http.get(f"/session/{session_id}")
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return response.json()["current"]
+
+    def health(self):
+        response = self.http.get("/health")
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.http.close()
+
+
+class HttpSimBrowser:
+    """`SimBrowser` for a remote simulator"""
+
+    def __init__(self, endpoint, timeout=60.0):
+        self.server = SimServerClient(endpoint, timeout=timeout)
+        self.current_url = None
+        self.page_source = None
+        self.session_id = None
+
+    @property
+    def clickables(self):
+        """Clickables of the current page, keyed by their (lowercased) text"""
+        return self.server.user_sessions[self.session_id]["clickables"]
+
+    def get(self, url, session_id=None, session_int=None):
+        """Set browser variables to corresponding link, page HTML for URL"""
+        self.session_id = url.split("/")[-1] if session_id is None else session_id
+        self.page_source, _, _ = self.server.receive(
+            self.session_id, self.current_url, session_int=session_int
+        )
+        self.current_url = url
+
+    def click(self, clickable_name, text_to_clickable=None):
+        """Click `clickable_name` on the current page"""
+        self.page_source, self.current_url, status = self.server.receive(
+            self.session_id,
+            current_url=self.current_url,
+            clickable_name=clickable_name,
+        )
+        return status
+
+    def search(self, keywords):
+        """Search for `keywords` from the current page"""
+        if isinstance(keywords, str):
+            keywords = keywords.split(" ")
+        self.page_source, self.current_url, status = self.server.receive(
+            self.session_id,
+            current_url=self.current_url,
+            keywords=keywords,
+        )
+        return status
+
+    def close(self):
+        self.server.close()
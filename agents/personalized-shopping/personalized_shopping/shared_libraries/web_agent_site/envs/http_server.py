@@ -0,0 +1,327 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""HTTP/JSON serving mode for `SimServer`.
+
+One process loads the catalog and search index once and serves any number of
+agent processes, which drive it through `envs.http_client`:
+
+    python -m personalized_shopping.shared_libraries.web_agent_site.envs.http_server \\
+        --num-products 1000 --port 3000
+
+The pages named on `SimServer` are exposed as `POST /index/<session_id>`,
+`/search_results/<session_id>`, `/item_page/<session_id>`,
+`/item_sub_page/<session_id>` and `/done/<session_id>`, next to
+`POST /click/<session_id>` which dispatches a click the way `SimServer.receive`
+does. Every response carries the page HTML and URL, the reward status and the
+session state. The app is served by uvicorn with HTTP/1.1 keep-alive;
+simulator calls run on worker threads. Requests on the same session are
+serialized, while requests on different sessions run concurrently: they only
+share the catalog, which they read, and the session table, whose bookkeeping
+is done under a short lock.
+
+Sessions end with `DELETE /session/<session_id>`. Sessions idle for longer than
+the session TTL are ended too, as are the least recently used ones beyond the
+session limit, so abandoned clients don't keep sessions (and the catalog
+versions they are pinned to) alive.
+"""
+
+import argparse
+from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+import time
+from typing import List, Optional
+
+from ..engine.engine import ACTION_TO_TEMPLATE
+from ..utils import DEFAULT_FILE_PATH
+from .prefetch import DEFAULT_MEMORY_BUDGET
+from .web_agent_text_env import SimServer
+
+DEFAULT_BASE_URL = "http://127.0.0.1:3000"
+DEFAULT_SESSION_TTL = 3600  # seconds
+DEFAULT_MAX_SESSIONS = 10000
+SUB_PAGES = {k.lower() for k in ACTION_TO_TEMPLATE}
+
+
+def session_state(server, session_id):
+    """JSON-serializable view of a session, as mirrored by `SimServerClient`"""
+    session = server.user_sessions[session_id]
+    return dict(
+        goal=session["goal"],
+        goal_idx=session["goal_idx"],
+        done=session["done"],
+        reward=session.get("reward"),
+        verbose_info=session.get("verbose_info"),
+        keywords=session.get("keywords"),
+        page=session.get("page"),
+        asin=session.get("asin"),
+        asins=sorted(session.get("asins", ())),
+        options=session.get("options", {}),
+        actions=dict(session.get("actions", {})),
+        clickables={
+            text: list(clickable)
+            for text, clickable in session.get("clickables", {}).items()
+        },
+        catalog_version=session["catalog"].version,
+        current=server.is_session_current(session_id),
+    )
+
+
+def create_app(
+    server, session_ttl=DEFAULT_SESSION_TTL, max_sessions=DEFAULT_MAX_SESSIONS
+):
+    """Build the FastAPI application serving `server` to remote clients
+
+    Arguments:
+
+    session_ttl (`float`) -- Seconds after which an idle session is ended
+    max_sessions (`int`) -- Number of sessions kept; the least recently used
+      ones are ended beyond it
+    """
+    from fastapi import FastAPI, HTTPException
+    from pydantic import BaseModel
+
+    class Action(BaseModel):
+        current_url: Optional[str] = None
+        # Instruction shown on rendered pages instead of the goal's, if set
+        assigned_instruction_text: Optional[str] = None
+        session_int: Optional[int] = None
+        keywords: Optional[List[str]] = None
+        page: Optional[int] = None
+        clickable_name: Optional[str] = None
+
+    app = FastAPI(title="WebShop simulator")
+    # Guards `last_used` and `session_locks`; never held while simulating
+    table_lock = threading.Lock()
+    last_used = OrderedDict()  # session_id -> time of last request, oldest first
+    session_locks = {}  # session_id -> lock serializing the session's requests
+
+    def evict_sessions():
+        now = time.monotonic()
+        excess = len(last_used) - max_sessions
+        for session_id, used in list(last_used.items()):
+            if now - used <= session_ttl and excess <= 0:
+                break
+            lock = session_locks[session_id]
+            if not lock.acquire(blocking=False):
+                continue  # In use by a request right now
+            try:
+                del last_used[session_id]
+                del session_locks[session_id]
+                server.end_session(session_id)
+            finally:
+                lock.release()
+            excess -= 1
+
+    def touch(session_id):
+        if session_id in server.user_sessions:
+            last_used[session_id] = time.monotonic()
+            last_used.move_to_end(session_id)
+
+    @contextmanager
+    def locked_session(session_id, new_session=False):
+        """Hold the lock of `session_id`, which must exist unless `new_session`"""
+        while True:
+            with table_lock:
+                evict_sessions()
+                if not new_session and session_id not in server.user_sessions:
+                    raise HTTPException(404, f"Unknown session {session_id!r}")
+                lock = session_locks.setdefault(session_id, threading.Lock())
+                touch(session_id)
+            with lock:
+                with table_lock:
+                    # Retry if the session was ended while waiting for its lock
+                    if session_locks.get(session_id) is not lock:
+                        continue
+                try:
+                    yield
+                finally:
+                    with table_lock:
+                        # Unless the session was ended meanwhile
+                        if session_locks.get(session_id) is lock:
+                            if session_id in server.user_sessions:
+                                touch(session_id)
+                            else:
+                                # E.g. a failed request creating the session
+                                del session_locks[session_id]
+                return
+
+    def call(session_id, action, page_fn, new_session=False):
+        # FastAPI runs these synchronous handlers on a thread pool
+        with locked_session(session_id, new_session):
+            server.assigned_instruction_text = action.assigned_instruction_text
+            try:
+                html, url, status = page_fn()
+            finally:
+                server.assigned_instruction_text = None
+            return dict(
+                html=html,
+                url=url,
+                status=status,
+                session=session_state(server, session_id),
+            )
+
+    def clickable(session_id, action, kinds):
+        clickables = server.user_sessions[session_id].get("clickables", {})
+        name = (action.clickable_name or "").lower()
+        if name not in clickables or clickables[name].kind not in kinds:
+            raise HTTPException(400, f"Cannot click {action.clickable_name!r} here")
+        return name, clickables
+
+    @app.get("/health")
+    def health():
+        return dict(
+            catalog_version=server.catalog.version,
+            num_goals=len(server.goals),
+            num_sessions=len(server.user_sessions),
+        )
+
+    @app.post("/index/{session_id}")
+    def index(session_id: str, action: Action):
+        return call(
+            session_id,
+            action,
+            lambda: server.receive(
+                session_id, action.current_url, session_int=action.session_int
+            ),
+            new_session=True,
+        )
+
+    @app.post("/search_results/{session_id}")
+    def search_results(session_id: str, action: Action):
+        if not action.keywords:
+            raise HTTPException(400, "Missing search keywords")
+        return call(
+            session_id,
+            action,
+            lambda: server.receive(
+                session_id,
+                action.current_url,
+                keywords=action.keywords,
+                page=action.page or 1,
+            ),
+        )
+
+    @app.post("/item_page/{session_id}")
+    def item_page(session_id: str, action: Action):
+        def page_fn():
+            name, clickables = clickable(session_id, action, ("product", "option"))
+            html, url = server.item_page(
+                session_id, clickable_name=name, text_to_clickable=clickables
+            )
+            return html, url, dict(reward=0.0, done=False)
+
+        return call(session_id, action, page_fn)
+
+    @app.post("/item_sub_page/{session_id}")
+    def item_sub_page(session_id: str, action: Action):
+        def page_fn():
+            name, _ = clickable(session_id, action, ("button",))
+            if name not in SUB_PAGES:
+                raise HTTPException(400, f"{action.clickable_name!r} is not a sub page")
+            html, url = server.item_sub_page(session_id, clickable_name=name)
+            return html, url, dict(reward=0.0, done=False)
+
+        return call(session_id, action, page_fn)
+
+    @app.post("/done/{session_id}")
+    def done(session_id: str, action: Action):
+        def page_fn():
+            if server.user_sessions[session_id].get("asin") is None:
+                raise HTTPException(400, "No product selected")
+            html, url, reward = server.done(session_id)
+            return html, url, dict(reward=reward, done=True)
+
+        return call(session_id, action, page_fn)
+
+    @app.post("/click/{session_id}")
+    def click(session_id: str, action: Action):
+        def page_fn():
+            name, clickables = clickable(
+                session_id, action, ("button", "product", "option")
+            )
+            return server.receive(
+                session_id,
+                action.current_url,
+                clickable_name=name,
+                text_to_clickable=clickables,
+            )
+
+        return call(session_id, action, page_fn)
+
+    @app.get("/session/{session_id}")
+    def get_session(session_id: str):
+        with locked_session(session_id):
+            return session_state(server, session_id)
+
+    @app.delete("/session/{session_id}")
+    def end_session(session_id: str):
+        with table_lock:
+            last_used.pop(session_id, None)
+            lock = session_locks.pop(session_id, None)
+        # Let a request running on the session finish first
+        with lock or threading.Lock():
+            server.end_session(session_id)
+        return dict(ended=session_id)
+
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the WebShop simulator")
+    parser.add_argument("--file-path", default=DEFAULT_FILE_PATH)
+    parser.add_argument("--num-products", type=int, default=None)
+    parser.add_argument("--human-goals", type=int, default=1)
+    parser.add_argument("--limit-goals", type=int, default=-1)
+    parser.add_argument("--num-shards", type=int, default=None)
+    parser.add_argument("--prefetch-top-k", type=int, default=0)
+    parser.add_argument("--show-attrs", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument(
+        "--keep-alive", type=int, default=75, help="idle connection timeout (s)"
+    )
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        default=DEFAULT_SESSION_TTL,
+        help="idle session timeout (s)",
+    )
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    server = SimServer(
+        DEFAULT_BASE_URL,
+        args.file_path,
+        limit_goals=args.limit_goals,
+        num_products=args.num_products,
+        human_goals=args.human_goals,
+        show_attrs=args.show_attrs,
+        num_shards=args.num_shards,
+        prefetch_top_k=args.prefetch_top_k,
+        prefetch_memory_budget=DEFAULT_MEMORY_BUDGET,
+    )
+    uvicorn.run(
+        create_app(server, args.session_ttl, args.max_sessions),
+        host=args.host,
+        port=args.port,
+        timeout_keep_alive=args.keep_alive,
+    )
+
+
+if __name__ == "__main__":
+    main()
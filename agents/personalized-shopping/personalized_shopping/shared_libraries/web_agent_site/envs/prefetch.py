@@ -0,0 +1,127 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Speculative pre-rendering of the pages a shopper is likely to open next.
+
+After a search, `SimServer` hands the prefetcher the next results page and the
+item pages of the top results. A background thread renders them while the
+agent is thinking, and the server picks up the finished HTML by URL instead of
+rendering it again. Every new page shown to a session bumps that session's
+generation, which drops its cached pages and any queued work for the old one.
+Ending a session drops its generation altogether.
+"""
+
+from collections import OrderedDict, defaultdict
+import queue
+import sys
+import threading
+
+from ..engine.engine import map_action_to_html
+
+DEFAULT_MEMORY_BUDGET = 32 * 1024 * 1024  # bytes of cached HTML
+
+
+class PagePrefetcher:
+    """Renders pages on an idle worker thread into a memory-bounded LRU cache"""
+
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """Constructor for the prefetcher
+
+        Arguments:
+
+        memory_budget (`int`) -- Upper bound, in bytes, on the cached HTML;
+          least recently produced pages are evicted first
+        """
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        self.cache = OrderedDict()  # (session_id, url, instruction_text) -> html
+        self.session_keys = defaultdict(set)  # session_id -> keys in `cache`
+        self.generations = dict()  # session_id -> int, for live sessions
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.hits = 0
+        self.misses = 0
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def schedule(self, session_id, pages):
+        """Queue `(url, action, render_kwargs)` tuples for `session_id`"""
+        with self.lock:
+            generation = self.generations.setdefault(session_id, 0)
+        for url, action, kwargs in pages:
+            self.jobs.put((session_id, generation, url, action, kwargs))
+
+    def take(self, session_id, url, instruction_text):
+        """Returns the pre-rendered HTML for `url`, or None on a miss
+
+        Either way the session has moved to a new page, so everything else
+        prefetched or queued for it is discarded.
+        """
+        key = (session_id, url, instruction_text)
+        with self.lock:
+            html = self.cache.get(key)
+            self._discard(session_id)
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return html
+
+    def end_session(self, session_id):
+        """Drop everything prefetched or queued for a session that has ended"""
+        with self.lock:
+            self._drop_pages(session_id)
+            self.generations.pop(session_id, None)
+
+    def _discard(self, session_id):
+        self.generations[session_id] = self.generations.get(session_id, 0) + 1
+        self._drop_pages(session_id)
+
+    def _drop_pages(self, session_id):
+        for key in self.session_keys.pop(session_id, ()):
+            self.memory_used -= sys.getsizeof(self.cache.pop(key))
+
+    def _evict_oldest(self):
+        key, evicted = self.cache.popitem(last=False)
+        self.memory_used -= sys.getsizeof(evicted)
+        keys = self.session_keys[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self.session_keys[key[0]]
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            session_id, generation, url, action, kwargs = job
+            if self.generations.get(session_id) != generation:
+                continue  # stale: the session already moved on or ended
+            html = map_action_to_html(action, **kwargs)
+            size = sys.getsizeof(html)
+            with self.lock:
+                if self.generations.get(session_id) != generation:
+                    continue
+                key = (session_id, url, kwargs.get("instruction_text"))
+                if key in self.cache or size > self.memory_budget:
+                    continue
+                self.cache[key] = html
+                self.session_keys[session_id].add(key)
+                self.memory_used += size
+                while self.memory_used > self.memory_budget:
+                    self._evict_oldest()
+
+    def close(self):
+        self.jobs.put(None)
+        self.worker.join()
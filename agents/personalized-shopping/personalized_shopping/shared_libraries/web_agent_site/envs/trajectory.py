@@ -0,0 +1,295 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Deterministic recording and bulk replay of WebAgentTextEnv episodes.
+
+A trajectory file holds one JSON object per line (gzip-compressed when the
+path ends in `.gz`), each describing a single episode:
+
+    {"seed": ..., "session": ..., "goal_idx": ..., "fixed_goal": ...,
+     "assigned_instruction_text": ...,
+     "reset_obs_hash": ..., "steps": [{"action": ..., "obs_hash": ...,
+     "reward": ..., "done": ...}, ...]}
+"""
+
+import contextlib
+import gzip
+import hashlib
+import json
+import random
+import time
+
+import numpy as np
+
+from ..engine.engine import parse_action
+from .web_agent_text_env import SimBrowser
+
+
+def hash_observation(observation):
+    """Returns a short, stable digest of an observation string"""
+    return hashlib.blake2b(observation.encode(), digest_size=8).hexdigest()
+
+
+def _open(path, mode):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class EpisodeRandom:
+    """Random state of one episode.
+
+    The environment draws from the global `random` module, so the episode's
+    state is swapped in only while the environment runs (see `active`). This
+    makes episodes reproducible without reseeding the process-wide generator,
+    and draws made elsewhere between steps don't change the episode.
+    """
+
+    def __init__(self, seed):
+        self.state = random.Random(seed).getstate()
+
+    @contextlib.contextmanager
+    def active(self):
+        outer_state = random.getstate()
+        random.setstate(self.state)
+        try:
+            yield
+        finally:
+            self.state = random.getstate()
+            random.setstate(outer_state)
+
+
+def load_trajectories(path):
+    """Yields the trajectories stored in a recorder file"""
+    with _open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class TrajectoryRecorder:
+    """Wraps a WebAgentTextEnv and logs every episode to a trajectory file"""
+
+    def __init__(self, env, path, record_observations=True):
+        """Constructor for the recorder
+
+        Arguments:
+
+        env (`WebAgentTextEnv`) -- Environment to record
+        path (`str`) -- Output file, gzip-compressed if it ends in `.gz`
+        record_observations (`bool`) -- If true, store a hash of every observation
+          so that replays can be verified
+        """
+        self.env = env
+        self.record_observations = record_observations
+        self.file = _open(path, "w")
+        self.trajectory = None
+        self.random = None
+
+    def reset(self, seed=None, goal_idx=None):
+        """Start a new (seeded) episode, flushing the previous one to disk
+
+        The seed drives the session id and goal choice when `goal_idx` is not
+        given, and seeds a fresh `EpisodeRandom` after the reset so that any
+        randomness during the episode (e.g. random searches) is reproducible.
+        """
+        self.flush()
+        if seed is None:
+            seed = random.randrange(2**32)
+        with EpisodeRandom(seed).active():
+            obs, info = self.env.reset(session=goal_idx)
+        self.random = EpisodeRandom(seed)
+        session = self.env.server.user_sessions[self.env.session]
+        self.trajectory = dict(
+            seed=seed,
+            session=self.env.session,
+            goal_idx=session["goal_idx"],
+            fixed_goal=goal_idx is not None,
+            assigned_instruction_text=self.env.server.assigned_instruction_text,
+            reset_obs_hash=(
+                hash_observation(obs) if self.record_observations else None
+            ),
+            steps=[],
+        )
+        return obs, info
+
+    def step(self, action):
+        """Take `action` in the wrapped environment and log its outcome"""
+        assert self.trajectory is not None, "Call reset() before step()."
+        assigned_instruction_text = self.env.server.assigned_instruction_text
+        with self.random.active():
+            state, reward, done, info = self.env.step(action)
+        record = dict(action=action, reward=reward, done=done)
+        if assigned_instruction_text != self.trajectory["assigned_instruction_text"]:
+            record["assigned_instruction_text"] = assigned_instruction_text
+        if self.record_observations:
+            record["obs_hash"] = hash_observation(self.env.observation)
+        self.trajectory["steps"].append(record)
+        return state, reward, done, info
+
+    def flush(self):
+        """Write the current episode, if any, to the trajectory file"""
+        if self.trajectory is not None:
+            self.file.write(json.dumps(self.trajectory, separators=(",", ":")) + "\n")
+            self.file.flush()
+            self.trajectory = None
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryReplayer:
+    """Re-executes recorded trajectories and reports determinism and latency"""
+
+    def __init__(self, env, verify=True):
+        """Constructor for the replayer
+
+        Arguments:
+
+        env (`WebAgentTextEnv`) -- Environment to replay trajectories against
+        verify (`bool`) -- If true, compare observation hashes with the recording
+        """
+        self.env = env
+        self.verify = verify
+
+    def replay(self, trajectory, fast=False):
+        """Replay a single trajectory and return its result record
+
+        In `fast` mode pages are not rendered and actions go straight to a
+        separate browser: only session state and rewards are reproduced, so
+        observation hashes cannot be checked, and the environment is left as it
+        was.
+        """
+        server = self.env.server
+        session = trajectory["session"]
+        goal_idx = trajectory["goal_idx"]
+        episode_random = EpisodeRandom(trajectory["seed"])
+
+        verify = self.verify and not fast
+        mismatches = []
+        latencies = []
+        rewards = []
+        if fast:
+            snapshot = (
+                self.env.snapshot()
+                if self.env.session in server.user_sessions
+                else None
+            )
+            browser = SimBrowser(server)
+            server.end_session(session)
+            server.assigned_instruction_text = trajectory["assigned_instruction_text"]
+            server.render_pages = False
+            try:
+                browser.get(
+                    f"{self.env.base_url}/{session}",
+                    session_id=session,
+                    session_int=goal_idx,
+                )
+                for step in trajectory["steps"]:
+                    self._set_instruction_text(step, trajectory)
+                    start = time.perf_counter()
+                    with episode_random.active():
+                        status = self._fast_step(browser, step)
+                    latencies.append(time.perf_counter() - start)
+                    rewards.append(status["reward"])
+            finally:
+                server.render_pages = True
+                server.end_session(session)
+                if snapshot is not None:
+                    self.env.restore(snapshot)
+        else:
+            server.end_session(session)
+            server.assigned_instruction_text = trajectory["assigned_instruction_text"]
+            with episode_random.active():
+                obs, _ = self.env.reset(
+                    session=goal_idx if trajectory["fixed_goal"] else None
+                )
+            episode_random = EpisodeRandom(trajectory["seed"])
+            if verify and trajectory.get("reset_obs_hash") is not None:
+                if hash_observation(obs) != trajectory["reset_obs_hash"]:
+                    mismatches.append(-1)  # -1 marks the reset observation
+            for i, step in enumerate(trajectory["steps"]):
+                self._set_instruction_text(step, trajectory)
+                start = time.perf_counter()
+                with episode_random.active():
+                    _, reward, _, _ = self.env.step(step["action"])
+                latencies.append(time.perf_counter() - start)
+                rewards.append(reward)
+                if verify and step.get("obs_hash") is not None:
+                    if hash_observation(self.env.observation) != step["obs_hash"]:
+                        mismatches.append(i)
+
+        expected_rewards = [step["reward"] for step in trajectory["steps"]]
+        return dict(
+            goal_idx=goal_idx,
+            num_steps=len(latencies),
+            rewards_match=rewards == expected_rewards,
+            final_reward=rewards[-1] if rewards else 0.0,
+            obs_mismatches=mismatches,
+            latencies=latencies,
+        )
+
+    def replay_file(self, path, fast=False):
+        """Replay every trajectory in `path` and return an aggregate report"""
+        results = [self.replay(t, fast=fast) for t in load_trajectories(path)]
+        latencies = np.array(
+            [latency for r in results for latency in r["latencies"]], dtype=float
+        )
+        report = dict(
+            num_trajectories=len(results),
+            num_steps=int(latencies.size),
+            reward_mismatches=sum(not r["rewards_match"] for r in results),
+            obs_mismatches=sum(bool(r["obs_mismatches"]) for r in results),
+            total_time=float(latencies.sum()),
+            results=results,
+        )
+        if latencies.size:
+            report.update(
+                mean_step_latency=float(latencies.mean()),
+                p50_step_latency=float(np.percentile(latencies, 50)),
+                p95_step_latency=float(np.percentile(latencies, 95)),
+                max_step_latency=float(latencies.max()),
+            )
+        return report
+
+    def _set_instruction_text(self, step, trajectory):
+        self.env.server.assigned_instruction_text = step.get(
+            "assigned_instruction_text", trajectory["assigned_instruction_text"]
+        )
+
+    @staticmethod
+    def _fast_step(browser, step):
+        """Validate and send a recorded action as `WebAgentTextEnv.step` would,
+        without building observations
+        """
+        action_name, action_arg = parse_action(step["action"])
+        if action_arg is not None:
+            action_arg = action_arg.lower()
+        if action_name == "search" and action_arg is not None and action_arg != "":
+            return browser.search(action_arg)
+        clickables = browser.clickables
+        if (
+            action_name == "click"
+            and action_arg in clickables
+            and action_arg != "search"
+        ):
+            return browser.click(action_arg, clickables)
+        return dict(reward=0, done=False)
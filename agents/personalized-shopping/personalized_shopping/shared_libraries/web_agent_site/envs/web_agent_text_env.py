@@ -16,28 +16,30 @@ from collections import defaultdict
 import json
 import random
 import string
+import threading
 import time
+from types import MappingProxyType
+from typing import NamedTuple, Optional
 from bs4 import BeautifulSoup
 from bs4.element import Comment
-from flask import Flask
 import gym
 from gym.envs.registration import register
-import numpy as np
-import torch
 from ..engine.engine import (
     ACTION_TO_TEMPLATE,
     BACK_TO_SEARCH,
     END_BUTTON,
     NEXT_PAGE,
     PREV_PAGE,
+    PRODUCT_WINDOW,
     get_product_per_page,
     get_top_n_product_from_keywords,
-    init_search_engine,
-    load_products,
+    map_action_to_clickables,
     map_action_to_html,
     parse_action,
 )
-from ..engine.goal import get_goals, get_reward
+from ..engine.goal import get_reward
+from .catalog import load_catalog
+from .prefetch import DEFAULT_MEMORY_BUDGET, PagePrefetcher
 from ..utils import (
     DEFAULT_FILE_PATH,
     FEAT_CONV,
@@ -46,7 +48,70 @@ from ..utils import (
 )
 
 
-app = Flask(__name__)
+class History:
+    """Append-only sequence whose versions share their common prefix.
+
+    Entries are kept in a chain of immutable `(value, previous)` nodes, so
+    `head` captures the current version in O(1), and `History(head)` resumes it
+    without copying. Reading the `i`-th last entry walks `i` nodes.
+    """
+
+    def __init__(self, head=None):
+        self.head = head
+        self._length = 0 if head is None else head[2]
+
+    def append(self, value):
+        self._length += 1
+        self.head = (value, self.head, self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("History index out of range")
+        node = self.head
+        for _ in range(self._length - 1 - index):
+            node = node[1]
+        return node[0]
+
+    def __iter__(self):
+        values = []
+        node = self.head
+        while node is not None:
+            values.append(node[0])
+            node = node[1]
+        return reversed(values)
+
+    def __eq__(self, other):
+        if isinstance(other, History):
+            return self.head is other.head or list(self) == list(other)
+        return list(self) == other
+
+    def __repr__(self):
+        return f"History({list(self)!r})"
+
+
+class EnvSnapshot(NamedTuple):
+    """Immutable record of everything needed to resume a WebAgentTextEnv session.
+
+    Taking a snapshot copies a constant number of references: the session dict
+    is copied shallowly, and its containers (`asins`, `options`, `actions`) are
+    shared until either side next changes them (see `own_containers`).
+    `prev_obs` and `prev_actions` are `History` sequences, of which only the
+    current heads are recorded.
+    """
+
+    session_id: str
+    current_url: Optional[str]
+    page_source: Optional[str]
+    session: MappingProxyType
+    instruction_text: Optional[str]
+    assigned_instruction_text: Optional[str]
+    prev_obs: Optional[tuple]
+    prev_actions: Optional[tuple]
 
 
 class WebAgentTextEnv(gym.Env):
@@ -72,6 +137,10 @@ class WebAgentTextEnv(gym.Env):
         session
         session_prefix
         show_attrs
+        num_shards
+        num_workers
+        prefetch_top_k
+        prefetch_memory_budget
         """
         super(WebAgentTextEnv, self).__init__()
         self.observation_mode = observation_mode
@@ -89,6 +158,10 @@ class WebAgentTextEnv(gym.Env):
                 self.kwargs.get("num_products"),
                 self.kwargs.get("human_goals"),
                 self.kwargs.get("show_attrs", False),
+                self.kwargs.get("num_shards"),
+                self.kwargs.get("prefetch_top_k", 0),
+                self.kwargs.get("prefetch_memory_budget", DEFAULT_MEMORY_BUDGET),
+                self.kwargs.get("num_workers", 1),
             )
             if server is None
             else server
@@ -98,11 +171,13 @@ class WebAgentTextEnv(gym.Env):
         self.session = self.kwargs.get("session")
         self.session_prefix = self.kwargs.get("session_prefix")
         if self.kwargs.get("get_image", 0):
+            import torch
+
             self.feats = torch.load(FEAT_CONV)
             self.ids = torch.load(FEAT_IDS)
             self.ids = {url: idx for idx, url in enumerate(self.ids)}
-        self.prev_obs = []
-        self.prev_actions = []
+        self.prev_obs = History()
+        self.prev_actions = History()
         self.num_prev_obs = self.kwargs.get("num_prev_obs", 0)
         self.num_prev_actions = self.kwargs.get("num_prev_actions", 0)
         self.reset()
@@ -150,21 +225,11 @@ class WebAgentTextEnv(gym.Env):
 
     def get_available_actions(self):
         """Returns list of available actions at the current step"""
-        html_obj = self._parse_html()
-
-        # Collect search bar, buttons, links, and options as clickables
-        search_bar = html_obj.find(id="search_input")
-        has_search_bar = True if search_bar is not None else False
-        buttons = html_obj.find_all(class_="btn")
-        product_links = html_obj.find_all(class_="product-link")
-        buying_options = html_obj.select('input[type="radio"]')
-
-        self.text_to_clickable = {
-            f"{b.get_text()}".lower(): b for b in buttons + product_links
-        }
-        for opt in buying_options:
-            opt_value = opt.get("value")
-            self.text_to_clickable[f"{opt_value}"] = opt
+        # Search bar, buttons, links, and options of the page as rendered
+        self.text_to_clickable = self.browser.clickables
+        has_search_bar = any(
+            c.kind == "search" for c in self.text_to_clickable.values()
+        )
         return dict(
             has_search_bar=has_search_bar,
             clickables=list(self.text_to_clickable.keys()),
@@ -172,6 +237,8 @@ class WebAgentTextEnv(gym.Env):
 
     def get_image(self):
         """Scrape image from page HTML and return as a list of pixel values"""
+        import torch
+
         html_obj = self._parse_html(self.browser.page_source)
         image_url = html_obj.find(id="product-image")
         if image_url is not None:
@@ -262,6 +329,7 @@ class WebAgentTextEnv(gym.Env):
 
     def reset(self, session=None, instruction_text=None):
         """Create a new session and reset environment variables"""
+        previous_session = self.session
         session_int = None
         if session is not None:
             self.session = str(session)
@@ -271,6 +339,14 @@ class WebAgentTextEnv(gym.Env):
             self.session = "".join(random.choices(string.ascii_lowercase, k=10))
         if self.session_prefix is not None:
             self.session = self.session_prefix + self.session
+        # Release the previous session, and restart a reused session on the
+        # current catalog if the catalog was swapped since it began
+        if previous_session is not None and previous_session != self.session:
+            self.server.end_session(previous_session)
+        elif self.session in self.server.user_sessions and not (
+            self.server.is_session_current(self.session)
+        ):
+            self.server.end_session(self.session)
 
         init_url = f"{self.base_url}/{self.session}"
         self.browser.get(init_url, session_id=self.session, session_int=session_int)
@@ -282,10 +358,46 @@ class WebAgentTextEnv(gym.Env):
             else instruction_text
         )
         obs = self.observation
-        self.prev_obs = [obs]
-        self.prev_actions = []
+        self.prev_obs = History()
+        self.prev_obs.append(obs)
+        self.prev_actions = History()
         return obs, None
 
+    def snapshot(self):
+        """Capture the current session as an immutable `EnvSnapshot` in O(1)"""
+        session = self.server.user_sessions[self.session]
+        snapshot = EnvSnapshot(
+            session_id=self.session,
+            current_url=self.browser.current_url,
+            page_source=self.browser.page_source,
+            session=MappingProxyType(dict(session)),
+            instruction_text=self.instruction_text,
+            assigned_instruction_text=self.server.assigned_instruction_text,
+            prev_obs=self.prev_obs.head,
+            prev_actions=self.prev_actions.head,
+        )
+        session["shared_containers"] = True
+        return snapshot
+
+    def restore(self, snapshot):
+        """Roll the environment back to a state captured by `snapshot`.
+
+        A snapshot can be restored any number of times, e.g. to branch several
+        rollouts from the same page.
+        """
+        self.session = snapshot.session_id
+        self.browser.session_id = snapshot.session_id
+        self.browser.current_url = snapshot.current_url
+        self.browser.page_source = snapshot.page_source
+        self.server.user_sessions[snapshot.session_id] = dict(
+            snapshot.session, shared_containers=True
+        )
+        self.server.assigned_instruction_text = snapshot.assigned_instruction_text
+        self.instruction_text = snapshot.instruction_text
+        self.prev_obs = History(snapshot.prev_obs)
+        self.prev_actions = History(snapshot.prev_actions)
+        self.text_to_clickable = None
+
     def render(self, mode="human"):
         pass
 
@@ -293,13 +405,35 @@ class WebAgentTextEnv(gym.Env):
         pass
 
 
+def own_containers(session):
+    """Copy the session's containers if they are shared with an `EnvSnapshot`,
+    so that they can be changed in place. Sessions without snapshots are left
+    alone, so no copying happens unless snapshots are taken.
+    """
+    if session.pop("shared_containers", False):
+        session["asins"] = set(session["asins"])
+        session["options"] = dict(session["options"])
+        session["actions"] = defaultdict(int, session["actions"])
+
+
+def count_action(session, action):
+    """Increment a session action counter"""
+    own_containers(session)
+    session["actions"][action] += 1
+
+
 def tag_visible(element):
     ignore = {"style", "script", "head", "title", "meta", "[document]"}
     return element.parent.name not in ignore and not isinstance(element, Comment)
 
 
 class SimServer:
-    """Lightweight simulator of WebShop Flask application for generating HTML observations"""
+    """Lightweight simulator of WebShop Flask application for generating HTML observations
+
+    Pages are rendered with a plain Jinja environment and actions are dispatched
+    through `click_handlers`, so no Flask application or request context is
+    involved.
+    """
 
     def __init__(
         self,
@@ -310,74 +444,196 @@ class SimServer:
         num_products=None,
         human_goals=0,
         show_attrs=False,
+        num_shards=None,
+        prefetch_top_k=0,
+        prefetch_memory_budget=DEFAULT_MEMORY_BUDGET,
+        num_workers=1,
     ):
         """Constructor for simulated server serving WebShop application
 
         Arguments:
 
-        filter_goals (`func`) -- Select specific goal(s) for consideration based on
-          criteria of custom function
+        filter_goals (`func` | `list`) -- Select specific goal(s) for consideration,
+          either with a custom function of (index, goal) or with a list of
+          `(column, op, value)` filters (see `engine.goal_index`)
         limit_goals (`int`) -- Limit to number of goals available
         num_products (`int`) -- Number of products to search across
         human_goals (`bool`) -- If true, load human goals; otherwise, load synthetic
           goals
+        num_shards (`int`) -- If greater than 1, partition the catalog and search
+          index across this many worker processes (see `engine.sharding`)
+        prefetch_top_k (`int`) -- If positive, pre-render the next results page and
+          the item pages of this many top results in the background after each
+          search (see `envs.prefetch`)
+        prefetch_memory_budget (`int`) -- Bytes of pre-rendered HTML to keep
+        num_workers (`int`) -- If greater than 1, transform the products of an
+          unsharded catalog in this many worker processes while loading it (see
+          `engine.load_products`)
         """
         # Load all products, goals, and search engine
         self.base_url = base_url
-        self.all_products, self.product_item_dict, self.product_prices, _ = (
-            load_products(
-                filepath=file_path,
-                num_products=num_products,
-                human_goals=human_goals,
-            )
-        )
-        self.search_engine = init_search_engine(num_products=num_products)
-        self.goals = get_goals(self.all_products, self.product_prices, human_goals)
         self.show_attrs = show_attrs
-
-        # Fix outcome for random shuffling of goals
-        random.seed(233)
-        random.shuffle(self.goals)
-
-        # Apply `filter_goals` parameter if exists to select speific goal(s)
-        if filter_goals is not None:
-            self.goals = [
-                goal for (i, goal) in enumerate(self.goals) if filter_goals(i, goal)
-            ]
-
-        # Imposes `limit` on goals via random selection
-        if limit_goals != -1 and limit_goals < len(self.goals):
-            self.weights = [goal["weight"] for goal in self.goals]
-            self.cum_weights = [0] + np.cumsum(self.weights).tolist()
-            idxs = []
-            while len(idxs) < limit_goals:
-                idx = random_idx(self.cum_weights)
-                if idx not in idxs:
-                    idxs.append(idx)
-            self.goals = [self.goals[i] for i in idxs]
-        print(f"Loaded {len(self.goals)} goals.")
+        self.catalog_kwargs = dict(
+            filter_goals=filter_goals,
+            limit_goals=limit_goals,
+            num_products=num_products,
+            human_goals=human_goals,
+            num_shards=num_shards,
+            num_workers=num_workers,
+        )
+        self.catalog_lock = threading.Lock()
+        self.catalog = load_catalog(file_path, **self.catalog_kwargs)
 
         # Set extraneous housekeeping variables
-        self.weights = [goal["weight"] for goal in self.goals]
-        self.cum_weights = [0] + np.cumsum(self.weights).tolist()
         self.user_sessions = dict()
+        # (clickable name, page name or None for any page) -> click handler
+        self.click_handlers = {
+            (END_BUTTON.lower(), None): self._click_buy,
+            (BACK_TO_SEARCH.lower(), None): self._click_back_to_search,
+            (NEXT_PAGE.lower(), "search_results"): self._click_next_page,
+            (PREV_PAGE.lower(), "search_results"): self._click_prev_page,
+            (PREV_PAGE.lower(), "item_sub_page"): self._click_item,
+            (PREV_PAGE.lower(), "item_page"): self._click_back_to_results,
+            **{(k.lower(), None): self._click_sub_page for k in ACTION_TO_TEMPLATE},
+        }
         self.search_time = 0
         self.render_time = 0
         self.sample_time = 0
+        self._local = threading.local()
         self.assigned_instruction_text = None  # TODO: very hacky, should remove
+        # Set to False to skip HTML rendering when only rewards are needed
+        self.render_pages = True
+        self.prefetch_top_k = prefetch_top_k
+        self.prefetcher = (
+            PagePrefetcher(prefetch_memory_budget) if prefetch_top_k > 0 else None
+        )
+
+    # Instruction shown on rendered pages instead of the goal's, if set. It is
+    # kept per thread, so that requests served concurrently (see `http_server`)
+    # each see their own.
+    assigned_instruction_text = property(
+        lambda self: getattr(self._local, "assigned_instruction_text", None),
+        lambda self, text: setattr(self._local, "assigned_instruction_text", text),
+    )
+
+    # The current catalog; sessions use the one they were created on instead
+    all_products = property(lambda self: self.catalog.all_products)
+    product_item_dict = property(lambda self: self.catalog.product_item_dict)
+    product_prices = property(lambda self: self.catalog.product_prices)
+    search_engine = property(lambda self: self.catalog.search_engine)
+    goals = property(lambda self: self.catalog.goals)
+    weights = property(lambda self: self.catalog.weights)
+    cum_weights = property(lambda self: self.catalog.cum_weights)
+    goal_index = property(lambda self: self.catalog.goal_index)
+    shards = property(lambda self: self.catalog.shards)
+
+    def swap_catalog(self, catalog):
+        """Atomically make `catalog` the catalog for new sessions
+
+        Sessions already running stay on the catalog they started with until
+        they are reset; a catalog is reclaimed once no session refers to it.
+        Returns the version assigned to `catalog`.
+        """
+        with self.catalog_lock:
+            catalog.version = self.catalog.version + 1
+            self.catalog = catalog
+        return catalog.version
+
+    def reload_catalog(self, file_path, index_path=None, **kwargs):
+        """Load a new catalog from `file_path` (and, optionally, the search index
+        at `index_path`) and swap it in; other `SimServer` catalog arguments
+        default to the ones the server was created with
+        """
+        catalog = load_catalog(
+            file_path, index_path=index_path, **{**self.catalog_kwargs, **kwargs}
+        )
+        return self.swap_catalog(catalog)
+
+    def end_session(self, session_id):
+        """Forget a session, releasing its hold on its catalog version"""
+        self.user_sessions.pop(session_id, None)
+        if self.prefetcher is not None:
+            self.prefetcher.end_session(session_id)
+
+    def is_session_current(self, session_id):
+        """Whether `session_id` runs on the current catalog version"""
+        session = self.user_sessions.get(session_id)
+        return session is not None and session["catalog"] is self.catalog
+
+    def render_page(self, action, url=None, **kwargs):
+        """Render the HTML for `action`, or return an empty page if rendering is off
+
+        The clickables of the page are recorded in the session either way, so
+        actions can be validated and dispatched without parsing the HTML. Pages
+        already pre-rendered for `url` by the prefetcher are served as is.
+        """
+        session_id = kwargs["session_id"]
+        self.user_sessions[session_id]["clickables"] = map_action_to_clickables(
+            action, **kwargs
+        )
+        if not self.render_pages:
+            return ""
+        if self.prefetcher is not None:
+            html = self.prefetcher.take(session_id, url, kwargs.get("instruction_text"))
+            if html is not None:
+                return html
+        return map_action_to_html(action, **kwargs)
+
+    def prefetch_after_search(self, session_id, top_n_products, page):
+        """Queue the pages most likely to follow a search results page: the item
+        pages of the top results on it and the next results page
+        """
+        session = self.user_sessions[session_id]
+        keywords = session["keywords"]
+        keywords_url_string = "+".join(keywords)
+        products = get_product_per_page(top_n_products, page)
+        pages = []
+        for product in products[: self.prefetch_top_k]:
+            asin = product["asin"].upper()
+            url = (
+                f"{self.base_url}/item_page/{session_id}/"
+                f"{asin}/{keywords_url_string}/{page}/{json.dumps({})}"
+            )
+            kwargs = dict(
+                session_id=session_id,
+                product_info=product,
+                keywords=keywords,
+                page=page,
+                asin=asin,
+                options={},
+                instruction_text=self.assigned_instruction_text,
+                show_attrs=self.show_attrs,
+            )
+            pages.append((url, "click", kwargs))
+        # Random searches are re-sampled on every page, so their next page is
+        # not known in advance
+        if keywords[0] != "<r>" and page * PRODUCT_WINDOW < len(top_n_products):
+            url = (
+                f"{self.base_url}/search_results/{session_id}/"
+                f"{keywords_url_string}/{page + 1}"
+            )
+            kwargs = dict(
+                session_id=session_id,
+                products=get_product_per_page(top_n_products, page + 1),
+                keywords=keywords,
+                page=page + 1,
+                total=len(top_n_products),
+                instruction_text=self.assigned_instruction_text,
+            )
+            pages.append((url, "search", kwargs))
+        self.prefetcher.schedule(session_id, pages)
 
-    @app.route("/", methods=["GET", "POST"])
     def index(self, session_id, **kwargs):
         """Redirect to the search page with the given session ID"""
-        html = map_action_to_html(
+        url = f"{self.base_url}/{session_id}"
+        html = self.render_page(
             "start",
+            url=url,
             session_id=session_id,
             instruction_text=kwargs["instruction_text"],
         )
-        url = f"{self.base_url}/{session_id}"
         return html, url
 
-    @app.route("/", methods=["GET", "POST"])
     def search_results(self, session_id, **kwargs):
         """Initialize session and return the search results page"""
         session = self.user_sessions[session_id]
@@ -388,17 +644,18 @@ class SimServer:
         page = 1 if "page" not in kwargs else kwargs["page"]
         session["page"] = page
         session["keywords"] = keywords
-        session["actions"]["search"] += 1
+        count_action(session, "search")
         session["asin"] = None
         session["options"] = {}
 
         # Perform search on keywords from items and record amount of time it takes
         old_time = time.time()
+        catalog = session["catalog"]
         top_n_products = get_top_n_product_from_keywords(
             keywords,
-            self.search_engine,
-            self.all_products,
-            self.product_item_dict,
+            catalog.search_engine,
+            catalog.all_products,
+            catalog.product_item_dict,
         )
         self.search_time += time.time() - old_time
 
@@ -413,8 +670,9 @@ class SimServer:
 
         # Render HTML search page and record amount of time taken
         old_time = time.time()
-        html = map_action_to_html(
+        html = self.render_page(
             "search",
+            url=url,
             session_id=session_id,
             products=products,
             keywords=session["keywords"],
@@ -426,9 +684,10 @@ class SimServer:
             instruction_text=self.assigned_instruction_text,
         )
         self.render_time += time.time() - old_time
+        if self.prefetcher is not None and self.render_pages:
+            self.prefetch_after_search(session_id, top_n_products, page)
         return html, url
 
-    @app.route("/", methods=["GET", "POST"])
     def item_page(self, session_id, **kwargs):
         """Render and return the HTML for a product item page"""
         session = self.user_sessions[session_id]
@@ -437,20 +696,17 @@ class SimServer:
         clickable = text_to_clickable[clickable_name]
 
         # Update session logs with information of last product asin selected
-        if (
-            clickable.get("class") is not None
-            and clickable.get("class")[0] == "product-link"
-        ):
+        if clickable.kind == "product":
             session["asin"] = clickable_name.upper()
-            session["actions"]["asin"] += 1
+            count_action(session, "asin")
             session["asins"].add(session["asin"])
-        elif clickable.get("name") is not None:
-            clickable_key = clickable["name"].lower()
+        elif clickable.kind == "option":
+            clickable_key = clickable.option_name.lower()
+            count_action(session, "options")
             session["options"][clickable_key] = clickable_name
-            session["actions"]["options"] += 1
 
         # Set fields + url of page, then render page's HTML
-        product_info = self.product_item_dict[session["asin"]]
+        product_info = session["catalog"].product_item_dict[session["asin"]]
         keywords_url_string = "+".join(session["keywords"])
         option_string = json.dumps(session["options"])
 
@@ -460,8 +716,9 @@ class SimServer:
             f'{session["page"]}/{option_string}'
         )
 
-        html = map_action_to_html(
+        html = self.render_page(
             "click",
+            url=url,
             session_id=session_id,
             product_info=product_info,
             keywords=session["keywords"],
@@ -476,7 +733,6 @@ class SimServer:
         )
         return html, url
 
-    @app.route("/", methods=["GET", "POST"])
     def item_sub_page(self, session_id, **kwargs):
         """Render and return the HTML for a product's sub page (i.e.
 
@@ -490,16 +746,17 @@ class SimServer:
                 break
 
         # Set fields + url of page, then render page's HTML
-        product_info = self.product_item_dict[session["asin"]]
-        session["actions"][clickable_name] += 1
+        product_info = session["catalog"].product_item_dict[session["asin"]]
+        count_action(session, clickable_name)
         keywords_url_string = "+".join(session["keywords"])
         url = (
             f"{self.base_url}/item_sub_page/{session_id}/"
             f'{session["asin"]}/{keywords_url_string}/{session["page"]}/'
             f'{clickable_name}/{session["options"]}'
         )
-        html = map_action_to_html(
+        html = self.render_page(
             f"click[{clickable_name}]",
+            url=url,
             session_id=session_id,
             product_info=product_info,
             keywords=session["keywords"],
@@ -513,14 +770,14 @@ class SimServer:
         )
         return html, url
 
-    @app.route("/", methods=["GET", "POST"])
     def done(self, session_id, **kwargs):
         """Render and return HTML for done page"""
         session = self.user_sessions[session_id]
         goal = self.user_sessions[session_id]["goal"]
-        purchased_product = self.product_item_dict[session["asin"]]
-        session["actions"]["purchase"] += 1
-        price = self.product_prices.get(session["asin"])
+        catalog = session["catalog"]
+        purchased_product = catalog.product_item_dict[session["asin"]]
+        count_action(session, "purchase")
+        price = catalog.product_prices.get(session["asin"])
 
         # Calculate reward for selected product and set variables for page details
         reward, info = get_reward(
@@ -539,8 +796,9 @@ class SimServer:
             f"{self.base_url}/done/{session_id}/"
             f'{session["asin"]}/{session["options"]}'
         )
-        html = map_action_to_html(
+        html = self.render_page(
             f"click[{END_BUTTON}]",
+            url=url,
             session_id=session_id,
             reward=reward,
             asin=session["asin"],
@@ -556,103 +814,119 @@ class SimServer:
         """Map action to the corresponding page"""
         status = dict(reward=0.0, done=False)
 
-        with app.app_context(), app.test_request_context():
-            # Create/determine goal, instruction_text from current session
-            if session_id not in self.user_sessions:
-                idx = (
-                    session_int
-                    if (session_int is not None and isinstance(session_int, int))
-                    else random_idx(self.cum_weights)
-                )
-                goal = self.goals[idx]
-                instruction_text = goal["instruction_text"]
-                self.user_sessions[session_id] = {"goal": goal, "done": False}
-            else:
-                instruction_text = self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ]
-            if self.assigned_instruction_text is not None:
-                instruction_text = (
-                    self.assigned_instruction_text
-                )  # TODO: very hacky, should remove
-                self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ] = instruction_text
+        # Create/determine goal, instruction_text from current session
+        if session_id not in self.user_sessions:
+            # Pin the new session to the current catalog version
+            catalog = self.catalog
+            idx = (
+                session_int
+                if (session_int is not None and isinstance(session_int, int))
+                else random_idx(catalog.cum_weights)
+            )
+            goal = catalog.goals[idx]
+            instruction_text = goal["instruction_text"]
+            self.user_sessions[session_id] = {
+                "catalog": catalog,
+                "goal": goal,
+                "goal_idx": idx,
+                "done": False,
+            }
+        else:
+            instruction_text = self.user_sessions[session_id]["goal"][
+                "instruction_text"
+            ]
+        if self.assigned_instruction_text is not None:
+            instruction_text = (
+                self.assigned_instruction_text
+            )  # TODO: very hacky, should remove
+            # Goals are shared by every session drawing them, so the session
+            # gets its own copy rather than changing the catalog's
             session = self.user_sessions[session_id]
-
-            if not kwargs:
-                # If no action, reset the session variables
-                kwargs["instruction_text"] = instruction_text
-                html, url = self.index(session_id, **kwargs)
-                self.user_sessions[session_id].update(
-                    {
-                        "keywords": None,
-                        "page": None,
-                        "asin": None,
-                        "asins": set(),
-                        "options": dict(),
-                        "actions": defaultdict(int),
-                    }
+            if session["goal"]["instruction_text"] != instruction_text:
+                session["goal"] = dict(
+                    session["goal"], instruction_text=instruction_text
                 )
-            elif "keywords" in kwargs:
-                # If search keywords are available, run a search
-                html, url = self.search_results(session_id, **kwargs)
-            elif "clickable_name" in kwargs:
-                clickable_name = kwargs["clickable_name"].lower()
-                if clickable_name == END_BUTTON.lower():
-                    # If "buy now" clicked, calculate reward and flag session as terminated
-                    html, url, reward = self.done(session_id, **kwargs)
-                    status["reward"] = reward
-                    status["done"] = True
-                elif clickable_name == BACK_TO_SEARCH.lower():
-                    # If "back to search" clicked, recursively reset the session back to search page
-                    html, url, status = self.receive(session_id, current_url)
-                elif (
-                    clickable_name == NEXT_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "next page" clicked from search results, re-render with `page` enumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] + 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "prev page" clicked from search results, re-render with `page` denumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] - 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_sub_page"
-                ):
-                    # If "prev page" clicked from sub page, return to corresponding item page
-                    html, url = self.item_page(session_id, **kwargs)
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_page"
-                ):
-                    # If "prev page" clicked from item page, return to search results page
-                    html, url = self.search_results(
-                        session_id,
-                        keywords=session["keywords"],
-                        page=session["page"],
-                        **kwargs,
-                    )
-                elif clickable_name in [k.lower() for k in ACTION_TO_TEMPLATE]:
-                    # Render item_sub_page if clickable is description, features, or reviews
-                    html, url = self.item_sub_page(session_id, **kwargs)
-                else:
-                    # Otherwise, render current item page
-                    html, url = self.item_page(session_id, **kwargs)
-            return html, url, status
+
+        if not kwargs:
+            # If no action, reset the session variables
+            kwargs["instruction_text"] = instruction_text
+            html, url = self.index(session_id, **kwargs)
+            self.user_sessions[session_id].update(
+                {
+                    "keywords": None,
+                    "page": None,
+                    "asin": None,
+                    "asins": set(),
+                    "options": dict(),
+                    "actions": defaultdict(int),
+                    "shared_containers": False,
+                }
+            )
+        elif "keywords" in kwargs:
+            # If search keywords are available, run a search
+            html, url = self.search_results(session_id, **kwargs)
+        elif "clickable_name" in kwargs:
+            # Look up the click handler, first for the current page, then for any
+            # page; clicks on anything else (products, options) open the item page
+            clickable_name = kwargs["clickable_name"].lower()
+            handler = self.click_handlers.get(
+                (clickable_name, self.get_page_name(current_url))
+            ) or self.click_handlers.get((clickable_name, None), self._click_item)
+            html, url, status = handler(session_id, current_url, status, **kwargs)
+        return html, url, status
+
+    def _click_buy(self, session_id, current_url, status, **kwargs):
+        # If "buy now" clicked, calculate reward and flag session as terminated
+        html, url, reward = self.done(session_id, **kwargs)
+        status["reward"] = reward
+        status["done"] = True
+        return html, url, status
+
+    def _click_back_to_search(self, session_id, current_url, status, **kwargs):
+        # Recursively reset the session back to search page
+        return self.receive(session_id, current_url)
+
+    def _click_next_page(self, session_id, current_url, status, **kwargs):
+        # From search results, re-render with `page` enumerated
+        session = self.user_sessions[session_id]
+        return self.receive(
+            session_id,
+            current_url,
+            keywords=session["keywords"],
+            page=session["page"] + 1,
+        )
+
+    def _click_prev_page(self, session_id, current_url, status, **kwargs):
+        # From search results, re-render with `page` denumerated
+        session = self.user_sessions[session_id]
+        return self.receive(
+            session_id,
+            current_url,
+            keywords=session["keywords"],
+            page=session["page"] - 1,
+        )
+
+    def _click_back_to_results(self, session_id, current_url, status, **kwargs):
+        # From an item page, return to the search results page
+        session = self.user_sessions[session_id]
+        html, url = self.search_results(
+            session_id,
+            keywords=session["keywords"],
+            page=session["page"],
+            **kwargs,
+        )
+        return html, url, status
+
+    def _click_sub_page(self, session_id, current_url, status, **kwargs):
+        # Render item_sub_page if clickable is description, features, or reviews
+        html, url = self.item_sub_page(session_id, **kwargs)
+        return html, url, status
+
+    def _click_item(self, session_id, current_url, status, **kwargs):
+        # Render the item page for a product or option click, or "< prev" from a
+        # sub page
+        html, url = self.item_page(session_id, **kwargs)
+        return html, url, status
 
     def get_page_name(self, url):
         """Determine which page (i.e.
@@ -677,6 +951,11 @@ class SimBrowser:
         self.page_source = None
         self.session_id = None
 
+    @property
+    def clickables(self):
+        """Clickables of the current page, keyed by their (lowercased) text"""
+        return self.server.user_sessions[self.session_id]["clickables"]
+
     def get(self, url, session_id=None, session_int=None):
         """Set browser variables to corresponding link, page HTML for URL"""
         self.session_id = url.split("/")[-1] if session_id is None else session_id
@@ -13,10 +13,19 @@
 # limitations under the License.
 
 import bisect
+from contextlib import contextmanager
 import hashlib
 import logging
+import os
 from os.path import abspath, dirname, join
 import random
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 BASE_DIR = dirname(abspath(__file__))
 DEBUG_PROD_SIZE = None  # set to `None` to disable
@@ -33,13 +42,14 @@ HUMAN_ATTR_PATH = join(BASE_DIR, "../data/items_human_ins.json")
 HUMAN_ATTR_PATH = join(BASE_DIR, "../data/items_human_ins.json")
 
 
-def random_idx(cum_weights):
+def random_idx(cum_weights, rng=random):
     """Generate random index by sampling uniformly from sum of all weights, then
 
     selecting the `min` between the position to keep the list sorted (via bisect)
-    and the value of the second to last index
+    and the value of the second to last index. `rng` defaults to the global
+    random number generator.
     """
-    pos = random.uniform(0, cum_weights[-1])
+    pos = rng.uniform(0, cum_weights[-1])
     idx = bisect.bisect(cum_weights, pos)
     idx = min(idx, len(cum_weights) - 2)
     return idx
@@ -63,3 +73,55 @@ def generate_mturk_code(session_id: str) -> str:
     """
     sha = hashlib.sha1(session_id.encode())
     return sha.hexdigest()[:10].upper()
+
+
+def rss_bytes():
+    """Returns the resident set size of this process (peak RSS where /proc is
+    unavailable, 0 where neither is)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, AttributeError, ValueError):
+        pass
+    if resource is None:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StartupProfile:
+    """Records wall time and resident memory spent initializing each heavy
+    component (spaCy, catalog, search engine, ...) on its first use
+    """
+
+    def __init__(self):
+        self.components = []  # (name, depth, seconds, rss delta in bytes)
+        self.depth = 0
+
+    @contextmanager
+    def component(self, name):
+        """Context manager timing the initialization of component `name`"""
+        entry = [name, self.depth, 0.0, 0]
+        self.components.append(entry)
+        self.depth += 1
+        start_time, start_rss = time.perf_counter(), rss_bytes()
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            entry[2] = time.perf_counter() - start_time
+            entry[3] = rss_bytes() - start_rss
+
+    def report(self):
+        """Returns a table of the components initialized so far"""
+        lines = [f"{'component':<32}{'time (s)':>10}{'memory (MB)':>14}"]
+        for name, depth, seconds, rss in self.components:
+            label = "  " * depth + name
+            lines.append(f"{label:<32}{seconds:>10.2f}{rss / 2**20:>14.1f}")
+        return "\n".join(lines)
+
+
+# Process-wide startup profile, printed once the shopping environment is ready
+STARTUP_PROFILE = StartupProfile()
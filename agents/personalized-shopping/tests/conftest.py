@@ -0,0 +1,183 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A tiny in-memory catalog, so the simulator can be tested without the
+WebShop data files or a Lucene index.
+"""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+
+
+def make_product(asin, name, category, query, price, colors=(), attributes=()):
+    """A product as returned by `engine.process_product`"""
+    product = {
+        "asin": asin,
+        "name": name,
+        "Title": name,
+        "category": category,
+        "query": query,
+        "product_category": f"{category} › {query}",
+        "full_description": f"{name} description",
+        "Description": f"{name} description",
+        "small_description": [f"{name} bullet"],
+        "BulletPoints": [f"{name} bullet"],
+        "Reviews": [],
+        "Rating": "N.A.",
+        "pricing": [price],
+        "Price": f"${price}",
+        "options": {"color": list(colors)} if colors else {},
+        "option_to_image": {color: None for color in colors},
+        "Attributes": list(attributes) or ["DUMMY_ATTR"],
+        "images": [f"https://example.com/{asin}.jpg"],
+        "MainImage": f"https://example.com/{asin}.jpg",
+        "instruction_text": f"i want {name}",
+        "instruction_attributes": list(attributes),
+    }
+    return product
+
+
+PRODUCTS = [
+    make_product("B000000001", "red cotton shirt", "fashion", "shirts", 20.0,
+                 colors=("red", "blue"), attributes=("cotton",)),
+    make_product("B000000002", "blue linen shirt", "fashion", "shirts", 35.0,
+                 attributes=("linen",)),
+    make_product("B000000003", "vanilla candle", "home", "candles", 12.0,
+                 attributes=("scented",)),
+]
+
+
+def make_goal(product, weight=1.0):
+    return {
+        "asin": product["asin"],
+        "category": product["category"],
+        "query": product["query"],
+        "product_category": product["product_category"],
+        "name": product["name"],
+        "instruction_text": product["instruction_text"],
+        "attributes": product["instruction_attributes"],
+        "price_upper": product["pricing"][0] * 2,
+        "goal_options": [],
+        "weight": weight,
+    }
+
+
+class FakeHit:
+    def __init__(self, docid):
+        self.docid = docid
+
+
+class FakeDoc:
+    def __init__(self, asin):
+        self.asin = asin
+
+    def raw(self):
+        return json.dumps({"id": self.asin})
+
+
+class FakeSearchEngine:
+    """Returns the products whose name shares a word with the query"""
+
+    def __init__(self, products):
+        self.products = products
+
+    def search(self, query, k):
+        words = set(query.lower().split())
+        return [
+            FakeHit(p["asin"])
+            for p in self.products
+            if words & set(p["name"].split())
+        ][:k]
+
+    def doc(self, docid):
+        return FakeDoc(docid)
+
+
+def make_catalog(products=PRODUCTS):
+    from personalized_shopping.shared_libraries.web_agent_site.engine.engine import (
+        ProductPrices,
+    )
+    from personalized_shopping.shared_libraries.web_agent_site.envs.catalog import (
+        Catalog,
+    )
+
+    return Catalog(
+        all_products=list(products),
+        product_item_dict={p["asin"]: p for p in products},
+        product_prices=ProductPrices(
+            [p["asin"] for p in products], [p["pricing"][0] for p in products]
+        ),
+        search_engine=FakeSearchEngine(products),
+        goals=[make_goal(p) for p in products],
+    )
+
+
+@pytest.fixture
+def sim_server(monkeypatch):
+    """A `SimServer` over the tiny catalog"""
+    from personalized_shopping.shared_libraries.web_agent_site.envs import (
+        web_agent_text_env,
+    )
+
+    monkeypatch.setattr(
+        web_agent_text_env, "load_catalog", lambda *args, **kwargs: make_catalog()
+    )
+    return web_agent_text_env.SimServer("http://127.0.0.1:3000", "unused.json")
+
+
+@pytest.fixture
+def text_env(sim_server):
+    """A `WebAgentTextEnv` in text mode over the tiny catalog"""
+    from personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env import (
+        WebAgentTextEnv,
+    )
+
+    return WebAgentTextEnv(observation_mode="text", server=sim_server)
+
+
+@pytest.fixture
+def catalog_sources(monkeypatch):
+    """Makes `load_catalog` load the tiny catalog, with three goals per product"""
+    from personalized_shopping.shared_libraries.web_agent_site.envs import catalog
+
+    monkeypatch.setattr(
+        catalog,
+        "load_products",
+        lambda **kwargs: (list(PRODUCTS), {p["asin"]: p for p in PRODUCTS}, {}, []),
+    )
+    monkeypatch.setattr(
+        catalog, "init_search_engine", lambda **kwargs: FakeSearchEngine(PRODUCTS)
+    )
+    monkeypatch.setattr(
+        catalog,
+        "get_goals",
+        lambda products, prices, human_goals: [
+            make_goal(p, weight=w) for p in products for w in (1.0, 2.0, 3.0)
+        ],
+    )
+
+
+def fake_nlp(text):
+    """Stands in for the spaCy pipeline, tagging every word as a noun"""
+    return [SimpleNamespace(text=word, pos_="NOUN") for word in text.split()]
+
+
+@pytest.fixture
+def stub_nlp(monkeypatch):
+    """Makes rewards computable without the `en_core_web_sm` model"""
+    from personalized_shopping.shared_libraries.web_agent_site.engine import goal
+
+    monkeypatch.setattr(goal, "get_nlp", lambda: fake_nlp)
@@ -0,0 +1,45 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.envs import catalog
+
+
+pytestmark = pytest.mark.usefixtures("catalog_sources")
+
+
+def goal_keys(loaded):
+    return [(goal["asin"], goal["weight"]) for goal in loaded.goals]
+
+
+def test_loading_a_catalog_leaves_the_global_generator_alone():
+    random.seed(1)
+    expected = [random.random() for _ in range(3)]
+    random.seed(1)
+    catalog.load_catalog("unused.json", limit_goals=4)
+    assert [random.random() for _ in range(3)] == expected
+
+
+def test_goal_order_and_limit_are_reproducible():
+    first = catalog.load_catalog("unused.json", limit_goals=4)
+    random.seed(2)
+    second = catalog.load_catalog("unused.json", limit_goals=4)
+    assert len(first.goals) == 4
+    assert goal_keys(first) == goal_keys(second)
+    assert goal_keys(catalog.load_catalog("unused.json")) == goal_keys(
+        catalog.load_catalog("unused.json")
+    )
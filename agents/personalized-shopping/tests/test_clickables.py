@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""The clickables listed for each page must be those its template renders."""
+
+from bs4 import BeautifulSoup
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.engine import (
+    END_BUTTON,
+    map_action_to_clickables,
+    map_action_to_html,
+)
+
+from conftest import PRODUCTS
+
+SESSION = "fixed_1"
+SHIRT = PRODUCTS[0]
+
+
+def parse_clickables(html):
+    """Clickables of a rendered page, the way agents used to collect them from
+    the HTML: buttons, then product links, then buying options
+    """
+    html_obj = BeautifulSoup(html, "html.parser")
+    has_search_bar = html_obj.find(id="search_input") is not None
+    clickables = []
+    for button in html_obj.find_all(class_="btn"):
+        label = button.get_text().lower()
+        kind = "search" if has_search_bar and label == "search" else "button"
+        clickables.append((kind, label))
+    for link in html_obj.find_all(class_="product-link"):
+        clickables.append(("product", link.get_text().lower()))
+    for option in html_obj.select('input[type="radio"]'):
+        clickables.append(("option", option.get("value"), option.get("name")))
+    return clickables
+
+
+def page_kwargs(**kwargs):
+    return dict(
+        session_id=SESSION,
+        instruction_text="i want a shirt",
+        keywords=["shirt"],
+        page=1,
+        product_info=SHIRT,
+        asin=SHIRT["asin"],
+        options={},
+        **kwargs,
+    )
+
+
+PAGES = {
+    "start": ("start", page_kwargs()),
+    "results": (
+        "search[shirt]",
+        page_kwargs(products=PRODUCTS[:2], total=2),
+    ),
+    "results, later page": (
+        "search[shirt]",
+        {**page_kwargs(products=PRODUCTS[2:], total=3), "page": 2},
+    ),
+    "results, none found": (
+        "search[shirt]",
+        page_kwargs(products=[], total=0),
+    ),
+    "item": ("click[b000000001]", page_kwargs(show_attrs=False)),
+    "item with attributes": ("click[b000000001]", page_kwargs(show_attrs=True)),
+    "item without options": (
+        "click[b000000002]",
+        {**page_kwargs(show_attrs=False), "product_info": PRODUCTS[1]},
+    ),
+    "description": ("click[Description]", page_kwargs()),
+    "done": (
+        f"click[{END_BUTTON}]",
+        page_kwargs(reward=1.0),
+    ),
+}
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_clickables_match_rendered_page(page):
+    action, kwargs = PAGES[page]
+    clickables = map_action_to_clickables(action, **kwargs)
+
+    rendered = parse_clickables(map_action_to_html(action, **kwargs))
+    assert [
+        (c.kind, c.label, c.option_name) if c.kind == "option" else (c.kind, c.label)
+        for c in clickables.values()
+    ] == rendered
+    assert list(clickables) == [clickable[1] for clickable in rendered]
+
+
+def test_results_page_order():
+    action, kwargs = PAGES["results"]
+    assert list(map_action_to_clickables(action, **kwargs)) == [
+        "back to search",
+        "next >",
+        "b000000001",
+        "b000000002",
+    ]
+    action, kwargs = PAGES["results, later page"]
+    assert list(map_action_to_clickables(action, **kwargs)) == [
+        "back to search",
+        "< prev",
+        "next >",
+        "b000000003",
+    ]
+
+
+def test_item_page_order():
+    action, kwargs = PAGES["item"]
+    clickables = map_action_to_clickables(action, **kwargs)
+    assert list(clickables) == [
+        "back to search",
+        "< prev",
+        "description",
+        "features",
+        "reviews",
+        "buy now",
+        "red",
+        "blue",
+    ]
+    assert clickables["red"].option_name == "color"
@@ -0,0 +1,189 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter
+import random
+
+import numpy as np
+from thefuzz import fuzz
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.goal import (
+    NO_PRICE_UPPER,
+    PRICE_RANGE,
+    get_attribute_reward,
+    get_price_constraints,
+    sample_price_uppers,
+)
+
+
+def reference_attribute_reward(purchased_product, goal):
+    """`get_attribute_reward` as it was, testing each text field on its own"""
+    purchased_attrs = purchased_product["Attributes"]
+    goal_attrs = goal["attributes"]
+
+    num_attr_matches = 0
+    for g_attr in goal_attrs:
+        matched = False
+        for p_attr in purchased_attrs:
+            score = fuzz.token_set_ratio(p_attr, g_attr)
+            if score > 85:
+                num_attr_matches += 1
+                matched = True
+                break
+        if not matched and (
+            g_attr in purchased_product["Title"].lower()
+            or g_attr in " ".join(purchased_product["BulletPoints"]).lower()
+            or g_attr in purchased_product["Description"].lower()
+        ):
+            num_attr_matches += 1
+            matched = True
+
+    r_attr = num_attr_matches / len(goal_attrs)
+    return r_attr, num_attr_matches
+
+
+def text_product(title, bullets, description, attributes=("DUMMY_ATTR",)):
+    return {
+        "Title": title,
+        "BulletPoints": list(bullets),
+        "Description": description,
+        "Attributes": list(attributes),
+    }
+
+
+PRODUCT = text_product(
+    "Soft Cotton Shirt",
+    ["Machine Washable", "long sleeve"],
+    "Slim fit. Made in Portugal",
+    attributes=("breathable fabric",),
+)
+
+
+@pytest.mark.parametrize(
+    "goal_attrs, expected",
+    [
+        (["breathable fabric"], 1),  # in the attribute list
+        (["cotton shirt"], 1),  # in the title, matched case-insensitively
+        (["washable long"], 1),  # across two bullet points, joined by a space
+        (["slim fit"], 1),  # in the description
+        (["shirt machine"], 0),  # across the title and the bullet points
+        (["sleeve slim"], 0),  # across the bullet points and the description
+        (["portugal soft"], 0),  # across the description and the title
+        (["wool", "slim fit", "shirt machine"], 1),
+    ],
+)
+def test_attribute_reward_matches_per_field_check(goal_attrs, expected):
+    goal = {"attributes": goal_attrs}
+    assert get_attribute_reward(PRODUCT, goal) == reference_attribute_reward(
+        PRODUCT, goal
+    )
+    assert get_attribute_reward(PRODUCT, goal)[1] == expected
+
+
+def test_attribute_reward_matches_per_field_check_on_random_text():
+    rng = random.Random(0)
+    words = ["red", "soft", "cotton", "slim", "fit", "long", "wash", "dry", " "]
+
+    def phrase(n):
+        return " ".join(rng.choice(words) for _ in range(rng.randint(0, n)))
+
+    for _ in range(500):
+        product = text_product(
+            phrase(4).title(),
+            [phrase(3) for _ in range(rng.randint(0, 3))],
+            phrase(5),
+            attributes=[phrase(2) or "DUMMY_ATTR"],
+        )
+        goal = {"attributes": [phrase(3) for _ in range(rng.randint(1, 3))]}
+        assert get_attribute_reward(product, goal) == reference_attribute_reward(
+            product, goal
+        )
+
+
+def points_above(price):
+    """Price points a goal on a product costing `price` may be bounded by"""
+    return [p for p in PRICE_RANGE if p > price][:4]
+
+
+PRICES = np.concatenate(
+    [
+        np.random.default_rng(0).uniform(0, 1100, 2000),
+        PRICE_RANGE,  # prices on a price point
+        [0.0, 9.99, 965.0, 970.0, 979.99, 980.0, 985.0, 990.0, 10**6],
+    ]
+)
+
+
+def test_price_upper_is_above_price_and_among_the_next_points():
+    price_uppers = sample_price_uppers(PRICES, np.random.default_rng(1))
+    assert price_uppers.shape == PRICES.shape
+    for price, price_upper in zip(PRICES.tolist(), price_uppers.tolist()):
+        candidates = points_above(price)
+        if len(candidates) < 2:
+            assert price_upper == NO_PRICE_UPPER
+        else:
+            assert price_upper > price
+            # The larger of two distinct points, so never the first one
+            assert price_upper in candidates[1:]
+
+
+@pytest.mark.parametrize("price", [980.0, 985.0, 990.0, 995.0, 10**6])
+def test_no_price_upper_with_fewer_than_two_points_above(price):
+    assert sample_price_uppers([price], np.random.default_rng(0)).tolist() == [
+        NO_PRICE_UPPER
+    ]
+
+
+@pytest.mark.parametrize("price", [15.0, 20.0, 965.0, 975.0])
+def test_price_upper_distribution_matches_sampling_two_points(price):
+    """The larger of two points sampled without replacement among n is the
+    j-th (0-based) with probability j / (n choose 2)
+    """
+    candidates = points_above(price)
+    n = len(candidates)
+    num_samples = 60000
+    price_uppers = sample_price_uppers(
+        np.full(num_samples, price), np.random.default_rng(2)
+    )
+    frequencies = Counter(price_uppers.tolist())
+    for j, candidate in enumerate(candidates):
+        expected = j / (n * (n - 1) / 2)
+        assert frequencies[candidate] / num_samples == pytest.approx(
+            expected, abs=0.01
+        )
+    assert sum(frequencies.values()) == num_samples
+
+
+def test_price_uppers_are_deterministic_given_a_seed():
+    first = sample_price_uppers(PRICES, np.random.default_rng(7))
+    second = sample_price_uppers(PRICES, np.random.default_rng(7))
+    other = sample_price_uppers(PRICES, np.random.default_rng(8))
+    assert first.tolist() == second.tolist()
+    assert first.tolist() != other.tolist()
+
+    asins = [f"B{i:09d}" for i in range(100)]
+    product_prices = {asin: 10.0 * i + 5 for i, asin in enumerate(asins)}
+    random.seed(3)
+    constraints = get_price_constraints(asins, product_prices)
+    random.seed(3)
+    assert get_price_constraints(asins, product_prices) == constraints
+    assert constraints[-1] == (NO_PRICE_UPPER, "")
+    price_upper, price_text = constraints[0]
+    assert price_text == f", and price lower than {price_upper:.2f} dollars"
+
+
+def test_no_prices_gives_no_price_uppers():
+    assert sample_price_uppers([], np.random.default_rng(0)).tolist() == []
+    assert get_price_constraints(["B000000001"], None) == [(NO_PRICE_UPPER, "")]
@@ -0,0 +1,122 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.goal_index import (
+    GoalIndex,
+)
+
+CATEGORIES = ["fashion", "beauty", "home", "garden"]
+ATTRIBUTES = ["cotton", "vegan", "waterproof", "organic", "long lasting"]
+
+
+def make_goals(n=200, seed=0):
+    rng = random.Random(seed)
+    goals = []
+    for i in range(n):
+        category = rng.choice(CATEGORIES)
+        goals.append(
+            {
+                "asin": f"B{rng.randrange(50):09d}",
+                "category": category,
+                "query": f"{category} {rng.randrange(5)}",
+                "product_category": f"{category} › {rng.randrange(3)}",
+                "attributes": rng.sample(ATTRIBUTES, rng.randrange(4)),
+                "goal_options": ["red"] * rng.randrange(3),
+                "price_upper": float(rng.choice([10, 20, 30, 50, 100])),
+                "weight": rng.choice([0.5, 1.0, 2.0]),
+            }
+        )
+    return goals
+
+
+GOALS = make_goals()
+
+# Each declarative filter, with the predicate a `filter_goals` function would use
+FILTERS = [
+    ([("category", "==", "fashion")], lambda g: g["category"] == "fashion"),
+    ([("category", "!=", "fashion")], lambda g: g["category"] != "fashion"),
+    (
+        [("category", "in", {"beauty", "home"})],
+        lambda g: g["category"] in {"beauty", "home"},
+    ),
+    (
+        [("category", "not in", {"beauty", "nope"})],
+        lambda g: g["category"] not in {"beauty", "nope"},
+    ),
+    ([("category", "==", "nope")], lambda g: False),
+    ([("price_upper", "<=", 30)], lambda g: g["price_upper"] <= 30),
+    ([("price_upper", ">", 30)], lambda g: g["price_upper"] > 30),
+    ([("weight", "in", {0.5, 2.0})], lambda g: g["weight"] in {0.5, 2.0}),
+    ([("num_attributes", ">=", 2)], lambda g: len(g["attributes"]) >= 2),
+    ([("num_options", "==", 0)], lambda g: not g["goal_options"]),
+    ([("attributes", "contains", "vegan")], lambda g: "vegan" in g["attributes"]),
+    (
+        [("attributes", "not contains", "vegan")],
+        lambda g: "vegan" not in g["attributes"],
+    ),
+    (
+        [("attributes", "in", {"cotton", "organic"})],
+        lambda g: bool({"cotton", "organic"} & set(g["attributes"])),
+    ),
+    (
+        [
+            ("category", "in", {"fashion", "beauty"}),
+            ("num_attributes", ">=", 1),
+            ("price_upper", "<", 100),
+        ],
+        lambda g: g["category"] in {"fashion", "beauty"}
+        and len(g["attributes"]) >= 1
+        and g["price_upper"] < 100,
+    ),
+]
+
+
+@pytest.mark.parametrize("filters, predicate", FILTERS)
+def test_select_matches_filter_function(filters, predicate):
+    expected = [i for i, goal in enumerate(GOALS) if predicate(goal)]
+    assert GoalIndex(GOALS).select(filters).tolist() == expected
+
+
+def test_lookups_return_positions_in_order():
+    index = GoalIndex(GOALS)
+    for column, method in [
+        ("asin", index.by_asin),
+        ("category", index.by_category),
+        ("query", index.by_query),
+    ]:
+        value = GOALS[17][column]
+        expected = [i for i, goal in enumerate(GOALS) if goal[column] == value]
+        assert method(value).tolist() == expected
+    assert index.by_attribute("vegan").tolist() == [
+        i for i, goal in enumerate(GOALS) if "vegan" in goal["attributes"]
+    ]
+    assert index.by_category("nope").tolist() == []
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        [("color", "==", "red")],
+        [("category", "<", "fashion")],
+        [("price_upper", "contains", 3)],
+        [("attributes", "==", "vegan")],
+    ],
+)
+def test_invalid_filters_are_rejected(filters):
+    with pytest.raises(ValueError):
+        GoalIndex(GOALS).select(filters)
@@ -0,0 +1,149 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from personalized_shopping.shared_libraries.web_agent_site.envs.http_server import (
+    create_app,
+)
+
+
+def start(client, session_id):
+    response = client.post(f"/index/{session_id}", json={"session_int": 0})
+    assert response.status_code == 200
+
+
+def test_search_and_click_over_http(sim_server):
+    client = TestClient(create_app(sim_server))
+    start(client, "s1")
+    response = client.post("/search_results/s1", json={"keywords": ["shirt"]})
+    assert response.json()["session"]["keywords"] == ["shirt"]
+    response = client.post("/click/s1", json={"clickable_name": "B000000002"})
+    assert response.json()["session"]["asins"] == ["B000000002"]
+
+    assert client.delete("/session/s1").status_code == 200
+    assert client.get("/session/s1").status_code == 404
+
+
+def test_idle_sessions_expire(sim_server):
+    client = TestClient(create_app(sim_server, session_ttl=0.2))
+    start(client, "idle")
+    time.sleep(0.3)
+    start(client, "active")
+
+    assert set(sim_server.user_sessions) == {"active"}
+    assert client.get("/session/idle").status_code == 404
+    assert client.get("/session/active").status_code == 200
+
+
+def test_least_recently_used_sessions_are_ended_beyond_the_limit(sim_server):
+    client = TestClient(create_app(sim_server, max_sessions=2))
+    start(client, "s1")
+    start(client, "s2")
+    client.get("/session/s1")
+    start(client, "s3")
+    # The next request evicts s2, the least recently used session
+    assert client.get("/session/s1").status_code == 200
+    assert set(sim_server.user_sessions) == {"s1", "s3"}
+
+
+TENANT_INSTRUCTION = "i want a tenant-specific gift"
+
+
+def test_assigned_instructions_stay_in_their_session(sim_server):
+    app = create_app(sim_server)
+    first, second = TestClient(app), TestClient(app)
+    goal = dict(sim_server.goals[0])
+
+    response = first.post(
+        "/index/s1",
+        json={"session_int": 0, "assigned_instruction_text": TENANT_INSTRUCTION},
+    )
+    assert response.json()["session"]["goal"]["instruction_text"] == TENANT_INSTRUCTION
+    assert TENANT_INSTRUCTION in response.json()["html"]
+    response = second.post("/index/s2", json={"session_int": 0})
+    assert response.json()["session"]["goal"]["instruction_text"] == (
+        goal["instruction_text"]
+    )
+    assert TENANT_INSTRUCTION not in response.json()["html"]
+
+    # The catalog's goal is left alone, and so is the first session's copy
+    assert sim_server.goals[0] == goal
+    session = first.get("/session/s1").json()
+    assert session["goal"]["instruction_text"] == TENANT_INSTRUCTION
+    assert sim_server.assigned_instruction_text is None
+
+
+def test_sessions_are_served_concurrently(sim_server):
+    client = TestClient(create_app(sim_server))
+    start(client, "slow")
+    start(client, "fast")
+    search_results = sim_server.search_results
+    slow_started, fast_done = threading.Event(), threading.Event()
+
+    def slow_search_results(session_id, **kwargs):
+        if session_id == "slow":
+            slow_started.set()
+            # Would time out if requests on other sessions had to wait for it
+            assert fast_done.wait(timeout=5)
+        return search_results(session_id, **kwargs)
+
+    sim_server.search_results = slow_search_results
+    responses = {}
+    slow = threading.Thread(
+        target=lambda: responses.update(
+            slow=client.post("/search_results/slow", json={"keywords": ["shirt"]})
+        )
+    )
+    slow.start()
+    assert slow_started.wait(timeout=5)
+    response = client.post("/search_results/fast", json={"keywords": ["candle"]})
+    fast_done.set()
+    slow.join()
+
+    assert response.json()["session"]["keywords"] == ["candle"]
+    assert responses["slow"].status_code == 200
+    assert responses["slow"].json()["session"]["keywords"] == ["shirt"]
+
+
+def test_requests_on_one_session_are_serialized(sim_server):
+    client = TestClient(create_app(sim_server))
+    start(client, "s1")
+    search_results = sim_server.search_results
+    running, overlaps = [], []
+
+    def tracked_search_results(session_id, **kwargs):
+        running.append(session_id)
+        overlaps.append(len(running))
+        time.sleep(0.01)
+        running.pop()
+        return search_results(session_id, **kwargs)
+
+    sim_server.search_results = tracked_search_results
+    threads = [
+        threading.Thread(
+            target=lambda: client.post(
+                "/search_results/s1", json={"keywords": ["shirt"]}
+            )
+        )
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1] * 5
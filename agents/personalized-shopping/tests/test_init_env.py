@@ -0,0 +1,155 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from personalized_shopping.shared_libraries import init_env
+from personalized_shopping.shared_libraries.web_agent_site import utils
+from personalized_shopping.shared_libraries.web_agent_site.engine import goal
+
+
+class FakeEnv:
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+@pytest.fixture
+def profile(monkeypatch):
+    profile = utils.StartupProfile()
+    monkeypatch.setattr(init_env, "STARTUP_PROFILE", profile)
+    return profile
+
+
+@pytest.fixture
+def fake_init(monkeypatch, profile):
+    """Replaces the environment construction, counting the calls to it"""
+    monkeypatch.setattr(init_env, "_webshop_env", None)
+    envs = []
+
+    def fake_init_env(num_products):
+        envs.append(FakeEnv())
+        return envs[-1]
+
+    monkeypatch.setattr(init_env, "init_env", fake_init_env)
+    return envs
+
+
+def test_import_loads_no_heavy_dependency():
+    code = (
+        "import sys\n"
+        "import personalized_shopping.shared_libraries.init_env\n"
+        "print(sorted(m for m in ('gym', 'spacy', 'pyserini', 'torch')"
+        " if m in sys.modules))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
+
+
+def test_env_is_built_once_on_first_use(fake_init, profile):
+    assert not fake_init
+
+    envs = []
+    threads = [
+        threading.Thread(target=lambda: envs.append(init_env.get_webshop_env()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fake_init) == 1
+    assert fake_init[0].resets == 1
+    assert all(env is fake_init[0] for env in envs)
+    assert init_env.webshop_env is fake_init[0]
+    assert [name for name, *_ in profile.components] == ["webshop_env"]
+
+
+def test_warm_up_loads_env_and_nlp(fake_init, profile, monkeypatch):
+    nlp_loads = []
+    monkeypatch.setattr(goal, "get_nlp", lambda: nlp_loads.append(1))
+
+    assert init_env.warm_up() is profile
+    assert len(fake_init) == 1
+    assert nlp_loads == [1]
+
+    init_env.warm_up()
+    assert len(fake_init) == 1
+
+
+def test_startup_profile_records_nested_components(monkeypatch):
+    rss = iter([100, 200, 2**20 + 300, 2**21 + 100])
+    monkeypatch.setattr(utils, "rss_bytes", lambda: next(rss))
+    profile = utils.StartupProfile()
+
+    with profile.component("catalog"):
+        with profile.component("goals"):
+            pass
+
+    assert [(name, depth, rss) for name, depth, _, rss in profile.components] == [
+        ("catalog", 0, 2**21),
+        ("goals", 1, 2**20 + 100),
+    ]
+    assert all(seconds >= 0 for _, _, seconds, _ in profile.components)
+    lines = profile.report().splitlines()
+    assert lines[1].startswith("catalog ")
+    assert lines[2].startswith("  goals ")
+    assert lines[1].endswith("2.0")
+
+
+def test_startup_profile_records_failed_components():
+    profile = utils.StartupProfile()
+    with pytest.raises(RuntimeError):
+        with profile.component("spacy"):
+            raise RuntimeError("model missing")
+    assert profile.components[0][0] == "spacy"
+    assert profile.depth == 0
+
+
+@pytest.mark.parametrize(
+    "platform, expected", [("linux", 4096 * 1024), ("darwin", 4096)]
+)
+def test_rss_falls_back_to_peak_rss(platform, expected, monkeypatch):
+    def no_proc(*args, **kwargs):
+        raise OSError("no /proc")
+
+    monkeypatch.setattr(utils, "open", no_proc, raising=False)
+    monkeypatch.setattr(utils.sys, "platform", platform)
+    monkeypatch.setattr(
+        utils,
+        "resource",
+        SimpleNamespace(
+            RUSAGE_SELF=0, getrusage=lambda who: SimpleNamespace(ru_maxrss=4096)
+        ),
+    )
+    assert utils.rss_bytes() == expected
+
+
+def test_rss_without_proc_or_resource(monkeypatch):
+    def no_proc(*args, **kwargs):
+        raise OSError("no /proc")
+
+    monkeypatch.setattr(utils, "open", no_proc, raising=False)
+    monkeypatch.setattr(utils, "resource", None)
+    assert utils.rss_bytes() == 0
@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.engine import (
+    iter_json_array,
+)
+
+ELEMENTS = [
+    1.5,
+    2e3,
+    -7,
+    123456789,
+    "a string, with ] and ,",
+    True,
+    False,
+    None,
+    {"asin": "B000000001", "pricing": "$1.50", "nested": [1, 22.5e-1, {}]},
+    [],
+]
+
+
+@pytest.mark.parametrize("buffer_size", [1, 2, 3, 5, 8, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_elements_round_trip_for_any_buffer_size(tmp_path, buffer_size, indent):
+    path = tmp_path / "products.json"
+    path.write_text(json.dumps(ELEMENTS, indent=indent))
+    assert list(iter_json_array(path, buffer_size=buffer_size)) == ELEMENTS
+
+
+@pytest.mark.parametrize("buffer_size", [1, 2, 1 << 20])
+def test_empty_array(tmp_path, buffer_size):
+    path = tmp_path / "products.json"
+    path.write_text(" [ ] ")
+    assert list(iter_json_array(path, buffer_size=buffer_size)) == []
+
+
+@pytest.mark.parametrize(
+    "text",
+    ['{"a": 1}', "[1, 2", "[1 2]", "[1.5x]", "[1,,2]", "[1,]", "[,1]", "[,]", "[1,"],
+)
+@pytest.mark.parametrize("buffer_size", [1, 2, 1 << 20])
+def test_malformed_input_raises(tmp_path, text, buffer_size):
+    path = tmp_path / "products.json"
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        list(iter_json_array(path, buffer_size=buffer_size))
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine import engine
+from personalized_shopping.shared_libraries.web_agent_site.envs import catalog
+from personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env import (
+    SimServer,
+)
+
+
+def raw_product(i):
+    """A catalog entry as found in the WebShop product file"""
+    return {
+        "asin": f"B{i:09d}",
+        "name": f"product {i}",
+        "full_description": f"description of product {i}",
+        "small_description": [f"bullet {i}"],
+        "pricing": f"${i % 90 + 10}.99",
+        "customization_options": {
+            "Color": [{"value": "Navy/Blue", "image": None}, {"value": "Red"}],
+        },
+        "images": [f"https://example.com/{i}.jpg"],
+        "query": " Shirts ",
+        "category": "fashion",
+        "product_category": "fashion › shirts",
+    }
+
+
+@pytest.fixture
+def product_file(tmp_path, monkeypatch):
+    """A synthetic catalog spanning several load chunks, and its attribute files"""
+    num_products = 2 * engine.LOAD_CHUNK_SIZE + 10
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([raw_product(i) for i in range(num_products)]))
+    attr_path = tmp_path / "items_ins.json"
+    attr_path.write_text(json.dumps({"B000000003": {"attributes": ["soft"]}}))
+    human_attr_path = tmp_path / "items_human_ins.json"
+    human_attr_path.write_text(json.dumps({"B000000003": [{"instruction": "x"}]}))
+    monkeypatch.setattr(engine, "DEFAULT_ATTR_PATH", attr_path)
+    monkeypatch.setattr(engine, "HUMAN_ATTR_PATH", human_attr_path)
+    return path
+
+
+def test_worker_processes_load_the_same_catalog(product_file):
+    products, product_item_dict, _, attribute_to_asins = engine.load_products(
+        product_file
+    )
+    parallel = engine.load_products(product_file, num_workers=2)
+
+    assert len(products) == 2 * engine.LOAD_CHUNK_SIZE + 10
+    assert parallel[0] == products
+    assert parallel[1] == product_item_dict
+    assert parallel[3] == attribute_to_asins
+    assert products[3]["Attributes"] == ["soft"]
+    assert products[3]["instructions"] == [{"instruction": "x"}]
+    assert products[0]["options"] == {"color": ["navy | blue", "red"]}
+
+
+def test_num_workers_reaches_load_products(catalog_sources, monkeypatch):
+    calls = []
+    load_products = catalog.load_products
+
+    def recording_load_products(**kwargs):
+        calls.append(kwargs)
+        return load_products(**kwargs)
+
+    monkeypatch.setattr(catalog, "load_products", recording_load_products)
+    server = SimServer("http://127.0.0.1:3000", "unused.json", num_workers=4)
+    server.reload_catalog("unused.json")
+
+    assert [kwargs["num_workers"] for kwargs in calls] == [4, 4]
@@ -0,0 +1,68 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS_DIR = Path(__file__).parent.parent / "benchmarks"
+THRESHOLDS = BENCHMARKS_DIR / "thresholds.json"
+
+
+@pytest.fixture(scope="module")
+def microbench():
+    spec = importlib.util.spec_from_file_location(
+        "microbench", BENCHMARKS_DIR / "microbench.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_check_passes_offline(microbench, capsys):
+    # The reward benchmarks, including the spaCy one that may be skipped
+    argv = ["--check", str(THRESHOLDS), "-k", "reward", "--repeat", "1"]
+    assert microbench.main(argv) == 0
+    output = capsys.readouterr().out
+    assert "get_attribute_reward" in output
+    assert "get_type_reward" in output
+    assert "REGRESSION" not in output
+
+
+def test_check_fails_on_exceeded_thresholds(microbench, tmp_path, capsys):
+    path = tmp_path / "thresholds.json"
+    path.write_text(json.dumps({"parse_action": {"time_ratio": 0.0}}))
+    argv = ["--check", str(path), "-k", "parse_action", "--repeat", "1"]
+    assert microbench.main(argv) == 1
+    assert "REGRESSION parse_action: time_ratio" in capsys.readouterr().out
+
+
+def test_thresholds_cover_every_offline_benchmark(microbench):
+    thresholds = json.loads(THRESHOLDS.read_text())
+    benchmarks, skipped = microbench.make_benchmarks()
+    assert {name for name, _ in benchmarks} - set(skipped) <= set(thresholds)
+    for limits in thresholds.values():
+        assert set(limits) == {"time_ratio", "peak_alloc_bytes"}
+
+
+def test_missing_spacy_model_skips_its_benchmark(microbench, monkeypatch):
+    def missing_model():
+        raise OSError("[E050] Can't find model 'en_core_web_sm'.")
+
+    monkeypatch.setattr(microbench, "get_nlp", missing_model)
+    benchmarks, skipped = microbench.make_benchmarks()
+    assert "get_type_reward" in skipped
+    assert "get_type_reward" not in {name for name, _ in benchmarks}
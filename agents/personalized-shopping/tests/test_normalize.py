@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Parity of the single-pass color and size matchers with the pattern loops
+they replaced.
+"""
+
+import random
+import re
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine.normalize import (
+    COLOR_SET,
+    SIZE_PATTERNS,
+    normalize_color,
+    normalize_color_size,
+    normalize_size,
+)
+
+
+def loop_color(color_string):
+    for norm_color in COLOR_SET:
+        if norm_color in color_string:
+            return norm_color
+    return color_string
+
+
+def loop_size(size_string):
+    for pattern in SIZE_PATTERNS:
+        if re.search(pattern, size_string) is not None:
+            return pattern.pattern
+    if size_string.replace(".", "", 1).isdigit():
+        return "numeric_size"
+    return "not_matched"
+
+
+COLORS = [
+    "",
+    "red",
+    "dark red",
+    # "red" comes after "blue" in COLOR_SET even though it appears first
+    "red and blue",
+    # Overlapping entries: "ash" inside "washed", "rose" inside "rosewood"
+    "washed rose",
+    "stonewash",
+    "tangerine",
+    "winered",
+    "light\ngrey",
+    "no color at all",
+    "multicolor rainbow",
+]
+SIZES = [
+    "",
+    "small",
+    "x-large",
+    "xx-large",
+    "3x-large",
+    "medium tall",
+    "15 neck 32 sleeve",
+    "6 women | 8 men",
+    "30w x 32l",
+    "30w by 32l",
+    "10w x 12h",
+    "8 x-wide",
+    "8 wide",
+    "7 narrow",
+    "12 petite",
+    "24 inch",
+    "2x plus",
+    "40mm",
+    "women's 8",
+    "3 x 5",
+    "6ft",
+    "10 feet",
+    "2 meter",
+    "5 yards",
+    "2*3",
+    "6-8",
+    '12"',
+    "9f",
+    "3m",
+    "50cm",
+    "100g",
+    "12",
+    "12.5",
+    "1.2.3",
+    "one size",
+    "twin pack",
+    "a\nwide",
+    "no size",
+]
+
+
+@pytest.mark.parametrize("color", COLORS)
+def test_colors_match_the_loop(color):
+    assert normalize_color(color) == loop_color(color)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_sizes_match_the_loop(size):
+    assert normalize_size(size) == loop_size(size)
+
+
+@pytest.mark.parametrize(
+    "value", [("color", "red"), ("color", "grey"), ["navy"], ("size", "large")]
+)
+def test_non_string_colors_use_membership(value):
+    assert normalize_color(value) == loop_color(value)
+
+
+def test_random_strings_match_the_loops():
+    rng = random.Random(0)
+    words = COLOR_SET + [p.pattern for p in SIZE_PATTERNS[:15]] + [
+        "x", "w", "l", "-", "*", "women", "men", "inch", "12", "3.5", '"', " ",
+    ]
+    for _ in range(2000):
+        text = "".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        assert normalize_color(text) == loop_color(text)
+        assert normalize_size(text) == loop_size(text)
+
+
+def test_color_size_mappings():
+    product_prices = {
+        ("B1", "Dark Red", "30W x 32L"): 10.0,
+        ("B1", "Sea Foam", "12"): 11.0,
+        ("B2", "Red and Blue", "Huge"): 12.0,
+    }
+    color_mapping, size_mapping = normalize_color_size(product_prices)
+    assert color_mapping == {
+        "N.A.": "not_matched",
+        "dark red": "dark",
+        "sea foam": "not_matched",
+        "red and blue": "blue",
+    }
+    assert size_mapping == {
+        "N.A.": "not_matched",
+        "30w x 32l": loop_size("30w x 32l"),
+        "12": "numeric_size",
+        "huge": "not_matched",
+    }
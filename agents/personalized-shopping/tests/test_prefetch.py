@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.envs import prefetch
+from personalized_shopping.shared_libraries.web_agent_site.envs.prefetch import (
+    PagePrefetcher,
+)
+
+
+@pytest.fixture(autouse=True)
+def fake_renderer(monkeypatch):
+    monkeypatch.setattr(
+        prefetch, "map_action_to_html", lambda action, **kwargs: f"<p>{action}</p>"
+    )
+
+
+def pages(*urls):
+    return [(url, f"click[{url}]", {"instruction_text": "i"}) for url in urls]
+
+
+def prefetched(session_pages, memory_budget=prefetch.DEFAULT_MEMORY_BUDGET):
+    """A prefetcher that has rendered `session_pages` and stopped its worker"""
+    prefetcher = PagePrefetcher(memory_budget)
+    for session_id, urls in session_pages.items():
+        prefetcher.schedule(session_id, pages(*urls))
+    prefetcher.close()
+    return prefetcher
+
+
+def test_take_serves_a_page_and_drops_only_that_sessions_pages():
+    prefetcher = prefetched({"s1": ["a", "b"], "s2": ["c"]})
+    assert len(prefetcher.cache) == 3
+
+    assert prefetcher.take("s1", "a", "i") == "<p>click[a]</p>"
+    assert list(prefetcher.cache) == [("s2", "c", "i")]
+    assert set(prefetcher.session_keys) == {"s2"}
+    assert prefetcher.take("s2", "x", "i") is None
+    assert (prefetcher.hits, prefetcher.misses) == (1, 1)
+    assert prefetcher.memory_used == 0
+
+
+def test_end_session_forgets_the_session():
+    prefetcher = prefetched({"s1": ["a"], "s2": ["b"]})
+    prefetcher.end_session("s1")
+
+    assert list(prefetcher.cache) == [("s2", "b", "i")]
+    assert "s1" not in prefetcher.generations
+    assert "s1" not in prefetcher.session_keys
+    assert prefetcher.memory_used == sys.getsizeof("<p>click[b]</p>")
+
+
+def test_jobs_of_ended_sessions_are_not_rendered():
+    prefetcher = PagePrefetcher()
+    prefetcher.close()
+    # Queue work for a session that ends before the worker gets to it
+    prefetcher.schedule("s1", pages("a"))
+    prefetcher.end_session("s1")
+    prefetcher.jobs.put(None)
+    prefetcher._run()
+    assert not prefetcher.cache
+    assert not prefetcher.generations
+
+
+def test_eviction_keeps_the_session_index_in_sync():
+    size = sys.getsizeof("<p>click[a]</p>")
+    prefetcher = prefetched({"s1": ["a", "b"], "s2": ["c"]}, memory_budget=2 * size)
+
+    assert list(prefetcher.cache) == [("s1", "b", "i"), ("s2", "c", "i")]
+    assert prefetcher.session_keys == {
+        "s1": {("s1", "b", "i")},
+        "s2": {("s2", "c", "i")},
+    }
+    assert prefetcher.memory_used == 2 * size
@@ -0,0 +1,221 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import Counter
+import random
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.engine import sharding
+from personalized_shopping.shared_libraries.web_agent_site.engine.engine import (
+    get_top_n_product_from_keywords,
+)
+from personalized_shopping.shared_libraries.web_agent_site.engine.sharding import (
+    ShardedMapping,
+    ShardedProductList,
+    ShardedSearchEngine,
+    shard_handlers,
+    shard_of,
+)
+
+NUM_SHARDS = 3
+ASINS = [f"B{i:09d}" for i in range(20)]
+
+
+def make_product(i, asin):
+    return {"asin": asin, "category": f"c{i % 3}", "query": f"q{i % 4}"}
+
+
+class InProcessShardPool:
+    """`CatalogShardPool` with the shards' handlers run in this process"""
+
+    def __init__(self, asins, num_shards, scores=None):
+        self.num_shards = num_shards
+        products = [make_product(i, asin) for i, asin in enumerate(asins)]
+        self.shards = [
+            [p for p in products if shard_of(p["asin"], num_shards) == shard_id]
+            for shard_id in range(num_shards)
+        ]
+        self.sizes = [len(products) for products in self.shards]
+        self.offsets = [0]
+        for size in self.sizes:
+            self.offsets.append(self.offsets[-1] + size)
+        # Search score of each asin, as a shard's Lucene index would give it
+        self.scores = scores or {}
+        self.handlers = [
+            shard_handlers(products, {}, [], self._searcher(products))
+            for products in self.shards
+        ]
+        # Requests received by each shard
+        self.requests = Counter()
+
+    def _searcher(self, products):
+        def search(keywords, k):
+            hits = sorted(
+                ((p["asin"], self.scores[p["asin"]]) for p in products
+                 if p["asin"] in self.scores),
+                key=lambda hit: -hit[1],
+            )
+            return hits[:k]
+
+        return search
+
+    def call(self, shard_id, method, *args):
+        self.requests[shard_id] += 1
+        return self.handlers[shard_id][method](*args)
+
+    route = sharding.CatalogShardPool.route
+    broadcast = sharding.CatalogShardPool.broadcast
+
+    def scatter(self, method, shard_args):
+        return {
+            shard_id: self.call(shard_id, method, *shard_args[shard_id])
+            for shard_id in sorted(shard_args)
+        }
+
+
+def test_shard_of_is_stable_and_in_range():
+    assignments = [shard_of(asin, NUM_SHARDS) for asin in ASINS]
+    assert all(0 <= shard < NUM_SHARDS for shard in assignments)
+    assert assignments == [shard_of(asin, NUM_SHARDS) for asin in ASINS]
+    # Every shard gets some of the catalog
+    assert set(assignments) == set(range(NUM_SHARDS))
+    assert shard_of("B000000001", 1) == 0
+
+
+def test_product_list_round_trip(monkeypatch):
+    monkeypatch.setattr(sharding, "SHARD_CHUNK_SIZE", 2)
+    pool = InProcessShardPool(ASINS, NUM_SHARDS)
+    products = ShardedProductList(pool)
+
+    iterated = [p["asin"] for p in products]
+    assert sorted(iterated) == ASINS
+    assert len(products) == len(ASINS)
+    assert [products[i]["asin"] for i in range(len(products))] == iterated
+    assert products[-1]["asin"] == iterated[-1]
+    assert [p["asin"] for p in products[3:9:2]] == iterated[3:9:2]
+    with pytest.raises(IndexError):
+        products[len(ASINS)]
+
+
+def test_mapping_routes_to_the_owning_shard():
+    pool = InProcessShardPool(ASINS, NUM_SHARDS)
+    mapping = ShardedMapping(pool, "product")
+
+    assert mapping[ASINS[7]] == make_product(7, ASINS[7])
+    assert ASINS[7] in mapping
+    assert "B999999999" not in mapping
+    with pytest.raises(KeyError):
+        mapping["B999999999"]
+    assert len(mapping) == len(ASINS)
+    assert sorted(mapping) == ASINS
+
+
+def test_search_merges_shard_hits_by_score():
+    scores = {asin: float(i % 7) + i / 100 for i, asin in enumerate(ASINS)}
+    pool = InProcessShardPool(ASINS, NUM_SHARDS, scores)
+    engine = ShardedSearchEngine(pool)
+
+    hits = engine.search("anything", k=5)
+    expected = sorted(ASINS, key=lambda asin: -scores[asin])[:5]
+    assert [hit.docid for hit in hits] == expected
+    assert [hit.score for hit in hits] == sorted(
+        (hit.score for hit in hits), reverse=True
+    )
+    # The top hits come from more than one shard
+    assert len({shard_of(hit.docid, NUM_SHARDS) for hit in hits}) > 1
+    assert engine.doc(hits[0].docid).raw() == f'{{"id": "{expected[0]}"}}'
+
+
+def test_batched_lookups_make_one_request_per_shard():
+    pool = InProcessShardPool(ASINS, NUM_SHARDS)
+    mapping = ShardedMapping(pool, "product")
+    asins = [ASINS[5], "B999999999", ASINS[0], ASINS[12], ASINS[5]]
+
+    assert mapping.get_many(asins) == [
+        make_product(5, ASINS[5]),
+        None,
+        make_product(0, ASINS[0]),
+        make_product(12, ASINS[12]),
+        make_product(5, ASINS[5]),
+    ]
+    assert max(pool.requests.values()) == 1
+
+
+def test_filters_run_on_the_shards():
+    pool = InProcessShardPool(ASINS, NUM_SHARDS)
+    products = ShardedProductList(pool)
+    listed = list(products)
+    pool.requests.clear()
+
+    assert products.where("category", {"c1"}) == [
+        p for p in listed if p["category"] == "c1"
+    ]
+    assert list(pool.requests.values()) == [1] * NUM_SHARDS
+
+    pool.requests.clear()
+    asins = {ASINS[3], ASINS[4]}
+    assert products.where("asin", asins) == [p for p in listed if p["asin"] in asins]
+    # Only the shards owning the asins are asked
+    assert set(pool.requests) == {shard_of(asin, NUM_SHARDS) for asin in asins}
+
+
+def test_samples_match_random_sample():
+    pool = InProcessShardPool(ASINS, NUM_SHARDS)
+    products = ShardedProductList(pool)
+    listed = list(products)
+    pool.requests.clear()
+
+    random.seed(4)
+    sampled = products.sample(8)
+    random.seed(4)
+    assert sampled == random.sample(listed, k=8)
+    assert max(pool.requests.values()) == 1
+
+
+@pytest.mark.parametrize(
+    "keywords",
+    [["<r>"], ["<a>", "soft"], ["<c>", "c2"], ["<q>", "q1"], ["any", "thing"]],
+)
+def test_sharded_searches_match_unsharded_ones(keywords, monkeypatch):
+    monkeypatch.setattr(
+        "personalized_shopping.shared_libraries.web_agent_site.engine.engine"
+        ".SEARCH_RETURN_N",
+        6,
+    )
+    scores = {asin: float(i % 7) + i / 100 for i, asin in enumerate(ASINS)}
+    pool = InProcessShardPool(ASINS, NUM_SHARDS, scores)
+    all_products = ShardedProductList(pool)
+    listed = list(all_products)
+    product_item_dict = {p["asin"]: p for p in listed}
+    attribute_to_asins = {"soft": {ASINS[1], ASINS[8], ASINS[15]}}
+    search_engine = ShardedSearchEngine(pool)
+
+    random.seed(9)
+    expected = get_top_n_product_from_keywords(
+        keywords, search_engine, listed, product_item_dict, attribute_to_asins
+    )
+    pool.requests.clear()
+    random.seed(9)
+    sharded = get_top_n_product_from_keywords(
+        keywords,
+        search_engine,
+        all_products,
+        ShardedMapping(pool, "product"),
+        attribute_to_asins,
+    )
+    assert sharded == expected
+    assert expected
+    # Text searches ask each shard for hits, then for the products found
+    assert max(pool.requests.values()) <= (2 if keywords[0] == "any" else 1)
@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from personalized_shopping.shared_libraries.web_agent_site.envs.web_agent_text_env import (
+    History,
+)
+
+
+def test_history_versions_share_their_prefix():
+    history = History()
+    for value in "abc":
+        history.append(value)
+    head = history.head
+    branch = History(head)
+    branch.append("x")
+    history.append("y")
+
+    assert list(history) == ["a", "b", "c", "y"]
+    assert list(branch) == ["a", "b", "c", "x"]
+    assert list(History(head)) == ["a", "b", "c"]
+    assert branch.head[1] is head
+    assert (len(history), history[-1], history[0], history[-4]) == (4, "y", "a", "a")
+
+
+def session_of(env):
+    return env.server.user_sessions[env.session]
+
+
+def test_restore_rolls_back_the_session(text_env):
+    text_env.reset(instruction_text="find a shirt")
+    text_env.step("search[shirt]")
+    snapshot = text_env.snapshot()
+    url = text_env.browser.current_url
+
+    obs, _, _, _ = text_env.step("click[b000000001]")
+    text_env.step("click[red]")
+    session = session_of(text_env)
+    assert session["asins"] == {"B000000001"}
+    assert session["options"] == {"color": "red"}
+    assert session["actions"]["asin"] == 1
+
+    text_env.restore(snapshot)
+    session = session_of(text_env)
+    assert text_env.browser.current_url == url
+    assert session["asins"] == set()
+    assert session["options"] == {}
+    assert dict(session["actions"]) == {"search": 1}
+    assert list(text_env.prev_actions) == ["search[shirt]"]
+    assert len(text_env.prev_obs) == 2
+
+    # The session continues from the restored page
+    assert text_env.step("click[b000000001]")[0] == obs
+
+
+def test_branches_from_one_snapshot_are_independent(text_env):
+    text_env.reset(instruction_text="find a shirt")
+    text_env.step("search[shirt]")
+    snapshot = text_env.snapshot()
+
+    text_env.step("click[b000000001]")
+    first = dict(session_of(text_env))
+    first_actions = list(text_env.prev_actions)
+
+    text_env.restore(snapshot)
+    text_env.step("click[b000000002]")
+    second = session_of(text_env)
+
+    assert first["asins"] == {"B000000001"}
+    assert second["asins"] == {"B000000002"}
+    assert first_actions == ["search[shirt]", "click[b000000001]"]
+    assert list(text_env.prev_actions) == ["search[shirt]", "click[b000000002]"]
+    # The snapshot itself is untouched by either branch
+    assert snapshot.session["asins"] == set()
+    assert dict(snapshot.session["actions"]) == {"search": 1}
+
+
+def test_containers_are_only_copied_while_shared(text_env):
+    text_env.reset(instruction_text="find a shirt")
+    text_env.step("search[shirt]")
+    actions = session_of(text_env)["actions"]
+    text_env.step("click[b000000001]")
+    # No snapshot: counters are updated in place
+    assert session_of(text_env)["actions"] is actions
+
+    snapshot = text_env.snapshot()
+    text_env.step("click[red]")
+    assert session_of(text_env)["actions"] is not snapshot.session["actions"]
+    assert snapshot.session["options"] == {}
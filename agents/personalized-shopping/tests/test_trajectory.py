@@ -0,0 +1,112 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+
+import pytest
+
+from personalized_shopping.shared_libraries.web_agent_site.envs.trajectory import (
+    TrajectoryRecorder,
+    TrajectoryReplayer,
+    load_trajectories,
+)
+
+pytestmark = pytest.mark.usefixtures("stub_nlp")
+
+EPISODES = [
+    (11, 0, ["search[red shirt]", "click[b000000001]", "click[blue]", "click[buy now]"]),
+    (12, None, ["search[shirt]", "click[b000000001]", "click[red]", "click[buy now]"]),
+    (13, None, ["search[candle]", "click[b000000003]", "click[< prev]"]),
+]
+
+
+@pytest.fixture
+def recording(text_env, tmp_path):
+    path = tmp_path / "trajectories.jsonl.gz"
+    with TrajectoryRecorder(text_env, path) as recorder:
+        for seed, goal_idx, actions in EPISODES:
+            recorder.reset(seed=seed, goal_idx=goal_idx)
+            for action in actions:
+                recorder.step(action)
+    return path
+
+
+def test_recordings_hold_every_episode(recording):
+    trajectories = list(load_trajectories(recording))
+    assert [t["seed"] for t in trajectories] == [11, 12, 13]
+    assert [t["fixed_goal"] for t in trajectories] == [True, False, False]
+    assert trajectories[0]["steps"][-1]["reward"] == 1.0
+    assert all(step["obs_hash"] for t in trajectories for step in t["steps"])
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_replays_reproduce_the_recording(text_env, recording, fast):
+    report = TrajectoryReplayer(text_env).replay_file(recording, fast=fast)
+    assert report["num_trajectories"] == 3
+    assert report["num_steps"] == sum(len(actions) for _, _, actions in EPISODES)
+    assert report["reward_mismatches"] == 0
+    assert report["obs_mismatches"] == 0
+    assert report["results"][0]["final_reward"] == 1.0
+
+
+def test_observation_mismatches_are_reported(text_env, recording):
+    trajectory = next(load_trajectories(recording))
+    trajectory["reset_obs_hash"] = "0" * 16
+    trajectory["steps"][2]["obs_hash"] = "0" * 16
+    result = TrajectoryReplayer(text_env).replay(trajectory)
+    assert result["obs_mismatches"] == [-1, 2]
+    assert result["rewards_match"]
+    # Fast replays don't render pages, so they can't check observations
+    assert TrajectoryReplayer(text_env).replay(trajectory, fast=True)[
+        "obs_mismatches"
+    ] == []
+
+
+def test_reward_mismatches_are_reported(text_env, recording):
+    trajectory = next(load_trajectories(recording))
+    trajectory["steps"][-1]["reward"] = 0.25
+    for fast in (False, True):
+        result = TrajectoryReplayer(text_env).replay(trajectory, fast=fast)
+        assert not result["rewards_match"]
+
+
+def test_fast_replays_leave_the_environment_usable(text_env, recording):
+    text_env.reset(session=1)
+    text_env.step("search[shirt]")
+    session, page_source = text_env.session, text_env.browser.page_source
+    TrajectoryReplayer(text_env).replay_file(recording, fast=True)
+
+    assert text_env.session == session
+    assert text_env.browser.page_source == page_source
+    assert text_env.server.render_pages
+    # Only the environment's own session is left on the server
+    assert list(text_env.server.user_sessions) == [session]
+    observation, reward, done, _ = text_env.step("click[b000000002]")
+    assert "blue linen shirt" in observation
+    assert (reward, done) == (0.0, False)
+
+
+def test_recording_and_replaying_leave_the_global_generator_alone(
+    text_env, tmp_path
+):
+    random.seed(7)
+    expected = [random.random() for _ in range(3)]
+    random.seed(7)
+    path = tmp_path / "trajectories.jsonl"
+    with TrajectoryRecorder(text_env, path) as recorder:
+        recorder.reset(seed=11)
+        recorder.step("search[shirt]")
+    TrajectoryReplayer(text_env).replay_file(path)
+    TrajectoryReplayer(text_env).replay_file(path, fast=True)
+    assert [random.random() for _ in range(3)] == expected